@@ -1,5 +1,5 @@
 # Audio Threat Detection API
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 import os
 import sys
@@ -22,5 +22,11 @@ def create_app():
     app.register_blueprint(audio_bp, url_prefix='/api/audio')
     app.register_blueprint(detection_bp, url_prefix='/api/detection')
 
+    @app.route('/metrics')
+    def metrics():
+        """Counters, stage histograms and executor gauges in Prometheus text format"""
+        from utils.metrics import get_registry
+        return Response(get_registry().render(), mimetype='text/plain; version=0.0.4')
+
     return app
 
@@ -0,0 +1,93 @@
+"""
+Detector Registry
+Process-wide factory for the shared ThreatDetector, AudioProcessor and
+stream DecoderPool so that every blueprint uses one copy of the model
+weights, feature transforms and per-stream decoders
+"""
+import threading
+import time
+from typing import Dict, Optional
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.audio_processor import AudioProcessor
+from utils.decoder_pool import DecoderPool
+from models.threat_detector import ThreatDetector
+
+_lock = threading.Lock()
+_threat_detector: Optional[ThreatDetector] = None
+_load_time: Optional[float] = None
+_decoder_pool: Optional[DecoderPool] = None
+
+
+def _module_nbytes(module: Optional[nn.Module]) -> int:
+    """Bytes held by a module's parameters and buffers"""
+    if module is None:
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _attribute_nbytes(obj) -> int:
+    """Bytes held by an object's array, tensor and module attributes"""
+    total = 0
+    for value in vars(obj).values():
+        if isinstance(value, nn.Module):
+            total += _module_nbytes(value)
+        elif isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, np.ndarray):
+            total += value.nbytes
+    return total
+
+
+def get_threat_detector() -> ThreatDetector:
+    """Return the shared ThreatDetector, loading it on first use"""
+    global _threat_detector, _load_time
+
+    if _threat_detector is None:
+        with _lock:
+            if _threat_detector is None:
+                start = time.perf_counter()
+                _threat_detector = ThreatDetector()
+                _load_time = time.perf_counter() - start
+    return _threat_detector
+
+
+def get_audio_processor() -> AudioProcessor:
+    """Return the AudioProcessor owned by the shared detector"""
+    return get_threat_detector().audio_processor
+
+
+def get_decoder_pool() -> DecoderPool:
+    """Return the shared per-stream decoder pool"""
+    global _decoder_pool
+
+    if _decoder_pool is None:
+        # Resolved before taking _lock, which loading the detector also takes
+        sample_rate = get_audio_processor().sample_rate
+        with _lock:
+            if _decoder_pool is None:
+                _decoder_pool = DecoderPool(sample_rate=sample_rate)
+    return _decoder_pool
+
+
+def get_registry_status() -> Dict:
+    """Report load time and model memory footprint of the shared detector"""
+    if _threat_detector is None:
+        return {'loaded': False}
+
+    model_bytes = _module_nbytes(_threat_detector.non_speech_model.model)
+    transform_bytes = _attribute_nbytes(_threat_detector.feature_extractor)
+
+    return {
+        'loaded': True,
+        'load_time': round(_load_time, 3),
+        'model_memory_mb': round(model_bytes / (1024 * 1024), 2),
+        'feature_transforms_memory_mb': round(transform_bytes / (1024 * 1024), 2)
+    }
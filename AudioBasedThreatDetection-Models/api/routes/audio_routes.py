@@ -2,20 +2,31 @@
 Audio Processing API Routes
 Handles audio upload and processing endpoints
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import numpy as np
 import base64
 import io
 import os
 import sys
 import struct
+import time
+import itertools
 import traceback
 import warnings
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from utils.audio_processor import AudioProcessor
-from utils.audio_decoder import decode_audio_smart, detect_audio_format
-from models.threat_detector import ThreatDetector
+from config import ScanConfig, MetricsConfig
+from utils.audio_decoder import decode_audio_smart, detect_audio_format, decode_pcm_body, check_pcm_layout
+from utils.resampler import resample
+from api.registry import get_threat_detector, get_audio_processor, get_registry_status, get_decoder_pool
+from api.streaming import parse_overlap
+
+# Optional compact binary responses
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
 
 # Suppress pydub/FFmpeg warnings for cleaner logs
 warnings.filterwarnings('ignore', category=RuntimeWarning, module='pydub')
@@ -23,13 +34,41 @@ os.environ['PYDUB_FFMPEG_SILENCE'] = '1'
 
 audio_bp = Blueprint('audio', __name__)
 
-# Initialize components
-audio_processor = AudioProcessor()
-threat_detector = ThreatDetector()
+# Shared components (one detector and model copy per process)
+threat_detector = get_threat_detector()
+audio_processor = get_audio_processor()
+decoder_pool = get_decoder_pool()
 
 
-def decode_audio_from_base64(base64_data: str, audio_format: str = 'auto', sample_rate: int = 16000) -> np.ndarray:
-    """Decode audio from base64 - handles multiple formats with smart detection and silent FFmpeg"""
+def _session_state(data: dict = None):
+    """Per-session state for the request's session_id (JSON body or query), or None for the default"""
+    session_id = (data or {}).get('session_id') or request.args.get('session_id')
+    return threat_detector.get_session_state(session_id)
+
+
+def _respond(payload: dict, status: int = 200):
+    """JSON response, or MessagePack when the client asks for application/msgpack"""
+    if MSGPACK_AVAILABLE:
+        best = request.accept_mimetypes.best_match(['application/json', 'application/msgpack'])
+        if best == 'application/msgpack':
+            return Response(msgpack.packb(payload, use_bin_type=True),
+                            status=status, mimetype='application/msgpack')
+    return jsonify(payload), status
+
+
+def _resample(audio: np.ndarray, sr: int) -> np.ndarray:
+    """Resample to the processor's sample rate if needed"""
+    if sr == audio_processor.sample_rate:
+        return audio
+    return resample(audio, sr, audio_processor.sample_rate)
+
+
+def decode_audio_from_base64(base64_data: str, audio_format: str = 'auto', sample_rate: int = 16000,
+                             stream_id: str = None) -> np.ndarray:
+    """
+    Decode audio from base64 - handles multiple formats with smart detection and silent FFmpeg.
+    With a stream_id, WebM/Ogg chunks go through that stream's persistent decoder.
+    """
     # Remove data URL prefix if present
     if ',' in base64_data:
         base64_data = base64_data.split(',')[1]
@@ -44,10 +83,10 @@ def decode_audio_from_base64(base64_data: str, audio_format: str = 'auto', sampl
         print(f"[Audio] ✓ PCM16: {len(audio)} samples ({duration:.2f}s)")
         return audio
 
-    # Use smart decoder (silent FFmpeg)
+    # Use the stream decoder pool (falls back to the smart one-shot decoder)
     try:
         detected_format = detect_audio_format(audio_bytes)
-        audio = decode_audio_smart(audio_bytes, sample_rate)
+        audio = decoder_pool.decode(stream_id, audio_bytes)
         duration = len(audio) / sample_rate
         print(f"[Audio] ✓ {detected_format.upper()}: {len(audio)} samples ({duration:.2f}s)")
         return audio
@@ -70,7 +109,9 @@ def get_status():
     """Get detector status"""
     return jsonify({
         'status': 'ok',
-        'detector': threat_detector.get_status()
+        'detector': threat_detector.get_status(),
+        'registry': get_registry_status(),
+        'decoder_pool': decoder_pool.get_stats()
     })
 
 
@@ -78,21 +119,61 @@ def get_status():
 def analyze_audio():
     """
     Analyze uploaded audio for threats
-    Accepts: base64 encoded audio or file upload
+    Accepts: base64 encoded audio (JSON), file upload, or a raw
+    application/octet-stream PCM body described by X-Audio-Format
+    (pcm16/float32), X-Sample-Rate, X-Channels, X-Session-Id and X-Overlap headers.
+    Responds with MessagePack when Accept prefers application/msgpack.
+    With ?trace=true the result carries per-stage timings (decode included).
     """
     try:
+        trace = request.args.get('trace', str(MetricsConfig.TRACE_STAGES)).lower() == 'true'
+        timer = threat_detector.metrics.timer(trace=trace)
+        decode_start = time.perf_counter()
         audio_data = None
+        data = None
+
+        # Raw binary PCM - no base64/JSON overhead
+        if request.mimetype == 'application/octet-stream':
+            data = {'session_id': request.headers.get('X-Session-Id')}
+            try:
+                data['overlap'] = parse_overlap(request.headers.get('X-Overlap', 0.0))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': f'X-Overlap: {e}'}), 400
+
+            try:
+                sample_rate, channels = check_pcm_layout(request.headers.get('X-Sample-Rate', 16000),
+                                                         request.headers.get('X-Channels', 1))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+
+            try:
+                audio_data = decode_pcm_body(
+                    request.get_data(cache=False),
+                    sample_format=request.headers.get('X-Audio-Format', 'pcm16').lower(),
+                    channels=channels
+                )
+                audio_data = _resample(audio_data, sample_rate)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to decode audio: {str(e)}'
+                }), 400
 
         # Check for base64 data
-        if request.is_json:
+        elif request.is_json:
             data = request.get_json()
+            try:
+                data['overlap'] = parse_overlap(data.get('overlap', 0.0))
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
             audio_base64 = data.get('audio_data') or data.get('audio_base64')
             audio_format = data.get('format', 'auto')
             sample_rate = data.get('sample_rate', 16000)
 
             if audio_base64:
                 try:
-                    audio_data = decode_audio_from_base64(audio_base64, audio_format, sample_rate)
+                    audio_data = decode_audio_from_base64(audio_base64, audio_format, sample_rate,
+                                                          stream_id=data.get('session_id'))
                 except Exception as e:
                     print(f"Error decoding audio: {e}")
                     traceback.print_exc()
@@ -111,12 +192,7 @@ def analyze_audio():
                 import soundfile as sf
                 audio_buffer = io.BytesIO(file_bytes)
                 audio_data, sr = sf.read(audio_buffer)
-                if sr != audio_processor.sample_rate:
-                    import torchaudio
-                    import torch
-                    waveform = torch.FloatTensor(audio_data).unsqueeze(0)
-                    resampler = torchaudio.transforms.Resample(sr, audio_processor.sample_rate)
-                    audio_data = resampler(waveform).squeeze().numpy()
+                audio_data = _resample(audio_data, sr)
             except Exception as e:
                 return jsonify({
                     'success': False,
@@ -125,10 +201,12 @@ def analyze_audio():
 
         if audio_data is None:
             return jsonify({'error': 'No audio data provided'}), 400
+        timer.record('decode', time.perf_counter() - decode_start)
 
         # Ensure audio is valid
         if len(audio_data) < 1600:  # Less than 0.1 second at 16kHz
-            return jsonify({
+            threat_detector.metrics.record_skip('too_short')
+            return _respond({
                 'success': True,
                 'result': {
                     'is_threat': False,
@@ -145,10 +223,13 @@ def analyze_audio():
         result = threat_detector.analyze_audio(
             audio_data,
             enable_speech=enable_speech,
-            enable_non_speech=enable_non_speech
+            enable_non_speech=enable_non_speech,
+            state=_session_state(data),
+            overlap=(data or {}).get('overlap', 0.0),
+            timer=timer
         )
 
-        return jsonify({
+        return _respond({
             'success': True,
             'result': result
         })
@@ -161,6 +242,94 @@ def analyze_audio():
         }), 500
 
 
+def _resolve_scan_path(path: str):
+    """Real path of a server-side recording, or None if outside ScanConfig.ALLOWED_DIRS"""
+    real_path = os.path.realpath(path)
+    for allowed in ScanConfig.ALLOWED_DIRS:
+        allowed_dir = os.path.realpath(allowed)
+        if os.path.commonpath([real_path, allowed_dir]) == allowed_dir and os.path.isfile(real_path):
+            return real_path
+    return None
+
+
+def _recording_blocks(source):
+    """
+    Block iterator for a recording.
+    Formats soundfile can stream are read block by block; anything else
+    (e.g. WebM) is decoded in one piece with the smart decoder.
+    """
+    blocks = audio_processor.iter_audio_blocks(source, ScanConfig.BLOCK_DURATION)
+    try:
+        first = next(blocks, None)
+        return itertools.chain([first] if first is not None else [], blocks)
+    except Exception:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                audio_bytes = f.read()
+        else:
+            source.seek(0)
+            audio_bytes = source.read()
+        return [decode_audio_smart(audio_bytes, audio_processor.sample_rate)]
+
+
+@audio_bp.route('/analyze-file', methods=['POST'])
+def analyze_file():
+    """
+    Scan a long recording and return a timeline of detections
+    Accepts: file upload ('audio') or JSON {"path": ...} inside an allowed scan directory
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        # type=int yields None for a value that is not an integer
+        batch_size = request.args.get('batch_size', type=int)
+        if 'batch_size' not in request.args:
+            batch_size = ScanConfig.BATCH_SIZE
+        if batch_size is None or not 1 <= batch_size <= ScanConfig.MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'batch_size must be an integer between 1 and {ScanConfig.MAX_BATCH_SIZE}'
+            }), 400
+
+        if 'audio' in request.files:
+            source = request.files['audio'].stream
+        elif data.get('path'):
+            source = _resolve_scan_path(data['path'])
+            if source is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Path not found or outside the allowed scan directories'
+                }), 403
+        else:
+            return jsonify({'error': 'No audio file or path provided'}), 400
+
+        try:
+            blocks = _recording_blocks(source)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Failed to read recording: {str(e)}'
+            }), 400
+
+        scan = threat_detector.scan_recording(
+            audio_processor.iter_chunks(blocks),
+            batch_size=batch_size,
+            state=_session_state(data)
+        )
+
+        return jsonify({
+            'success': True,
+            'result': scan
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @audio_bp.route('/calibrate', methods=['POST'])
 def calibrate_noise():
     """
@@ -176,7 +345,7 @@ def calibrate_noise():
             return jsonify({'error': 'audio_data required'}), 400
         
         audio_data = audio_processor.decode_base64_audio(data['audio_data'])
-        status = threat_detector.update_noise_profile(audio_data)
+        status = threat_detector.update_noise_profile(audio_data, state=_session_state(data))
         
         return jsonify({
             'success': True,
@@ -193,7 +362,7 @@ def calibrate_noise():
 @audio_bp.route('/reset-calibration', methods=['POST'])
 def reset_calibration():
     """Reset noise calibration"""
-    threat_detector.reset_noise_profile()
+    threat_detector.reset_noise_profile(state=_session_state(request.get_json(silent=True)))
     return jsonify({
         'success': True,
         'message': 'Noise profile reset'
@@ -225,7 +394,7 @@ def sensitivity():
     if request.method == 'GET':
         return jsonify({
             'success': True,
-            'sensitivity': threat_detector.get_sensitivity_settings()
+            'sensitivity': threat_detector.get_sensitivity_settings(state=_session_state())
         })
 
     # POST - set sensitivity
@@ -239,7 +408,7 @@ def sensitivity():
                 'error': 'Invalid level. Use: low, normal, or high'
             }), 400
 
-        settings = threat_detector.set_sensitivity(level)
+        settings = threat_detector.set_sensitivity(level, state=_session_state(data))
 
         return jsonify({
             'success': True,
@@ -256,9 +425,44 @@ def sensitivity():
 @audio_bp.route('/reset-session', methods=['POST'])
 def reset_session():
     """Reset detection session - clears history for fresh start"""
-    threat_detector.reset_detection_history()
+    threat_detector.reset_detection_history(state=_session_state(request.get_json(silent=True)))
     return jsonify({
         'success': True,
         'message': 'Detection session reset'
     })
 
+
+
+@audio_bp.route('/speech-result/<job_id>', methods=['GET'])
+def get_speech_result(job_id):
+    """
+    Collect a speech result that was still pending when /analyze returned
+    (its speech_result was {'pending': true, 'job_id': ...})
+    """
+    job = threat_detector.get_speech_result(job_id)
+    if job['status'] == 'unknown':
+        return jsonify({'success': False, 'error': 'Unknown or expired job', **job}), 404
+
+    return _respond({'success': True, **job})
+
+
+@audio_bp.route('/lexicon', methods=['GET'])
+def get_lexicon():
+    """Active threat keyword lexicon: version, build time and keyword counts"""
+    return jsonify({
+        'success': True,
+        'lexicon': threat_detector.speech_detector.lexicon_store.get_status()
+    })
+
+
+@audio_bp.route('/lexicon/reload', methods=['POST'])
+def reload_lexicon():
+    """Reload the lexicon file now instead of waiting for the next poll"""
+    store = threat_detector.speech_detector.lexicon_store
+    store.reload()
+    status = store.get_status()
+
+    return jsonify({
+        'success': status['last_error'] is None,
+        'lexicon': status
+    }), 200 if status['last_error'] is None else 400
@@ -1,43 +1,52 @@
 """
 Real-time Detection API Routes
-HTTP endpoints for real-time audio streaming
+HTTP endpoints for real-time audio streaming, plus persistent
+WebSocket and chunked-HTTP stream transports
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import numpy as np
 import base64
+import json
 import os
 import sys
 import time
 
+# Optional WebSocket transport
+try:
+    from flask_sock import Sock
+    FLASK_SOCK_AVAILABLE = True
+except ImportError:
+    FLASK_SOCK_AVAILABLE = False
+
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from utils.audio_processor import AudioProcessor
-from models.threat_detector import ThreatDetector
 from config import AudioConfig
+from api.registry import get_threat_detector, get_audio_processor, get_decoder_pool
+from api.streaming import StreamSession, parse_overlap
 
 detection_bp = Blueprint('detection', __name__)
 
-# Initialize components
-audio_processor = AudioProcessor()
-threat_detector = ThreatDetector()
-
-# Store active sessions
-active_sessions = {}
+# Shared components (one detector and model copy per process)
+threat_detector = get_threat_detector()
+audio_processor = get_audio_processor()
+decoder_pool = get_decoder_pool()
 
 
 @detection_bp.route('/start', methods=['POST'])
 def start_detection():
     """Start a detection session"""
-    session_id = request.json.get('session_id', str(time.time()))
-    
-    active_sessions[session_id] = {
-        'started_at': time.time(),
-        'alerts_count': 0,
-        'audio_chunks_processed': 0
-    }
-    
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id', str(time.time()))
+    sensitivity = data.get('sensitivity', 'normal')
+    location_id = data.get('location_id')
+
+    state = threat_detector.sessions.create(session_id, sensitivity=sensitivity)
+    restored = threat_detector.set_location(state, location_id)
+
     return jsonify({
         'success': True,
         'session_id': session_id,
+        'location_id': location_id,
+        'noise_profile_restored': restored,
         'message': 'Detection session started'
     })
 
@@ -45,20 +54,24 @@ def start_detection():
 @detection_bp.route('/stop', methods=['POST'])
 def stop_detection():
     """Stop a detection session"""
-    session_id = request.json.get('session_id')
-    
-    if session_id and session_id in active_sessions:
-        session_info = active_sessions.pop(session_id)
-        duration = time.time() - session_info['started_at']
-        
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('session_id')
+
+    state = threat_detector.sessions.remove(session_id) if session_id else None
+    if session_id:
+        decoder_pool.close(session_id)
+    if state is not None:
+        threat_detector.save_noise_profile(state)
+        summary = state.get_summary()
+
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'duration': round(duration, 2),
-            'alerts_count': session_info['alerts_count'],
-            'chunks_processed': session_info['audio_chunks_processed']
+            'duration': summary['duration'],
+            'alerts_count': summary['alerts_count'],
+            'chunks_processed': summary['chunks_processed']
         })
-    
+
     return jsonify({
         'success': False,
         'error': 'Session not found'
@@ -70,38 +83,58 @@ def process_audio_chunk():
     """Process a single audio chunk and return results"""
     try:
         data = request.get_json()
-        
+
         if 'audio_data' not in data:
             return jsonify({'error': 'audio_data required'}), 400
-        
-        session_id = data.get('session_id')
-        
-        # Decode audio
-        audio_data = audio_processor.decode_base64_audio(data['audio_data'])
-        
+
+        try:
+            overlap = parse_overlap(data.get('overlap', 0.0))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        # Per-session history, noise profile and sensitivity
+        state = threat_detector.get_session_state(data.get('session_id'))
+
+        # Decode audio (WebM/Ogg session chunks reuse the session's stream decoder)
+        if data.get('session_id'):
+            audio_bytes = base64.b64decode(data['audio_data'].split(',')[-1])
+            audio_data = decoder_pool.decode(data['session_id'], audio_bytes)
+        else:
+            audio_data = audio_processor.decode_base64_audio(data['audio_data'])
+
+        # A container header or partial fragment may not yield samples yet
+        if len(audio_data) == 0:
+            threat_detector.mark_gap(state)
+            return jsonify({
+                'success': True,
+                'is_threat': False,
+                'skipped': True,
+                'reason': 'buffering'
+            })
+
         # Check if silent
         if audio_processor.is_silent(audio_data):
+            # The next chunk's overlap must not be spliced onto audio before this one
+            threat_detector.mark_gap(state)
             return jsonify({
                 'success': True,
                 'is_threat': False,
                 'skipped': True,
                 'reason': 'silent_audio'
             })
-        
+
         # Analyze
-        result = threat_detector.analyze_audio(audio_data)
-        
-        # Update session if exists
-        if session_id and session_id in active_sessions:
-            active_sessions[session_id]['audio_chunks_processed'] += 1
-            if result['is_threat']:
-                active_sessions[session_id]['alerts_count'] += 1
-        
+        result = threat_detector.analyze_audio(
+            audio_data,
+            state=state,
+            overlap=overlap
+        )
+
         return jsonify({
             'success': True,
             **result
         })
-        
+
     except Exception as e:
         return jsonify({
             'success': False,
@@ -112,21 +145,113 @@ def process_audio_chunk():
 @detection_bp.route('/sessions', methods=['GET'])
 def list_sessions():
     """List active detection sessions"""
-    sessions = []
-    for session_id, info in active_sessions.items():
-        sessions.append({
-            'session_id': session_id,
-            'duration': round(time.time() - info['started_at'], 2),
-            'alerts_count': info['alerts_count'],
-            'chunks_processed': info['audio_chunks_processed']
-        })
-    
+    sessions = [state.get_summary() for state in threat_detector.sessions.list_states()]
+
     return jsonify({
         'success': True,
         'active_sessions': sessions
     })
 
 
-# Note: WebSocket support removed for Python 3.14 compatibility
-# Using HTTP polling instead via the /process-chunk endpoint
+@detection_bp.route('/stream', methods=['POST'])
+def stream_chunked():
+    """
+    Continuous detection over one chunked HTTP upload.
+    Body: raw PCM (application/octet-stream, Transfer-Encoding: chunked),
+    described by X-Session-Id, X-Audio-Format, X-Sample-Rate and X-Channels.
+    Response: newline-delimited JSON events, written as chunks complete.
+    """
+    try:
+        session = StreamSession(
+            threat_detector,
+            session_id=request.headers.get('X-Session-Id', str(time.time())),
+            sample_format=request.headers.get('X-Audio-Format', 'pcm16').lower(),
+            sample_rate=request.headers.get('X-Sample-Rate', 16000),
+            channels=request.headers.get('X-Channels', 1),
+            sensitivity=request.headers.get('X-Sensitivity'),
+            threats_only=request.args.get('threats_only', 'false').lower() == 'true'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    read_size = session.frame_bytes * session.step_samples
+
+    def generate():
+        while True:
+            data = request.stream.read(read_size)
+            if not data:
+                break
+            for event in session.feed(data):
+                yield json.dumps(event) + '\n'
+        for event in session.collect_speech():
+            yield json.dumps(event) + '\n'
+        yield json.dumps(session.close()) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _run_websocket_stream(ws) -> None:
+    """
+    Continuous detection over a WebSocket.
+    First message: JSON {session_id, format, sample_rate, channels, sensitivity, threats_only}.
+    Then binary PCM frames; detection events are sent back as JSON text.
+    A text message {"type": "stop"} ends the stream with a summary. A frame
+    that cannot be processed ends it with an error event, then the summary.
+    """
+    try:
+        config = json.loads(ws.receive())
+        if not isinstance(config, dict):
+            raise ValueError('First message must be a JSON object')
+        session = StreamSession(
+            threat_detector,
+            session_id=config.get('session_id', str(time.time())),
+            sample_format=config.get('format', 'pcm16'),
+            sample_rate=config.get('sample_rate', 16000),
+            channels=config.get('channels', 1),
+            sensitivity=config.get('sensitivity'),
+            threats_only=config.get('threats_only', False)
+        )
+    except Exception as e:
+        ws.send(json.dumps({'type': 'error', 'error': str(e)}))
+        return
+
+    ws.send(json.dumps({'type': 'ready', 'session_id': session.session_id}))
+
+    error = None
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            if isinstance(message, str):
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    control = None
+                if isinstance(control, dict) and control.get('type') == 'stop':
+                    break
+                continue
+            for event in session.feed(message):
+                ws.send(json.dumps(event))
+
+        for event in session.collect_speech():
+            ws.send(json.dumps(event))
+    except Exception as e:
+        error = e
+
+    # The summary is always attempted, even if the client has already gone
+    try:
+        if error is not None:
+            ws.send(json.dumps({'type': 'error', 'error': str(error)}))
+        ws.send(json.dumps(session.close()))
+    except Exception:
+        pass
+
+
+if FLASK_SOCK_AVAILABLE:
+    sock = Sock()
+
+    @sock.route('/ws', bp=detection_bp)
+    def stream_websocket(ws):
+        _run_websocket_stream(ws)
 
@@ -0,0 +1,146 @@
+"""
+Streaming Detection Sessions
+Transport-agnostic handler for continuous PCM streams: the WebSocket and
+chunked-HTTP routes feed it raw bytes and forward the events it returns
+"""
+from typing import Dict, List, Optional
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AudioConfig
+from utils.audio_decoder import PCM_DTYPES, check_pcm_layout, decode_pcm_body
+from utils.resampler import StreamingResampler
+
+
+def parse_overlap(value) -> float:
+    """Overlap fraction from a request (0 <= overlap < 1); raises ValueError otherwise"""
+    try:
+        overlap = float(value)
+    except (TypeError, ValueError):
+        overlap = None
+    if overlap is None or not 0.0 <= overlap < 1.0:
+        raise ValueError('overlap must be a fraction of the chunk, at least 0 and below 1')
+    return overlap
+
+
+class StreamSession:
+    """
+    Buffers a continuous PCM stream into overlapping analysis chunks
+    (CHUNK_DURATION long, advancing by CHUNK_DURATION * (1 - OVERLAP)) and runs
+    each through the shared detector with the session's DetectionState.
+    """
+
+    def __init__(self, detector, session_id: str, sample_format: str = 'pcm16',
+                 sample_rate: int = 16000, channels: int = 1,
+                 sensitivity: Optional[str] = None, threats_only: bool = False):
+        if sample_format not in PCM_DTYPES:
+            raise ValueError(f"Unsupported PCM format '{sample_format}'. Use: {', '.join(PCM_DTYPES)}")
+
+        self.detector = detector
+        self.session_id = session_id
+        self.sample_format = sample_format
+        self.sample_rate, self.channels = check_pcm_layout(sample_rate, channels)
+        self.threats_only = threats_only
+        self.frame_bytes = PCM_DTYPES[sample_format].itemsize * self.channels
+
+        # Reuse a session started via /api/detection/start, else create one
+        self.state = detector.sessions.get(session_id, create=False)
+        if self.state is None:
+            self.state = detector.sessions.create(session_id, sensitivity=sensitivity or 'normal', replace=False)
+        elif sensitivity:
+            self.state.set_sensitivity(sensitivity)
+
+        # Incoming samples are resampled continuously (filter state kept across
+        # packets) and chunked at the detector's rate
+        self.target_rate = detector.audio_processor.sample_rate
+        self.chunk_samples = int(AudioConfig.CHUNK_DURATION * self.target_rate)
+        self.step_samples = self.chunk_samples - int(self.chunk_samples * AudioConfig.OVERLAP)
+        self.overlap = 1.0 - self.step_samples / self.chunk_samples
+        self.resampler = None
+        if self.sample_rate != self.target_rate:
+            self.resampler = StreamingResampler(self.sample_rate, self.target_rate)
+
+        self._pending = b''
+        self._speech_jobs: Dict[str, int] = {}  # pending transcription job -> chunk index
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self.samples_received = 0
+        self.chunks_emitted = 0
+
+    def feed(self, data: bytes) -> List[Dict]:
+        """Add raw PCM bytes; return events for every chunk that became complete"""
+        data = self._pending + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        if usable == 0:
+            return []
+
+        samples = decode_pcm_body(data[:usable], self.sample_format, self.channels)
+        self.samples_received += len(samples)
+        if self.resampler is not None:
+            samples = self.resampler.push(samples)
+        self._buffer = np.concatenate([self._buffer, samples])
+
+        events = []
+        while len(self._buffer) >= self.chunk_samples:
+            event = self._analyze(self._buffer[:self.chunk_samples])
+            self._buffer = self._buffer[self.step_samples:]
+            if event is not None:
+                events.append(event)
+        return events + self.collect_speech()
+
+    def collect_speech(self) -> List[Dict]:
+        """Events for transcriptions that finished after their chunk's event was sent"""
+        events = []
+        for job_id, chunk_index in list(self._speech_jobs.items()):
+            job = self.detector.get_speech_result(job_id)
+            if job['status'] == 'pending':
+                continue
+            del self._speech_jobs[job_id]
+            if job['status'] != 'done':
+                continue
+            if self.threats_only and not job['speech_result']['is_threat']:
+                continue
+            events.append({
+                'type': 'speech',
+                'session_id': self.session_id,
+                'chunk_index': chunk_index,
+                'job_id': job_id,
+                **job['speech_result']
+            })
+        return events
+
+    def _analyze(self, chunk: np.ndarray) -> Optional[Dict]:
+        # The first chunk of a stream has no predecessor to overlap with
+        overlap = self.overlap if self.chunks_emitted > 0 else 0.0
+        result = self.detector.analyze_audio(chunk, state=self.state, overlap=overlap)
+
+        chunk_index = self.chunks_emitted
+        self.chunks_emitted += 1
+
+        speech = result.get('speech_result') or {}
+        if speech.get('pending'):
+            self._speech_jobs[speech['job_id']] = chunk_index
+
+        if self.threats_only and not result.get('is_threat'):
+            return None
+
+        return {
+            'type': 'detection',
+            'session_id': self.session_id,
+            'chunk_index': chunk_index,
+            'stream_time': round(chunk_index * self.step_samples / self.target_rate, 3),
+            **result
+        }
+
+    def close(self) -> Dict:
+        """Summary event for the end of the stream (the session itself is kept)"""
+        return {
+            'type': 'summary',
+            'stream_duration': round(self.samples_received / self.sample_rate, 3),
+            'chunks_analyzed': self.chunks_emitted,
+            'speech_pending': list(self._speech_jobs),
+            **self.state.get_summary()
+        }
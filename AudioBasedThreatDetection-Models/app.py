@@ -60,14 +60,21 @@ def create_application():
             'endpoints': {
                 'health': 'GET /api/audio/health',
                 'status': 'GET /api/audio/status',
+                'metrics': 'GET /metrics (Prometheus text format)',
                 'analyze': 'POST /api/audio/analyze',
+                'analyze_file': 'POST /api/audio/analyze-file',
                 'calibrate': 'POST /api/audio/calibrate',
                 'test': 'GET /api/audio/test',
                 'sensitivity': 'GET/POST /api/audio/sensitivity',
                 'reset_session': 'POST /api/audio/reset-session',
+                'speech_result': 'GET /api/audio/speech-result/<job_id>',
+                'lexicon': 'GET /api/audio/lexicon',
+                'lexicon_reload': 'POST /api/audio/lexicon/reload',
                 'start_session': 'POST /api/detection/start',
                 'stop_session': 'POST /api/detection/stop',
                 'process_chunk': 'POST /api/detection/process-chunk',
+                'stream': 'POST /api/detection/stream (chunked PCM, NDJSON events)',
+                'stream_ws': 'WS /api/detection/ws',
                 'sessions': 'GET /api/detection/sessions'
             }
         })
@@ -95,14 +102,20 @@ def print_banner():
     print("   - GET  /                          API Info")
     print("   - GET  /api/audio/health          Health Check")
     print("   - GET  /api/audio/status          Detector Status")
+    print("   - GET  /metrics                   Prometheus Metrics")
     print("   - POST /api/audio/analyze         Analyze Audio")
+    print("   - POST /api/audio/analyze-file    Scan Long Recording")
     print("   - POST /api/audio/calibrate       Calibrate Noise")
     print("   - GET  /api/audio/test            Test Detection")
     print("   - GET/POST /api/audio/sensitivity Adjust Sensitivity")
     print("   - POST /api/audio/reset-session   Reset Detection Session")
+    print("   - GET  /api/audio/speech-result/<id>  Pending Speech Result")
+    print("   - GET  /api/audio/lexicon         Threat Lexicon Version")
     print("   - POST /api/detection/start       Start Session")
     print("   - POST /api/detection/stop        Stop Session")
     print("   - POST /api/detection/process-chunk  Process Audio Chunk")
+    print("   - POST /api/detection/stream      Chunked PCM Stream")
+    print("   - WS   /api/detection/ws          WebSocket PCM Stream")
     print("=" * 60 + "\n")
 
 
@@ -0,0 +1 @@
+# Audio Threat Detection Benchmarks
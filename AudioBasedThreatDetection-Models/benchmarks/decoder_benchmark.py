@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Decoder Benchmark
+Per-chunk decode time for browser-style WebM/Opus chunks: the one-shot
+pydub/FFmpeg path versus the persistent per-stream DecoderPool backends.
+The WebM fixture is encoded with PyAV so the run is reproducible.
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DecoderConfig
+from utils.audio_decoder import decode_audio_smart
+from utils.decoder_pool import DecoderPool, PYAV_AVAILABLE
+
+
+def make_webm_recording(duration: float, sample_rate: int = 48000, seed: int = 0) -> bytes:
+    """Encode a tone-plus-noise recording as WebM/Opus, like a browser MediaRecorder"""
+    import av
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    audio = (0.3 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 0.02, len(t))).astype(np.float32)
+
+    buffer = io.BytesIO()
+    container = av.open(buffer, mode='w', format='webm')
+    stream = container.add_stream('libopus', rate=sample_rate, layout='mono')
+    frame_size = sample_rate // 50  # 20 ms Opus frames
+    for start in range(0, len(audio), frame_size):
+        frame = av.AudioFrame.from_ndarray(audio[None, start:start + frame_size], format='flt', layout='mono')
+        frame.sample_rate = sample_rate
+        frame.pts = start
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode(None):
+        container.mux(packet)
+    container.close()
+    return buffer.getvalue()
+
+
+def decode_ffmpeg_oneshot(chunk: bytes, sample_rate: int = 16000) -> np.ndarray:
+    """One FFmpeg process per chunk - the cost pydub pays, minus its ffprobe call"""
+    result = subprocess.run(
+        [DecoderConfig.FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'],
+        input=chunk, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+    )
+    return np.frombuffer(result.stdout, dtype='<f4')
+
+
+def split_fragments(data: bytes, count: int) -> list:
+    """Split one continuous recording into MediaRecorder-style timeslice fragments"""
+    step = -(-len(data) // count)
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+
+def time_chunks(decode, chunks: list) -> tuple:
+    """Mean and p95 per-chunk decode time in ms, and total samples decoded"""
+    times, samples = [], 0
+    for chunk in chunks:
+        start = time.perf_counter()
+        samples += len(decode(chunk))
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(times)), float(np.percentile(times, 95)), samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebM decoder benchmark")
+    parser.add_argument('--duration', type=float, default=20.0, help='Recording length in seconds')
+    parser.add_argument('--chunk', type=float, default=2.0, help='Chunk length in seconds')
+    args = parser.parse_args()
+
+    if not PYAV_AVAILABLE:
+        print("PyAV (pip install av) is required to build the WebM fixture")
+        return
+
+    n_chunks = int(args.duration / args.chunk)
+    standalone = [make_webm_recording(args.chunk, seed=i) for i in range(n_chunks)]
+    fragments = split_fragments(make_webm_recording(args.duration), n_chunks)
+
+    backends = ['pyav']
+    if shutil.which(DecoderConfig.FFMPEG_BINARY):
+        backends.append('ffmpeg')
+
+    print("\n" + "=" * 70)
+    print("   WEBM DECODER BENCHMARK")
+    print("=" * 70)
+    print(f"\n{n_chunks} chunks of {args.chunk:.1f}s WebM/Opus (48 kHz -> 16 kHz)\n")
+    print(f"{'Path':<34} {'Mean':>9} {'p95':>9} {'Samples':>10}")
+
+    rows = []
+    if shutil.which('ffprobe'):
+        rows.append(('one-shot pydub, standalone files',
+                     lambda chunk: decode_audio_smart(chunk, 16000), standalone))
+    elif shutil.which(DecoderConfig.FFMPEG_BINARY):
+        rows.append(('one-shot ffmpeg, standalone files', decode_ffmpeg_oneshot, standalone))
+
+    for backend in backends:
+        pool = DecoderPool(backend=backend)
+        rows.append((f'pool/{backend}, standalone files',
+                     lambda chunk, pool=pool: pool.decode('standalone', chunk), standalone))
+        pool = DecoderPool(backend=backend)
+        rows.append((f'pool/{backend}, continuous fragments',
+                     lambda chunk, pool=pool: pool.decode('fragments', chunk), fragments))
+
+    for name, decode, chunks in rows:
+        mean, p95, samples = time_chunks(decode, chunks)
+        print(f"{name:<34} {mean:>7.2f}ms {p95:>7.2f}ms {samples:>10}")
+
+    print("=" * 70 + "\n")
+
+
+if __name__ == '__main__':
+    main()
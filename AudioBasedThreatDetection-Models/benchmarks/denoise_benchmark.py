@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Noise Reduction Benchmark
+Compares frame-based NoiseProfiler.denoise_audio (and denoise_batch) with the
+original whole-signal spectral subtraction: CPU time per second of audio,
+peak memory, and residual noise on a tone in white noise
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AudioConfig
+from utils.noise_profiler import NoiseProfiler
+from benchmarks.reference_denoise import reference_denoise, reference_noise_spectrum
+
+
+def cpu_per_second(fn, audio_seconds: float, repeats: int) -> float:
+    """Best-of-N process CPU time, in milliseconds per second of audio"""
+    fn()  # warm-up
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best * 1000 / audio_seconds
+
+
+def peak_memory(fn) -> float:
+    """Peak traced allocation during one call, in MB"""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Noise reduction benchmark")
+    parser.add_argument('--repeats', type=int, default=10, help='Timed runs per input')
+    parser.add_argument('--batch', type=int, default=64, help='Chunks for the batch comparison')
+    args = parser.parse_args()
+
+    sr = AudioConfig.SAMPLE_RATE
+    rng = np.random.default_rng(0)
+
+    print("\n" + "=" * 72)
+    print("   NOISE REDUCTION BENCHMARK")
+    print("=" * 72)
+    print(f"\n{'Input':>10} {'Reference':>14} {'Frame-based':>14} {'Ref mem':>9} {'New mem':>9} "
+          f"{'Ref err':>8} {'New err':>8}")
+
+    for duration in (1, 2, 10, 60):
+        n = int(duration * sr)
+        noise = [rng.normal(0, 0.02, n).astype(np.float32) for _ in range(5)]
+        clean = (0.3 * np.sin(2 * np.pi * 440 * np.arange(n) / sr)).astype(np.float32)
+        noisy = clean + rng.normal(0, 0.02, n).astype(np.float32)
+
+        # The reference is calibrated at the chunk length, its best case
+        noise_spectrum = reference_noise_spectrum(noise)
+        profiler = NoiseProfiler()
+        for sample in noise:
+            profiler.update_noise_profile(sample)
+
+        ref_fn = lambda: reference_denoise(noisy, noise_spectrum)
+        new_fn = lambda: profiler.denoise_audio(noisy)
+
+        ref_err = np.sqrt(np.mean((ref_fn() - clean) ** 2))
+        new_err = np.sqrt(np.mean((new_fn() - clean) ** 2))
+        print(f"{duration:>8}s {cpu_per_second(ref_fn, duration, args.repeats):>11.2f}ms/s "
+              f"{cpu_per_second(new_fn, duration, args.repeats):>11.2f}ms/s "
+              f"{peak_memory(ref_fn):>7.2f}MB {peak_memory(new_fn):>7.2f}MB "
+              f"{ref_err:>8.4f} {new_err:>8.4f}")
+
+    # Many 2 s chunks: one at a time vs one batch
+    chunks = rng.normal(0, 0.1, (args.batch, 2 * sr)).astype(np.float32)
+    total_seconds = args.batch * 2.0
+    loop_fn = lambda: [profiler.denoise_audio(chunk) for chunk in chunks]
+    batch_fn = lambda: profiler.denoise_batch(chunks)
+
+    print(f"\n{args.batch} x 2s chunks:")
+    print(f"  denoise_audio loop  {cpu_per_second(loop_fn, total_seconds, args.repeats):>8.2f}ms/s "
+          f"{peak_memory(loop_fn):>8.2f}MB")
+    print(f"  denoise_batch       {cpu_per_second(batch_fn, total_seconds, args.repeats):>8.2f}ms/s "
+          f"{peak_memory(batch_fn):>8.2f}MB")
+    print("=" * 72 + "\n")
+
+
+if __name__ == '__main__':
+    main()
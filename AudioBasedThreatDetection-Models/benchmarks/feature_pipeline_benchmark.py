@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Feature Pipeline Benchmark
+Compares the fused single-STFT FeatureExtractor with the original
+three-transform pipeline on 2 s, 10 s and 60 s inputs
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AudioConfig
+from utils.feature_extractor import FeatureExtractor
+from benchmarks.reference_features import ReferenceFeatureExtractor
+
+
+def time_call(fn, audio: np.ndarray, repeats: int) -> float:
+    """Best-of-N wall time in seconds"""
+    fn(audio)  # warm-up
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(audio)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature pipeline benchmark")
+    parser.add_argument('--repeats', type=int, default=10, help='Timed runs per input')
+    args = parser.parse_args()
+
+    fused = FeatureExtractor()
+    reference = ReferenceFeatureExtractor()
+    rng = np.random.default_rng(0)
+
+    print("\n" + "=" * 60)
+    print("   FEATURE PIPELINE BENCHMARK")
+    print("=" * 60)
+    print(f"\n{'Input':>8} {'Reference':>12} {'Fused':>12} {'Speedup':>9} {'Max diff':>10}")
+
+    for duration in (2, 10, 60):
+        audio = rng.normal(0, 0.2, int(duration * AudioConfig.SAMPLE_RATE)).astype(np.float32)
+
+        ref_time = time_call(reference.extract_all_features, audio, args.repeats)
+        fused_time = time_call(fused.extract_all_features, audio, args.repeats)
+        max_diff = np.max(np.abs(
+            fused.extract_all_features(audio) - reference.extract_all_features(audio)
+        ))
+
+        print(f"{duration:>6}s {ref_time * 1000:>10.2f}ms {fused_time * 1000:>10.2f}ms "
+              f"{ref_time / fused_time:>8.2f}x {max_diff:>10.2e}")
+
+    print("=" * 60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
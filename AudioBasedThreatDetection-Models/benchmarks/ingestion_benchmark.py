@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Ingestion Benchmark
+Compares request size and /api/audio/analyze latency for base64-in-JSON
+uploads against raw pcm16 and float32 application/octet-stream bodies
+"""
+import os
+import sys
+import time
+import json
+import base64
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AudioConfig
+from api import create_app
+
+
+def time_request(send, repeats: int) -> float:
+    """Median wall time in seconds"""
+    send()  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = send()
+        times.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.data
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio ingestion benchmark")
+    parser.add_argument('--duration', type=float, default=2.0, help='Chunk length in seconds')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed requests per transport')
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    rng = np.random.default_rng(0)
+    audio = np.clip(rng.normal(0, 0.2, int(args.duration * AudioConfig.SAMPLE_RATE)), -1, 1).astype(np.float32)
+
+    pcm16 = (audio * 32767).astype('<i2').tobytes()
+    float32 = audio.astype('<f4').tobytes()
+    payload = {'audio_data': base64.b64encode(pcm16).decode('ascii'), 'format': 'pcm16'}
+
+    transports = [
+        ('json+base64', len(json.dumps(payload)),
+         lambda: client.post('/api/audio/analyze', json=payload)),
+        ('pcm16', len(pcm16),
+         lambda: client.post('/api/audio/analyze', data=pcm16, content_type='application/octet-stream',
+                             headers={'X-Audio-Format': 'pcm16'})),
+        ('float32', len(float32),
+         lambda: client.post('/api/audio/analyze', data=float32, content_type='application/octet-stream',
+                             headers={'X-Audio-Format': 'float32'}))
+    ]
+
+    print("\n" + "=" * 60)
+    print("   INGESTION BENCHMARK")
+    print("=" * 60)
+    print(f"\n{args.duration:.1f}s chunk, median of {args.repeats} requests\n")
+    print(f"{'Transport':>12} {'Body':>10} {'Latency':>10} {'vs JSON':>9}")
+
+    baseline = None
+    for name, size, send in transports:
+        latency = time_request(send, args.repeats)
+        baseline = baseline or latency
+        print(f"{name:>12} {size / 1024:>8.1f}KB {latency * 1000:>8.2f}ms {baseline / latency:>8.2f}x")
+
+    print("=" * 60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
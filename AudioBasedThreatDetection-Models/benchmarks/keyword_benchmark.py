@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Keyword Matching Benchmark
+Compares the compiled Aho-Corasick KeywordMatcher with the original
+per-keyword regex loop, with the keyword lists scaled up to 10k entries
+and transcripts of 1-500 words
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ThreatKeywords
+from utils.keyword_matcher import KeywordMatcher
+from benchmarks.reference_keywords import reference_match
+
+
+def random_word(rng: random.Random, alphabet: str) -> str:
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 9)))
+
+
+def scaled_lists(total: int, seed: int = 0) -> tuple:
+    """The configured keyword lists padded with synthetic words and phrases to about total entries"""
+    rng = random.Random(seed)
+    latin = 'abcdefghijklmnopqrstuvwxyz'
+    sinhala = ''.join(chr(c) for c in range(0x0D9A, 0x0DC7))
+
+    lists = [
+        [t.lower() for t in ThreatKeywords.ENGLISH_THREATS],
+        [t.lower() for t in ThreatKeywords.PROFANITY_ENGLISH],
+        list(ThreatKeywords.SINHALA_THREATS),
+        list(ThreatKeywords.PROFANITY_SINHALA)
+    ]
+    extra = max(0, total - sum(len(l) for l in lists)) // 4
+    for i, keywords in enumerate(lists):
+        alphabet = latin if i < 2 else sinhala
+        for _ in range(extra):
+            words = [random_word(rng, alphabet) for _ in range(rng.choice((1, 1, 2, 3)))]
+            keywords.append(' '.join(words))
+    return tuple(lists)
+
+
+def make_transcript(rng: random.Random, n_words: int, keywords: list) -> str:
+    """Mostly filler words with an occasional keyword"""
+    filler = ['the', 'class', 'teacher', 'said', 'we', 'will', 'go', 'to', 'lunch', 'now', 'please', 'sit']
+    return ' '.join(rng.choice(keywords) if rng.random() < 0.05 else rng.choice(filler) for _ in range(n_words))
+
+
+def time_call(fn, texts: list) -> float:
+    """Mean wall time per transcript in seconds"""
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return (time.perf_counter() - start) / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword matching benchmark")
+    parser.add_argument('--keywords', type=int, default=10000, help='Total keyword count')
+    parser.add_argument('--transcripts', type=int, default=20, help='Transcripts per length')
+    args = parser.parse_args()
+
+    lists = scaled_lists(args.keywords)
+    all_keywords = [k for keywords in lists for k in keywords]
+    rng = random.Random(1)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(*lists)
+    compile_time = time.perf_counter() - start
+
+    print("\n" + "=" * 60)
+    print("   KEYWORD MATCHING BENCHMARK")
+    print("=" * 60)
+    print(f"\n{len(all_keywords)} keywords, automaton compiled in {compile_time * 1000:.0f}ms\n")
+    print(f"{'Words':>6} {'Regex loop':>12} {'Automaton':>12} {'Speedup':>9} {'Same':>6}")
+
+    for n_words in (1, 10, 100, 500):
+        texts = [make_transcript(rng, n_words, all_keywords) for _ in range(args.transcripts)]
+
+        ref_time = time_call(lambda text: reference_match(text, *lists), texts)
+        new_time = time_call(matcher.match, texts)
+        same = all(matcher.match(text) == reference_match(text, *lists) for text in texts)
+
+        print(f"{n_words:>6} {ref_time * 1000:>10.2f}ms {new_time * 1000:>10.3f}ms "
+              f"{ref_time / new_time:>8.0f}x {str(same):>6}")
+
+    print("=" * 60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
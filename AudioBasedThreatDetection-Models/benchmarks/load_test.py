@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Drives N concurrent synthetic streams through /api/audio/analyze (raw pcm16
+bodies, one session per stream) and reports p50/p95/p99 latency, throughput
+and the inference executor's queue and utilization figures.
+
+Runs in-process against create_app() by default, or against a running
+server with --url http://host:port.
+
+    INFERENCE_WORKERS=2 INFERENCE_THREADS=2 python benchmarks/load_test.py --streams 8
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AudioConfig
+
+SAMPLE_RATE = AudioConfig.SAMPLE_RATE
+
+
+def synthetic_chunk(rng: np.random.Generator, duration: float) -> bytes:
+    """Broadband noise with an impulsive burst, loud enough to pass the cascade to the model"""
+    n = int(duration * SAMPLE_RATE)
+    audio = rng.normal(0, 0.1, n)
+    burst = rng.integers(0, n - n // 8)
+    audio[burst:burst + n // 8] *= 4
+    return (np.clip(audio, -1, 1) * 32767).astype('<i2').tobytes()
+
+
+class InProcessClient:
+    """Flask test client per stream thread"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def analyze(self, body: bytes, session_id: str) -> int:
+        return self.client.post('/api/audio/analyze', data=body, content_type='application/octet-stream',
+                                headers={'X-Audio-Format': 'pcm16', 'X-Session-Id': session_id}).status_code
+
+    def status(self) -> dict:
+        return self.client.get('/api/audio/status').get_json()
+
+
+class HttpClient:
+    """requests session against a running server"""
+
+    def __init__(self, url: str):
+        import requests
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+
+    def analyze(self, body: bytes, session_id: str) -> int:
+        return self.session.post(f'{self.url}/api/audio/analyze', data=body,
+                                 headers={'Content-Type': 'application/octet-stream',
+                                          'X-Audio-Format': 'pcm16', 'X-Session-Id': session_id}).status_code
+
+    def status(self) -> dict:
+        return self.session.get(f'{self.url}/api/audio/status').json()
+
+
+def run_stream(make_client, index: int, args, latencies: list, errors: list, lock: threading.Lock) -> None:
+    """One stream: chunks sent back to back, or paced at real time with --realtime"""
+    client = make_client()
+    rng = np.random.default_rng(index)
+    session_id = f'load-test-{index}'
+
+    for _ in range(args.chunks):
+        body = synthetic_chunk(rng, args.duration)
+        start = time.perf_counter()
+        try:
+            status_code = client.analyze(body, session_id)
+        except Exception as e:
+            status_code = repr(e)
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            if status_code == 200:
+                latencies.append(elapsed)
+            else:
+                errors.append(status_code)
+        if args.realtime:
+            time.sleep(max(0.0, args.duration - elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /api/audio/analyze load test")
+    parser.add_argument('--streams', type=int, default=4, help='Concurrent streams')
+    parser.add_argument('--chunks', type=int, default=10, help='Chunks per stream')
+    parser.add_argument('--duration', type=float, default=2.0, help='Chunk length in seconds')
+    parser.add_argument('--realtime', action='store_true', help='Pace each stream at real time')
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process app)')
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        from api import create_app
+        app = create_app()
+        make_client = lambda: InProcessClient(app)
+
+    # Warm-up: load the models before timing
+    make_client().analyze(synthetic_chunk(np.random.default_rng(args.streams), args.duration), 'load-test-warmup')
+
+    latencies, errors, lock = [], [], threading.Lock()
+    threads = [threading.Thread(target=run_stream, args=(make_client, i, args, latencies, errors, lock))
+               for i in range(args.streams)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    inference = make_client().status()['detector']['inference']
+    ms = np.array(latencies) * 1000
+
+    print("\n" + "=" * 60)
+    print("   LOAD TEST")
+    print("=" * 60)
+    print(f"\n{args.streams} streams x {args.chunks} chunks of {args.duration:.1f}s"
+          f"{' (real-time pacing)' if args.realtime else ''}")
+    print(f"Executor: {inference['workers']} worker(s) x {inference['threads_per_worker']} torch thread(s)\n")
+
+    if len(ms):
+        print(f"{'p50':<22} {np.percentile(ms, 50):>9.1f}ms")
+        print(f"{'p95':<22} {np.percentile(ms, 95):>9.1f}ms")
+        print(f"{'p99':<22} {np.percentile(ms, 99):>9.1f}ms")
+        print(f"{'mean':<22} {ms.mean():>9.1f}ms")
+    print(f"{'requests/s':<22} {len(ms) / wall:>11.2f}")
+    print(f"{'audio seconds/s':<22} {len(ms) * args.duration / wall:>11.2f}")
+    print(f"{'errors':<22} {len(errors):>11}")
+    print(f"{'avg batch size':<22} {inference['avg_batch_size']:>11}")
+    print(f"{'avg queue wait':<22} {inference['avg_queue_wait_ms']:>9.1f}ms")
+    print(f"{'worker utilization':<22} {', '.join(f'{u:.0%}' for u in inference['worker_utilization']):>11}")
+    print("=" * 60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
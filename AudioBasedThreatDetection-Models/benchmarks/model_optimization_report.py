@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Optimized Model Report
+Compares the float CNN-LSTM with the exported TorchScript artifact
+(BatchNorm folded, int8 dynamic quantization): accuracy on a held-out set,
+top-1 agreement, largest probability difference and batch-1 / batch-16 latency.
+
+The held-out set is an .npz with X_test (raw feature windows) and y_test
+(class indices). Without one, random feature windows are used and only
+agreement and latency are reported.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.non_speech_model import NonSpeechThreatModel
+from models.model_export import export_optimized
+
+
+def probabilities(network, X: np.ndarray, batch_size: int = 64) -> np.ndarray:
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(X), batch_size):
+            batch = torch.as_tensor(X[start:start + batch_size], dtype=torch.float32)
+            outputs.append(torch.softmax(network(batch), dim=1).numpy())
+    return np.concatenate(outputs)
+
+
+def latency_ms(network, X: np.ndarray, batch_size: int, repeats: int) -> float:
+    """Median wall time of one forward pass"""
+    batch = torch.as_tensor(X[:batch_size], dtype=torch.float32)
+    times = []
+    with torch.no_grad():
+        for _ in range(3):
+            network(batch)  # warm-up
+        for _ in range(repeats):
+            start = time.perf_counter()
+            network(batch)
+            times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Float vs optimized model report")
+    parser.add_argument('--data', help='Held-out .npz with X_test and y_test')
+    parser.add_argument('--samples', type=int, default=256, help='Random windows when no --data is given')
+    parser.add_argument('--repeats', type=int, default=30, help='Timed runs per batch size')
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    model = NonSpeechThreatModel()
+    trained = model.load_model()
+    tmp = None
+    if not trained:
+        # No trained model in this checkout: export a randomly initialised one
+        tmp = tempfile.TemporaryDirectory()
+        model.model_path = os.path.join(tmp.name, 'model.pth')
+        model.normalization_path = os.path.join(tmp.name, 'normalization.npz')
+        model.optimized_path = os.path.join(tmp.name, 'optimized.pt')
+        model.build_model()
+        model.save_model()
+
+    if model.optimized_info is None or not os.path.exists(model.optimized_path):
+        export_optimized(model)
+    model._inference_model = None
+    model.optimized_info = None
+    float_network = model._get_inference_model()
+    optimized = torch.jit.load(model.optimized_path, map_location='cpu')
+
+    if args.data:
+        data = np.load(args.data)
+        X, y = data['X_test'].astype(np.float32), data['y_test']
+        if not model.uses_global_normalization:
+            X = (X - X.mean(axis=(1, 2), keepdims=True)) / (X.std(axis=(1, 2), keepdims=True) + 1e-8)
+    else:
+        X = np.random.default_rng(0).normal(size=(args.samples, *model.input_shape)).astype(np.float32)
+        y = None
+
+    p_float = probabilities(float_network, X)
+    p_opt = probabilities(optimized, X)
+
+    print("\n" + "=" * 64)
+    print("   OPTIMIZED MODEL REPORT")
+    print("=" * 64)
+    if not trained:
+        print("\n(no trained model found - using random weights)")
+    if y is None:
+        print(f"(no held-out set - {len(X)} random windows, accuracy not reported)")
+    print(f"\nArtifact: {model.optimized_path} ({os.path.getsize(model.optimized_path) / 1e6:.2f} MB)")
+    print(f"Float weights: {os.path.getsize(model.model_path) / 1e6:.2f} MB")
+
+    if y is not None:
+        print(f"\n{'Accuracy float':<24} {np.mean(p_float.argmax(1) == y):.4f}")
+        print(f"{'Accuracy optimized':<24} {np.mean(p_opt.argmax(1) == y):.4f}")
+    print(f"{'Top-1 agreement':<24} {np.mean(p_float.argmax(1) == p_opt.argmax(1)):.4f}")
+    print(f"{'Max probability diff':<24} {np.abs(p_float - p_opt).max():.5f}")
+
+    print(f"\n{'Batch':>6} {'Float':>10} {'Optimized':>11} {'Speedup':>9}")
+    for batch_size in (1, 16):
+        float_time = latency_ms(float_network, X, batch_size, args.repeats)
+        opt_time = latency_ms(optimized, X, batch_size, args.repeats)
+        print(f"{batch_size:>6} {float_time:>8.2f}ms {opt_time:>9.2f}ms {float_time / opt_time:>8.2f}x")
+    print("=" * 64 + "\n")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Reference Spectral Subtraction
+The original whole-signal NoiseProfiler denoising, kept as the baseline for
+benchmarks. Its noise spectrum only lines up with chunks of the length used
+during calibration.
+"""
+import numpy as np
+
+
+def reference_noise_spectrum(noise_samples: list, percentile: float = 75) -> np.ndarray:
+    """Noise spectrum as calibrated before the frame-based profile"""
+    spectrums = [np.abs(np.fft.rfft(sample)) for sample in noise_samples]
+    min_len = min(len(s) for s in spectrums)
+    return np.percentile(np.array([s[:min_len] for s in spectrums]), percentile, axis=0)
+
+
+def reference_denoise(audio: np.ndarray, noise_spectrum: np.ndarray) -> np.ndarray:
+    """Spectral subtraction as implemented before the STFT overlap-add version"""
+    stft = np.fft.rfft(audio)
+
+    # Ensure same length
+    noise_len = len(noise_spectrum)
+    stft_len = len(stft)
+    min_len = min(noise_len, stft_len)
+
+    # Spectral subtraction
+    magnitude = np.abs(stft[:min_len])
+    phase = np.angle(stft[:min_len])
+    noise_mag = noise_spectrum[:min_len]
+
+    # Subtract noise with flooring
+    clean_magnitude = np.maximum(magnitude - noise_mag * 1.5, magnitude * 0.1)
+
+    # Reconstruct
+    clean_stft = clean_magnitude * np.exp(1j * phase)
+
+    # Pad back to original length if needed
+    if stft_len > min_len:
+        clean_stft = np.pad(clean_stft, (0, stft_len - min_len))
+
+    clean_audio = np.fft.irfft(clean_stft, n=len(audio))
+    return clean_audio.astype(np.float32)
@@ -0,0 +1,111 @@
+"""
+Reference Feature Pipeline
+The original three-transform feature extraction (separate MFCC, STFT and
+list-based RMS framing), kept as the baseline for parity tests and benchmarks
+"""
+import numpy as np
+import torch
+import torchaudio.transforms as T
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AudioConfig
+
+
+class ReferenceFeatureExtractor:
+    """Feature extraction as implemented before the fused single-STFT pipeline"""
+
+    def __init__(self):
+        self.sample_rate = AudioConfig.SAMPLE_RATE
+        self.n_mfcc = AudioConfig.N_MFCC
+        self.n_fft = AudioConfig.N_FFT
+        self.hop_length = AudioConfig.HOP_LENGTH
+        self.n_mels = AudioConfig.N_MELS
+        self.fmax = AudioConfig.FMAX
+
+        self.mfcc_transform = T.MFCC(
+            sample_rate=self.sample_rate,
+            n_mfcc=self.n_mfcc,
+            melkwargs={
+                'n_fft': self.n_fft,
+                'hop_length': self.hop_length,
+                'n_mels': self.n_mels,
+                'f_max': self.fmax
+            }
+        )
+
+    def _compute_delta(self, features: np.ndarray, order: int = 1) -> np.ndarray:
+        if order == 1:
+            padded = np.pad(features, ((0, 0), (1, 1)), mode='edge')
+            return (padded[:, 2:] - padded[:, :-2]) / 2
+        return self._compute_delta(self._compute_delta(features, 1), 1)
+
+    def extract_mfcc(self, audio: np.ndarray) -> np.ndarray:
+        mfcc = self.mfcc_transform(torch.FloatTensor(audio).unsqueeze(0)).squeeze(0).numpy()
+        return np.vstack([mfcc, self._compute_delta(mfcc, 1), self._compute_delta(mfcc, 2)])
+
+    def extract_spectral_features(self, audio: np.ndarray) -> dict:
+        features = {}
+        spectrogram = torch.stft(
+            torch.FloatTensor(audio),
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
+            window=torch.hann_window(self.n_fft),
+            return_complex=True
+        )
+        magnitude = torch.abs(spectrogram).numpy()
+        freqs = np.fft.rfftfreq(self.n_fft, 1/self.sample_rate)[:magnitude.shape[0]]
+
+        norm = magnitude.sum(axis=0) + 1e-8
+        features['spectral_centroid'] = np.sum(freqs[:, None] * magnitude, axis=0) / norm
+        centroid = features['spectral_centroid']
+        features['spectral_bandwidth'] = np.sqrt(
+            np.sum(((freqs[:, None] - centroid) ** 2) * magnitude, axis=0) / norm
+        )
+
+        cumsum = np.cumsum(magnitude, axis=0)
+        rolloff_idx = np.argmax(cumsum >= 0.85 * cumsum[-1], axis=0)
+        features['spectral_rolloff'] = freqs[np.clip(rolloff_idx, 0, len(freqs)-1)]
+
+        zcr = np.abs(np.diff(np.sign(audio))).sum() / len(audio)
+        features['zero_crossing_rate'] = np.full(magnitude.shape[1], zcr)
+
+        frame_length = self.n_fft
+        frames = np.array([audio[i:i+frame_length] for i in range(0, len(audio)-frame_length+1, self.hop_length)])
+        if len(frames) > 0:
+            rms = np.sqrt(np.mean(frames**2, axis=1))
+            if len(rms) < magnitude.shape[1]:
+                rms = np.pad(rms, (0, magnitude.shape[1] - len(rms)), mode='edge')
+            else:
+                rms = rms[:magnitude.shape[1]]
+            features['rms'] = rms
+        else:
+            features['rms'] = np.zeros(magnitude.shape[1])
+
+        n_bands = 7
+        band_size = magnitude.shape[0] // n_bands
+        contrast = []
+        for i in range(n_bands):
+            band = magnitude[i*band_size:(i+1)*band_size]
+            if band.size > 0:
+                contrast.append(np.max(band, axis=0) - np.min(band, axis=0))
+        features['spectral_contrast'] = np.array(contrast)
+
+        return features
+
+    def extract_all_features(self, audio: np.ndarray) -> np.ndarray:
+        mfcc_features = self.extract_mfcc(audio)
+        spectral = self.extract_spectral_features(audio)
+
+        spectral_combined = np.vstack([
+            spectral['spectral_centroid'].reshape(1, -1),
+            spectral['spectral_bandwidth'].reshape(1, -1),
+            spectral['spectral_rolloff'].reshape(1, -1),
+            spectral['zero_crossing_rate'].reshape(1, -1),
+            spectral['rms'].reshape(1, -1),
+            spectral['spectral_contrast']
+        ])
+
+        min_time = min(mfcc_features.shape[1], spectral_combined.shape[1])
+        return np.vstack([mfcc_features[:, :min_time], spectral_combined[:, :min_time]])
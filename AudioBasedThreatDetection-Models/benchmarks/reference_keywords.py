@@ -0,0 +1,65 @@
+"""
+Reference Keyword Matching
+The original per-keyword regex loop of SpeechThreatDetector.detect_threats,
+kept as the baseline for parity tests and benchmarks
+"""
+import re
+from typing import Dict, List, Tuple
+
+
+def reference_match(text: str, english_threats: List[str], english_profanity: List[str],
+                    sinhala_threats: List[str], sinhala_profanity: List[str]) -> Tuple[List[Dict], float]:
+    """Keyword matching as implemented before the compiled KeywordMatcher"""
+    text_lower = text.lower()
+    detected_keywords = []
+    threat_score = 0.0
+
+    # Check English threats - use word boundary matching for better accuracy
+    for threat in english_threats:
+        threat_lower = threat.lower()
+        # Use word boundaries for single words, substring match for phrases
+        if ' ' in threat_lower:
+            # Multi-word phrase - use substring match
+            if threat_lower in text_lower:
+                detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'english'})
+                # Higher score for severe threats
+                if any(word in threat_lower for word in ['kill', 'murder', 'die', 'shoot', 'gun', 'bomb']):
+                    threat_score += 0.5
+                else:
+                    threat_score += 0.3
+        else:
+            # Single word - use word boundary
+            if re.search(r'\b' + re.escape(threat_lower) + r'\b', text_lower):
+                detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'english'})
+                if any(word in threat_lower for word in ['kill', 'murder', 'die', 'shoot', 'gun', 'bomb']):
+                    threat_score += 0.5
+                else:
+                    threat_score += 0.3
+
+    # Also check individual dangerous words with word boundaries
+    dangerous_words = ['kill', 'murder', 'shoot', 'gun', 'bomb', 'weapon', 'stab', 'hurt', 'attack']
+    for word in dangerous_words:
+        if re.search(r'\b' + re.escape(word) + r'\b', text_lower) and not any(word in kw['keyword'].lower() for kw in detected_keywords):
+            detected_keywords.append({'keyword': word, 'type': 'threat', 'language': 'english'})
+            threat_score += 0.4
+
+    # Check English profanity with word boundaries
+    for profanity in english_profanity:
+        if re.search(r'\b' + re.escape(profanity) + r'\b', text_lower):
+            detected_keywords.append({'keyword': profanity, 'type': 'profanity', 'language': 'english'})
+            threat_score += 0.15
+
+    # Check Sinhala threats - use substring matching (Sinhala doesn't have clear word boundaries)
+    for threat in sinhala_threats:
+        if threat in text:
+            detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'sinhala'})
+            # Higher score for Sinhala threats (they're more specific)
+            threat_score += 0.45
+
+    # Check Sinhala profanity
+    for profanity in sinhala_profanity:
+        if profanity in text:
+            detected_keywords.append({'keyword': profanity, 'type': 'profanity', 'language': 'sinhala'})
+            threat_score += 0.15
+
+    return detected_keywords, threat_score
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Resampling Benchmark
+Cost of converting 44.1 kHz and 48 kHz audio to 16 kHz, per second of audio,
+in 2 s chunks as the streaming and upload paths see it:
+
+    torchaudio, new Resample per chunk   the previous per-call path
+    torchaudio, cached Resample          kernel built once
+    cached kernel, per chunk             utils.resampler.resample
+    streaming                            utils.resampler.StreamingResampler
+
+The edge error column is the largest difference from converting the whole
+signal at once; resampling chunks independently distorts their edges.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+import torchaudio
+
+from utils.resampler import ResampleKernel, StreamingResampler, resample
+
+
+def make_signal(duration: float, sample_rate: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 0.05, len(t))).astype(np.float32)
+
+
+def torch_resample(resampler, chunk: np.ndarray) -> np.ndarray:
+    return resampler(torch.from_numpy(chunk).unsqueeze(0)).squeeze(0).numpy()
+
+
+def run(convert, chunks: list, repeats: int) -> tuple:
+    """Best total time over repeats, and the concatenated output of the last run"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = [convert(chunk) for chunk in chunks]
+        best = min(best, time.perf_counter() - start)
+    return best, np.concatenate(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resampling benchmark")
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds of audio per rate')
+    parser.add_argument('--chunk', type=float, default=2.0, help='Chunk length in seconds')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per path (best is reported)')
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    target = 16000
+
+    print("\n" + "=" * 78)
+    print("   RESAMPLING BENCHMARK")
+    print("=" * 78)
+    print(f"\n{args.duration:.0f}s of audio in {args.chunk:.1f}s chunks, best of {args.repeats}, 1 thread\n")
+
+    for source in (44100, 48000):
+        audio = make_signal(args.duration, source)
+        step = int(args.chunk * source)
+        chunks = [audio[i:i + step] for i in range(0, len(audio), step)]
+        reference = resample(audio, source, target)
+
+        cached_torch = torchaudio.transforms.Resample(source, target)
+        start = time.perf_counter()
+        ResampleKernel(source, target)
+        kernel_ms = (time.perf_counter() - start) * 1000
+
+        def streaming(chunk, stream=StreamingResampler(source, target), last=chunks[-1]):
+            out = stream.push(chunk)
+            return np.concatenate([out, stream.flush()]) if chunk is last else out
+
+        paths = [
+            ('torchaudio, new Resample per chunk',
+             lambda chunk: torch_resample(torchaudio.transforms.Resample(source, target), chunk)),
+            ('torchaudio, cached Resample', lambda chunk: torch_resample(cached_torch, chunk)),
+            ('cached kernel, per chunk', lambda chunk: resample(chunk, source, target)),
+            ('streaming', streaming)
+        ]
+
+        print(f"{source} Hz -> {target} Hz (kernel build {kernel_ms:.2f}ms, once per rate pair)")
+        print(f"  {'Path':<36} {'ms / s audio':>12} {'x realtime':>11} {'Edge error':>11}")
+        for name, convert in paths:
+            seconds, output = run(convert, chunks, args.repeats)
+            per_second = seconds / args.duration * 1000
+            n = min(len(output), len(reference))
+            edge_error = float(np.max(np.abs(output[:n] - reference[:n])))
+            print(f"  {name:<36} {per_second:>10.3f}ms {args.duration / seconds:>10.0f}x {edge_error:>11.2e}")
+        print()
+
+    print("=" * 78 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,14 @@ class AudioConfig:
     HOP_LENGTH = 512
     N_MELS = 128
     FMAX = 8000
+    # Session streams keep STFT frame state so overlapping chunks only transform new samples
+    STREAMING_FEATURES = os.environ.get('STREAMING_FEATURES', 'True').lower() == 'true'
+    # Streams re-score the model every RESCORE_HOP seconds over buffered frames (0 = once per chunk)
+    RESCORE_HOP = float(os.environ.get('RESCORE_HOP', 0.5))
+    CONTEXT_SECONDS = float(os.environ.get('CONTEXT_SECONDS', 2.0))  # frame history kept beyond one window
+    # Rates and channel counts accepted for raw PCM input (X-Sample-Rate / X-Channels, /stream, /ws)
+    INPUT_SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000, 88200, 96000)
+    MAX_INPUT_CHANNELS = 8
 
 # Model Configuration
 class ModelConfig:
@@ -41,6 +49,45 @@ class ModelConfig:
     # Latency Target (seconds)
     MAX_LATENCY = 3.0
 
+    # Micro-batched inference (chunks from concurrent requests share one forward pass)
+    INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', 'True').lower() == 'true'
+    INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', 16))
+    INFERENCE_MAX_WAIT = float(os.environ.get('INFERENCE_MAX_WAIT', 0.01))  # seconds
+
+    # Dedicated inference executor: the model only runs on these worker threads.
+    # INFERENCE_THREADS is torch's intra-op thread count per worker (0 = cores / workers)
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 1))
+    INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', 0))
+
+    # TorchScript artifact (BatchNorm folded, int8 LSTM/Linear) from models.model_export;
+    # preferred over the float model when it matches the current weights
+    OPTIMIZED_MODEL_PATH = MODELS_DIR / "non_speech_threat_model_optimized.pt"
+    USE_OPTIMIZED_MODEL = os.environ.get('USE_OPTIMIZED_MODEL', 'True').lower() == 'true'
+
+# Speech Transcription Configuration
+class SpeechConfig:
+    # Transcription runs on a worker pool; the non-speech result is never held up by it
+    ASYNC_TRANSCRIPTION = os.environ.get('ASYNC_TRANSCRIPTION', 'True').lower() == 'true'
+    TRANSCRIPTION_WORKERS = int(os.environ.get('TRANSCRIPTION_WORKERS', 4))
+    MAX_PENDING = int(os.environ.get('TRANSCRIPTION_MAX_PENDING', 32))  # jobs in flight before rejecting
+    LANGUAGES = [('english', 'en-US'), ('sinhala', 'si-LK')]  # passes run concurrently
+    CALL_TIMEOUT = 2.5  # seconds per recognizer call
+    MERGE_DEADLINE = 1.0  # seconds to wait for speech before returning it as pending
+    CACHE_SIZE = 256  # transcriptions cached by audio fingerprint
+    RESULT_TTL = 60  # seconds a finished job stays retrievable
+    # 'google' (online, English + Sinhala) or 'vosk' (offline, streaming per session)
+    ASR_BACKEND = os.environ.get('ASR_BACKEND', 'google').lower()
+    VOSK_MODEL_PATH = Path(os.environ.get('VOSK_MODEL_PATH', MODELS_DIR / 'vosk-model-small-en-us'))
+
+# Spoken Language Routing Configuration
+class LanguageIDConfig:
+    # Transcribe a chunk in one language when it is confidently English or Sinhala, else in both
+    ENABLED = os.environ.get('LANGUAGE_ROUTING', 'True').lower() == 'true'
+    MODEL_PATH = Path(os.environ.get('LANGUAGE_ID_PATH', MODELS_DIR / 'language_id.json'))
+    CONFIDENCE = float(os.environ.get('LANGUAGE_ROUTE_CONFIDENCE', 0.8))
+    PRIOR_DECAY = 0.9  # weight of a session's older transcriptions per new one
+    EXPLORE_EVERY = 8  # single-language chunks before a session is transcribed in both again
+
 # Threat Keywords for Speech Detection
 class ThreatKeywords:
     # ============================================================================
@@ -316,9 +363,84 @@ class FlaskConfig:
 # Noise Profiling Configuration
 class NoiseConfig:
     ADAPTIVE_THRESHOLD = True
-    NOISE_FLOOR_SAMPLES = 50
-    NOISE_UPDATE_INTERVAL = 10  # seconds
+    NOISE_FLOOR_SAMPLES = 50  # the running noise estimate follows about this many recent samples
+    NOISE_UPDATE_INTERVAL = 10  # seconds between background re-calibrations
+    RECALIBRATE_MARGIN_DB = 3  # background re-calibration only takes chunks within this of the floor
+    RECALIBRATE_MIN_RMS = 1e-4  # quieter chunks (muted mic, zero padding) are not room noise
+    AUTO_RECALIBRATE = os.environ.get('NOISE_AUTO_RECALIBRATE', 'True').lower() == 'true'
+    PROFILE_DIR = Path(os.environ.get('NOISE_PROFILE_DIR', str(BASE_DIR / 'noise_profiles')))  # per location
     SNR_MINIMUM = 12  # dB - Increased from 10 to reduce false positives from ambient noise
+    DENOISE_N_FFT = 512  # spectral subtraction frame; hop is half of it
+    OVER_SUBTRACTION = 1.5  # noise magnitude multiplier
+    SPECTRAL_FLOOR = 0.1  # keep at least this fraction of each bin's magnitude
+
+# Detection Session Configuration
+class SessionConfig:
+    SESSION_TTL = int(os.environ.get('SESSION_TTL', 900))  # seconds idle before a session is evicted
+    MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 500))
+    SWEEP_INTERVAL = 30  # seconds between expiry sweeps
+
+# Long Recording Scan Configuration
+class ScanConfig:
+    # Server-side recordings may only be read from these directories
+    ALLOWED_DIRS = [
+        Path(p) for p in os.environ.get('AUDIO_SCAN_DIRS', str(BASE_DIR / 'recordings')).split(os.pathsep) if p
+    ]
+    BATCH_SIZE = 64  # chunks per forward pass
+    MAX_BATCH_SIZE = 256  # largest ?batch_size a request may ask for
+    BLOCK_DURATION = 60.0  # seconds of audio read from disk at a time
+
+# Threat Keyword Lexicon Configuration
+class LexiconConfig:
+    # Versioned JSON lexicon; the ThreatKeywords lists are used when the file is absent
+    LEXICON_PATH = Path(os.environ.get('THREAT_LEXICON_PATH', str(BASE_DIR / 'config' / 'threat_lexicon.json')))
+    POLL_INTERVAL = float(os.environ.get('LEXICON_POLL_INTERVAL', 5.0))  # seconds between file checks
+
+# Streaming Decoder Pool Configuration
+class DecoderConfig:
+    BACKEND = os.environ.get('DECODER_BACKEND', 'auto')  # auto, pyav, ffmpeg or oneshot
+    FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+    MAX_STREAMS = int(os.environ.get('DECODER_MAX_STREAMS', 200))
+    IDLE_TTL = 120  # seconds before an unused stream decoder is closed
+    FEED_TIMEOUT = 1.0  # max seconds to wait for a chunk to decode
+    OUTPUT_IDLE = 0.01  # ffmpeg backend: output quiet this long means the chunk is done
+
+# Detection Gating Cascade Configuration
+class CascadeConfig:
+    # energy/SNR -> spectral-statistics gate -> CNN-LSTM; ASR only on voice activity
+    ENABLED = os.environ.get('CASCADE_ENABLED', 'True').lower() == 'true'
+    SPECTRAL_THRESHOLD = float(os.environ.get('CASCADE_SPECTRAL_THRESHOLD', 0.35))
+    SPECTRAL_GATE_PATH = MODELS_DIR / "spectral_gate.json"  # fitted gate weights, if present
+    VAD_GATES_ASR = os.environ.get('CASCADE_VAD_GATES_ASR', 'True').lower() == 'true'
+    VAD_MIN_SPEECH_RATIO = float(os.environ.get('VAD_MIN_SPEECH_RATIO', 0.1))  # voiced fraction of frames
+    VAD_ENERGY_RATIO = 3.0  # voiced frames are this many times the noise floor RMS
+    VAD_SPEECH_BAND = (80, 4000)  # Hz, voice fundamentals and formants
+    VAD_BAND_RATIO = 0.6  # min fraction of frame power in the speech band
+    VAD_MAX_FLATNESS = 0.4  # noise-like frames are flatter than this
+
+# Training Feature Cache Configuration
+class FeatureCacheConfig:
+    # Per-file feature windows as .npy shards keyed by file content hash and feature settings
+    CACHE_DIR = Path(os.environ.get('FEATURE_CACHE_DIR', str(BASE_DIR / 'feature_cache')))
+    WORKERS = int(os.environ.get('FEATURE_CACHE_WORKERS', 0))  # extraction processes for misses (0 = cores)
+    TARGET_LENGTH = 128  # frames per window
+
+# Streaming Training Data Configuration
+class TrainingDataConfig:
+    # DataLoader processes that read shards or decode and augment clips (0 = the training process)
+    LOADER_WORKERS = int(os.environ.get('TRAIN_LOADER_WORKERS', 2))
+    SEED = int(os.environ.get('TRAIN_SEED', 0))  # shuffling and augmentation are reproducible per seed
+    WINDOWS_PER_FILE = 1  # random crops drawn from each clip per epoch
+    SHIFT_SECONDS = 0.5  # a crop may start up to this far before or past the clip's ends
+    NOISE_PROBABILITY = 0.5  # chance of mixing in a noise clip
+    NOISE_SNR_DB = (0.0, 20.0)
+    NORMALIZATION_ITEMS = 2048  # windows sampled for the feature mean/std
+
+# Metrics Configuration
+class MetricsConfig:
+    # Counters and stage histograms for /metrics; per-request spans are opt-in (?trace=true)
+    ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    TRACE_STAGES = os.environ.get('TRACE_STAGES', 'False').lower() == 'true'  # spans on every result
 
 # Create directories
 os.makedirs(MODELS_DIR, exist_ok=True)
@@ -0,0 +1,127 @@
+"""
+Optimized Model Export
+Builds a CPU inference artifact from the trained CNN-LSTM: BatchNorm folded
+into the preceding Conv1d/Linear layers, dropout dropped, LSTM and Linear
+layers dynamically quantized to int8, saved as TorchScript together with
+the fingerprint of the float weights it was built from.
+
+    python -m models.model_export                 # quantized artifact
+    python -m models.model_export --no-quantize   # BatchNorm folding only
+"""
+from typing import Dict
+import copy
+import json
+import time
+import os
+import sys
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval, fuse_linear_bn_eval
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.non_speech_model import CNNLSTMNetwork, FoldedConv1d, NonSpeechThreatModel
+
+
+def _fuse_folded_conv_bn(folded: FoldedConv1d, bn: nn.BatchNorm1d) -> FoldedConv1d:
+    """BatchNorm after a normalization-folded conv: fuse the conv and rescale its edge corrections"""
+    fused = copy.deepcopy(folded)
+    fused.conv = fuse_conv_bn_eval(folded.conv, bn)
+    scale = (bn.weight / torch.sqrt(bn.running_var + bn.eps)).detach()
+    fused.left_correction = folded.left_correction * scale
+    fused.right_correction = folded.right_correction * scale
+    return fused
+
+
+def _fuse_sequential(block: nn.Sequential) -> nn.Sequential:
+    """Fold every BatchNorm1d into the Conv1d/Linear before it and drop Dropout layers"""
+    layers = list(block)
+    fused = []
+    i = 0
+    while i < len(layers):
+        layer = layers[i]
+        following = layers[i + 1] if i + 1 < len(layers) else None
+
+        if isinstance(following, nn.BatchNorm1d) and isinstance(layer, (FoldedConv1d, nn.Conv1d, nn.Linear)):
+            if isinstance(layer, FoldedConv1d):
+                fused.append(_fuse_folded_conv_bn(layer, following))
+            elif isinstance(layer, nn.Conv1d):
+                fused.append(fuse_conv_bn_eval(layer, following))
+            else:
+                fused.append(fuse_linear_bn_eval(layer, following))
+            i += 2
+        elif isinstance(layer, nn.Dropout):
+            i += 1
+        else:
+            fused.append(layer)
+            i += 1
+    return nn.Sequential(*fused)
+
+
+def fuse_batchnorm(network: CNNLSTMNetwork) -> CNNLSTMNetwork:
+    """Eval-mode copy of the network with BatchNorm folded away"""
+    network = copy.deepcopy(network).cpu().eval()
+    for name in ('conv1', 'conv2', 'conv3', 'fc'):
+        setattr(network, name, _fuse_sequential(getattr(network, name)))
+    network.lstm.dropout = 0.0
+    return network
+
+
+def optimize_network(model: NonSpeechThreatModel, quantize: bool = True) -> nn.Module:
+    """Float inference network (normalization folded) -> fused, optionally int8, TorchScript module"""
+    network = copy.deepcopy(model.model).cpu().eval()
+    if model.uses_global_normalization:
+        network.fold_input_normalization(torch.as_tensor(model.feature_mean), torch.as_tensor(model.feature_std))
+
+    network = fuse_batchnorm(network)
+    if quantize:
+        network = torch.ao.quantization.quantize_dynamic(network, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+    with torch.no_grad():
+        return torch.jit.script(network)
+
+
+def export_optimized(model: NonSpeechThreatModel, path: str = None, quantize: bool = True) -> Dict:
+    """Export the saved float model as the optimized artifact; returns its metadata"""
+    if not os.path.exists(model.model_path):
+        raise FileNotFoundError(f"No trained model at {model.model_path}")
+    if model.model is None:
+        model.load_model()
+
+    path = str(path or model.optimized_path)
+    scripted = optimize_network(model, quantize=quantize)
+    info = {
+        'weights_fingerprint': model.weights_fingerprint(),
+        'normalization': model.uses_global_normalization,
+        'quantized': quantize,
+        'classes': list(model.classes),
+        'input_shape': list(model.input_shape),
+        'torch_version': torch.__version__,
+        'exported_at': time.time()
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    torch.jit.save(scripted, path, _extra_files={'metadata.json': json.dumps(info)})
+    return info
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the optimized CPU inference model")
+    parser.add_argument('--output', default=None, help='Artifact path (default: ModelConfig.OPTIMIZED_MODEL_PATH)')
+    parser.add_argument('--no-quantize', action='store_true', help='Fold BatchNorm only, keep float32 weights')
+    args = parser.parse_args()
+
+    model = NonSpeechThreatModel()
+    if not model.load_model():
+        print(f"No trained model found at {model.model_path}. Run 'python run_training.py' first.")
+        sys.exit(1)
+
+    info = export_optimized(model, args.output, quantize=not args.no_quantize)
+    print(f"Exported optimized model to {args.output or model.optimized_path}")
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == '__main__':
+    main()
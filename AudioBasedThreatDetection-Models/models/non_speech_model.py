@@ -3,6 +3,9 @@ Non-Speech Threat Detection Model
 1D-CNN + LSTM architecture for detecting non-verbal threat sounds
 Using PyTorch for better Python 3.12+ compatibility
 """
+import copy
+import hashlib
+import json
 import numpy as np
 import torch
 import torch.nn as nn
@@ -14,6 +17,48 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import ModelConfig, AudioConfig
 
 
+class FoldedConv1d(nn.Module):
+    """
+    Conv1d with an input normalization (x - mean) / std folded into its weights.
+
+    Zero padding of normalized input corresponds to padding raw input with the
+    mean, which the folded weights cannot see; the missing contribution of the
+    padded taps is added back on the first and last output frames.
+    """
+
+    def __init__(self, conv: nn.Conv1d, mean: torch.Tensor, std: torch.Tensor):
+        super(FoldedConv1d, self).__init__()
+        pad = conv.padding[0]
+        if conv.stride[0] != 1 or conv.dilation[0] != 1 or conv.kernel_size[0] != 2 * pad + 1:
+            raise ValueError("Only stride-1, 'same'-padded convolutions can be folded")
+
+        self.conv = copy.deepcopy(conv)
+        self.pad = pad
+        with torch.no_grad():
+            scale = (1.0 / std).to(conv.weight)
+            # Contribution of each tap to the mean shift: (out, in, k) summed over in
+            shift = (conv.weight * (mean.to(conv.weight) * scale)[None, :, None]).sum(dim=1)
+
+            self.conv.weight.mul_(scale[None, :, None])
+            if self.conv.bias is None:
+                self.conv.bias = nn.Parameter(torch.zeros(conv.out_channels, device=conv.weight.device))
+            self.conv.bias.sub_(shift.sum(dim=1))
+
+        # (pad, out) corrections: output frame i at each edge misses taps that fell in the padding
+        empty = shift.new_zeros(0, conv.out_channels)
+        left = torch.stack([shift[:, :pad - i].sum(dim=1) for i in range(pad)]) if pad else empty
+        right = torch.stack([shift[:, pad + 1 + i:].sum(dim=1) for i in range(pad)]) if pad else empty
+        self.register_buffer('left_correction', left)
+        self.register_buffer('right_correction', right)
+
+    def forward(self, x):
+        out = self.conv(x)
+        if self.pad:
+            out[:, :, :self.pad] += self.left_correction.T
+            out[:, :, -self.pad:] += self.right_correction.T
+        return out
+
+
 class CNNLSTMNetwork(nn.Module):
     """PyTorch 1D-CNN + LSTM architecture"""
 
@@ -92,6 +137,10 @@ class CNNLSTMNetwork(nn.Module):
         out = self.fc(combined)
         return out
 
+    def fold_input_normalization(self, mean: torch.Tensor, std: torch.Tensor) -> None:
+        """Fold per-feature (x - mean) / std into the first convolution, so raw features go in"""
+        self.conv1[0] = FoldedConv1d(self.conv1[0], mean, std)
+
 
 class NonSpeechThreatModel:
     """1D-CNN + LSTM model for non-speech threat detection"""
@@ -104,6 +153,15 @@ class NonSpeechThreatModel:
         self.input_shape = (128, 132)  # (time_steps, features) - 40 MFCC * 3 + 12 spectral
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
+        # Dataset-level per-feature statistics, saved next to the weights.
+        # Models trained without them are fed per-chunk z-scored features.
+        self.normalization_path = self.model_path.replace('.pth', '_normalization.npz')
+        self.feature_mean = None
+        self.feature_std = None
+        self._inference_model = None  # copy of self.model with the normalization folded in
+        self.optimized_path = str(ModelConfig.OPTIMIZED_MODEL_PATH)
+        self.optimized_info = None  # metadata of the loaded optimized artifact, if any
+
     def build_model(self, input_features: int = None) -> nn.Module:
         """Build 1D-CNN + LSTM architecture"""
         if input_features is None:
@@ -113,15 +171,98 @@ class NonSpeechThreatModel:
             input_features=input_features,
             num_classes=self.num_classes
         ).to(self.device)
+        self._inference_model = None
+        self.optimized_info = None
         return self.model
 
+    @property
+    def uses_global_normalization(self) -> bool:
+        """True when predictions take raw features (normalized inside the model)"""
+        return self.feature_mean is not None
+
+    @staticmethod
+    def compute_normalization(X: np.ndarray) -> tuple:
+        """Per-feature mean and std over all windows and frames of (n, time_steps, features) data"""
+        X = np.asarray(X, dtype=np.float64)
+        mean = X.mean(axis=(0, 1))
+        std = X.std(axis=(0, 1)) + 1e-8
+        return mean.astype(np.float32), std.astype(np.float32)
+
+    def set_normalization(self, mean: np.ndarray, std: np.ndarray) -> None:
+        self.feature_mean = np.asarray(mean, dtype=np.float32)
+        self.feature_std = np.asarray(std, dtype=np.float32)
+        self._inference_model = None
+        self.optimized_info = None
+
+    def weights_fingerprint(self) -> str:
+        """Hash of the saved weights and normalization files"""
+        digest = hashlib.sha256()
+        for path in (self.model_path, self.normalization_path):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    def load_optimized(self) -> bool:
+        """
+        Use the exported TorchScript artifact for predictions if it was built
+        from the weights currently on disk (CPU only)
+        """
+        if not os.path.exists(self.optimized_path) or self.device.type != 'cpu':
+            return False
+
+        extra_files = {'metadata.json': ''}
+        try:
+            module = torch.jit.load(self.optimized_path, map_location='cpu', _extra_files=extra_files)
+            info = json.loads(extra_files['metadata.json'])
+        except (RuntimeError, ValueError) as e:
+            print(f"Ignoring optimized model {self.optimized_path}: {e}")
+            return False
+
+        if info.get('weights_fingerprint') != self.weights_fingerprint() or \
+                info.get('normalization') != self.uses_global_normalization:
+            print(f"Ignoring optimized model {self.optimized_path}: exported from different weights")
+            return False
+
+        module.eval()
+        self._inference_model = module
+        self.optimized_info = info
+        return True
+
+    def _get_inference_model(self) -> nn.Module:
+        """Eval-mode network for predictions, with the normalization folded in"""
+        if self._inference_model is None:
+            model = self.model
+            if self.uses_global_normalization:
+                model = copy.deepcopy(self.model)
+                model.fold_input_normalization(
+                    torch.as_tensor(self.feature_mean, device=self.device),
+                    torch.as_tensor(self.feature_std, device=self.device)
+                )
+            model.eval()
+            self._inference_model = model
+        return self._inference_model
+
     def train(self, X_train: np.ndarray, y_train: np.ndarray,
               X_val: np.ndarray = None, y_val: np.ndarray = None,
-              epochs: int = None, batch_size: int = None) -> dict:
-        """Train the model with class balancing and label smoothing"""
+              epochs: int = None, batch_size: int = None,
+              normalize: bool = True) -> dict:
+        """
+        Train the model with class balancing and label smoothing.
+
+        With normalize, per-feature mean/std are computed over X_train, applied to
+        the training and validation data and saved with the model, so inference
+        takes raw features.
+        """
         if self.model is None:
             self.build_model()
 
+        if normalize:
+            self.set_normalization(*self.compute_normalization(X_train))
+            X_train = (X_train - self.feature_mean) / self.feature_std
+            if X_val is not None:
+                X_val = (X_val - self.feature_mean) / self.feature_std
+
         epochs = epochs or ModelConfig.EPOCHS
         batch_size = batch_size or ModelConfig.BATCH_SIZE
 
@@ -133,14 +274,65 @@ class NonSpeechThreatModel:
         train_dataset = TensorDataset(X_train_t, y_train_t)
         train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
 
+        val_batches = None
         if X_val is not None:
             X_val_t = torch.FloatTensor(X_val).to(self.device)
             y_val_t = torch.LongTensor(np.argmax(y_val, axis=1)).to(self.device)
+            val_batches = [(X_val_t, y_val_t)]
+
+        return self._fit(train_loader, np.bincount(y_train_labels), val_batches, epochs)
+
+    def train_streaming(self, train_dataset, val_dataset=None,
+                        epochs: int = None, batch_size: int = None,
+                        workers: int = None, seed: int = None,
+                        normalize: bool = True) -> dict:
+        """
+        Train from datasets of (window, class index) items (utils.training_data),
+        loaded and augmented in DataLoader worker processes instead of held in
+        memory. With normalize, mean/std are estimated from a sample of training
+        windows and applied to each batch.
+        """
+        from utils.training_data import feature_statistics, make_loader
+
+        if self.model is None:
+            self.build_model()
+
+        batch_size = batch_size or ModelConfig.BATCH_SIZE
+        if normalize:
+            self.set_normalization(*feature_statistics(train_dataset, workers=workers, seed=seed))
+
+        # A final batch of one window cannot be batch-normalized in training mode
+        train_loader = make_loader(train_dataset, batch_size, shuffle=True, workers=workers, seed=seed,
+                                   drop_last=len(train_dataset) % batch_size == 1)
+        val_loader = None
+        if val_dataset is not None:
+            val_loader = make_loader(val_dataset, batch_size, workers=workers, seed=seed)
+
+        class_counts = np.bincount(np.asarray(train_dataset.labels), minlength=self.num_classes)
+        set_epoch = getattr(train_dataset, 'set_epoch', None)
+        return self._fit(train_loader, class_counts, val_loader, epochs or ModelConfig.EPOCHS,
+                         normalize_batches=normalize, before_epoch=set_epoch)
+
+    def _fit(self, train_loader, class_counts: np.ndarray, val_batches=None, epochs: int = 1,
+             normalize_batches: bool = False, before_epoch=None) -> dict:
+        """
+        Epoch loop shared by train and train_streaming. val_batches is any
+        re-iterable of (x, y) batches; with normalize_batches, batches hold raw
+        features and are normalized here.
+        """
+        def prepare(batch_x, batch_y):
+            batch_x, batch_y = batch_x.to(self.device), batch_y.to(self.device)
+            if normalize_batches:
+                batch_x = (batch_x - mean_t) / std_t
+            return batch_x, batch_y
+
+        if normalize_batches:
+            mean_t = torch.as_tensor(self.feature_mean, device=self.device)
+            std_t = torch.as_tensor(self.feature_std, device=self.device)
 
         # Calculate class weights to handle imbalanced data
-        class_counts = np.bincount(y_train_labels)
-        total_samples = len(y_train_labels)
-        class_weights = total_samples / (len(class_counts) * class_counts)
+        total_samples = int(class_counts.sum())
+        class_weights = total_samples / (len(class_counts) * np.maximum(class_counts, 1))
         class_weights = torch.FloatTensor(class_weights).to(self.device)
 
         print(f"\nClass distribution:")
@@ -157,10 +349,13 @@ class NonSpeechThreatModel:
         patience_counter = 0
 
         for epoch in range(epochs):
+            if before_epoch is not None:
+                before_epoch(epoch)
             self.model.train()
             total_loss, correct, total = 0, 0, 0
 
             for batch_x, batch_y in train_loader:
+                batch_x, batch_y = prepare(batch_x, batch_y)
                 optimizer.zero_grad()
                 outputs = self.model(batch_x)
                 loss = criterion(outputs, batch_y)
@@ -178,10 +373,15 @@ class NonSpeechThreatModel:
             history['accuracy'].append(train_acc)
 
             # Validation
-            if X_val is not None:
+            if val_batches is not None:
                 self.model.eval()
+                val_outputs, val_labels = [], []
                 with torch.no_grad():
-                    val_outputs = self.model(X_val_t)
+                    for batch_x, batch_y in val_batches:
+                        batch_x, batch_y = prepare(batch_x, batch_y)
+                        val_outputs.append(self.model(batch_x))
+                        val_labels.append(batch_y)
+                    val_outputs, y_val_t = torch.cat(val_outputs), torch.cat(val_labels)
                     val_loss = criterion(val_outputs, y_val_t).item()
                     _, val_pred = torch.max(val_outputs, 1)
                     val_acc = (val_pred == y_val_t).sum().item() / len(y_val_t)
@@ -205,29 +405,44 @@ class NonSpeechThreatModel:
             else:
                 print(f'Epoch {epoch+1}/{epochs} - Loss: {train_loss:.4f} - Acc: {train_acc:.4f}')
 
+        self._inference_model = None
+        self.optimized_info = None
         return history
 
     def predict(self, features: np.ndarray) -> tuple:
         """Predict threat class and confidence"""
+        if features.ndim == 2:
+            features = np.expand_dims(features, axis=0)
+
+        return self.predict_batch(features)[0]
+
+    def predict_batch(self, features: np.ndarray) -> list:
+        """
+        Predict threat class and confidence for a batch of feature windows.
+
+        Args:
+            features: Array of shape (batch, time_steps, features)
+
+        Returns:
+            List of (class_name, confidence, probabilities) tuples, one per window
+        """
         if self.model is None:
             if not self.load_model():
                 self.build_model()
 
-        self.model.eval()
-
-        if features.ndim == 2:
-            features = np.expand_dims(features, axis=0)
+        model = self._get_inference_model()
 
         with torch.no_grad():
-            x = torch.FloatTensor(features).to(self.device)
-            outputs = self.model(x)
-            probabilities = torch.softmax(outputs, dim=1)[0].cpu().numpy()
+            x = torch.as_tensor(features, dtype=torch.float32).to(self.device)
+            outputs = model(x)
+            probabilities = torch.softmax(outputs, dim=1).cpu().numpy()
 
-        class_idx = np.argmax(probabilities)
-        confidence = float(probabilities[class_idx])
-        class_name = self.classes[class_idx]
+        results = []
+        for probs in probabilities:
+            class_idx = int(np.argmax(probs))
+            results.append((self.classes[class_idx], float(probs[class_idx]), probs.tolist()))
 
-        return class_name, confidence, probabilities.tolist()
+        return results
 
     def load_model(self) -> bool:
         """Load trained model from file"""
@@ -235,14 +450,26 @@ class NonSpeechThreatModel:
             self.build_model()
             self.model.load_state_dict(torch.load(self.model_path, map_location=self.device))
             self.model.eval()
+
+            self.feature_mean = self.feature_std = None
+            if os.path.exists(self.normalization_path):
+                stats = np.load(self.normalization_path)
+                self.set_normalization(stats['mean'], stats['std'])
+
+            if ModelConfig.USE_OPTIMIZED_MODEL and self.load_optimized():
+                print(f"Using optimized model: {self.optimized_path}")
             return True
         return False
 
     def save_model(self) -> None:
-        """Save model to file"""
+        """Save model (and its normalization statistics) to file"""
         if self.model is not None:
             os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
             torch.save(self.model.state_dict(), self.model_path)
+            if self.uses_global_normalization:
+                np.savez(self.normalization_path, mean=self.feature_mean, std=self.feature_std)
+            elif os.path.exists(self.normalization_path):
+                os.remove(self.normalization_path)
 
     def get_model_summary(self) -> str:
         """Get model architecture summary"""
@@ -0,0 +1,266 @@
+"""
+Detection Session State Module
+Mutable per-session detection state, kept apart from the read-only models
+so that one ThreatDetector can be shared by every caller
+"""
+from collections import deque
+from typing import Dict, List, Optional
+import copy
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SessionConfig
+from utils.noise_profiler import NoiseProfiler
+from utils.language_id import LanguagePrior
+
+
+# Sensitivity presets: 'low' (fewer false positives), 'normal', 'high' (more sensitive)
+SENSITIVITY_PRESETS = {
+    'low': {
+        # Minimal false positives - only very clear threats
+        'consecutive_required': 4,
+        'class_thresholds': {
+            'crying': 0.88,
+            'screaming': 0.98,
+            'shouting': 0.99,
+            'glass_breaking': 0.85,
+            'normal': 0.0
+        },
+        'min_energy_threshold': 0.08,
+        'high_energy_threshold': 0.35
+    },
+    'normal': {
+        # Balanced
+        'consecutive_required': 3,  # Must detect threat 3 times in a row
+        'class_thresholds': {
+            'crying': 0.82,       # Lowered from 0.88 - crying is often quieter
+            'screaming': 0.96,    # Increased from 0.94 - very high to prevent false positives
+            'shouting': 0.97,     # Increased from 0.95 - very high to prevent false positives from normal talking
+            'glass_breaking': 0.78,  # Lowered from 0.85 - distinctive sound, should be easier to detect
+            'normal': 0.0         # Always allow normal
+        },
+        'min_energy_threshold': 0.05,   # Ignore very low energy
+        'high_energy_threshold': 0.30   # Screaming/shouting needs high energy
+    },
+    'high': {
+        # More sensitive, some false positives possible
+        'consecutive_required': 2,
+        'class_thresholds': {
+            'crying': 0.75,
+            'screaming': 0.90,
+            'shouting': 0.92,
+            'glass_breaking': 0.70,
+            'normal': 0.0
+        },
+        'min_energy_threshold': 0.03,
+        'high_energy_threshold': 0.20
+    }
+}
+
+
+class DetectionState:
+    """
+    Per-session detection state: consecutive-detection history,
+    noise profile and sensitivity settings.
+    """
+
+    def __init__(self, sensitivity: str = 'normal', session_id: Optional[str] = None):
+        self.session_id = session_id
+        self.location_id: Optional[str] = None  # camera/microphone whose noise profile this session uses
+        self.started_at = time.time()
+        self.last_seen = self.started_at
+        self.chunks_processed = 0
+        self.alerts_count = 0
+        self.lock = threading.Lock()
+
+        self.noise_profiler = NoiseProfiler()
+
+        # Consecutive detection tracking (reduces false positives); long enough
+        # for the re-scored windows that make up consecutive_required chunks
+        self.detection_history: deque = deque(maxlen=32)
+
+        # Incremental feature state for continuous streams (created on first use)
+        self.feature_stream = None
+        self.asr_stream = None  # per-session Vosk recognizer in offline ASR mode
+        self.language_prior = LanguagePrior()  # languages this session's speech came back in
+
+        self.sensitivity = 'normal'
+        self.consecutive_required = 3
+        self.class_thresholds: Dict[str, float] = {}
+        self.min_energy_threshold = 0.05
+        self.high_energy_threshold = 0.30
+        self.set_sensitivity(sensitivity)
+
+    def set_sensitivity(self, level: str = 'normal') -> Dict:
+        """Apply a sensitivity preset and return the resulting settings"""
+        preset = SENSITIVITY_PRESETS.get(level, SENSITIVITY_PRESETS['normal'])
+
+        self.sensitivity = level if level in SENSITIVITY_PRESETS else 'normal'
+        self.consecutive_required = preset['consecutive_required']
+        self.class_thresholds = copy.deepcopy(preset['class_thresholds'])
+        self.min_energy_threshold = preset['min_energy_threshold']
+        self.high_energy_threshold = preset['high_energy_threshold']
+
+        return self.get_sensitivity_settings()
+
+    def get_sensitivity_settings(self) -> Dict:
+        """Get current sensitivity settings"""
+        return {
+            'consecutive_required': self.consecutive_required,
+            'class_thresholds': self.class_thresholds,
+            'min_energy_threshold': self.min_energy_threshold,
+            'high_energy_threshold': self.high_energy_threshold
+        }
+
+    def record_detection(self, class_name: str, is_threat: bool, weight: float = 1.0) -> bool:
+        """
+        Append a detection to the history and check for consecutive confirmation.
+        weight is the fraction of a chunk the detection stands for (a re-scored
+        window counts RESCORE_HOP / CHUNK_DURATION). Returns True only if the
+        same threat class was detected in a row over consecutive_required chunks.
+        """
+        with self.lock:
+            self.detection_history.append({
+                'class': class_name,
+                'is_threat': is_threat,
+                'weight': weight
+            })
+
+            if not is_threat:
+                return False
+
+            # Count recent consecutive threat detections of the same class
+            consecutive_count = 0.0
+            for detection in reversed(self.detection_history):
+                if detection['is_threat'] and detection['class'] == class_name:
+                    consecutive_count += detection.get('weight', 1.0)
+                else:
+                    break
+
+            return consecutive_count >= self.consecutive_required - 1e-9
+
+    def reset_history(self) -> None:
+        """Clear consecutive-detection history"""
+        with self.lock:
+            self.detection_history.clear()
+
+    def touch(self) -> None:
+        """Mark the session as active"""
+        self.last_seen = time.time()
+
+    def get_summary(self) -> Dict:
+        """Get session counters"""
+        return {
+            'session_id': self.session_id,
+            'location_id': self.location_id,
+            'duration': round(time.time() - self.started_at, 2),
+            'alerts_count': self.alerts_count,
+            'chunks_processed': self.chunks_processed,
+            'sensitivity': self.sensitivity,
+            'noise_calibrated': self.noise_profiler.is_calibrated
+        }
+
+
+class SessionStateStore:
+    """
+    DetectionState objects keyed by session_id.
+    Idle sessions expire after SESSION_TTL seconds and the store never holds
+    more than MAX_SESSIONS; the least recently seen session is evicted first.
+    Lookups of existing sessions do not take the store lock.
+    """
+
+    def __init__(self, ttl: float = None, max_sessions: int = None):
+        self.ttl = SessionConfig.SESSION_TTL if ttl is None else ttl
+        self.max_sessions = max_sessions or SessionConfig.MAX_SESSIONS
+        self.sweep_interval = SessionConfig.SWEEP_INTERVAL
+
+        self._sessions: Dict[str, DetectionState] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.evicted_count = 0
+
+    def get(self, session_id: str, create: bool = True) -> Optional[DetectionState]:
+        """Return the session's state, creating it if missing and create is True"""
+        self._maybe_sweep()
+
+        state = self._sessions.get(session_id)
+        if state is not None:
+            if self._is_expired(state, time.time()):
+                self.remove(session_id)
+                state = None
+            else:
+                state.touch()
+                return state
+
+        return self.create(session_id, replace=False) if create else None
+
+    def create(self, session_id: str, sensitivity: str = 'normal', replace: bool = True) -> DetectionState:
+        """
+        Create (or replace) the state for a session. With replace=False a live
+        state that another request created in the meantime is returned instead.
+        """
+        state = DetectionState(sensitivity=sensitivity, session_id=session_id)
+
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if not replace and existing is not None and not self._is_expired(existing, time.time()):
+                existing.touch()
+                return existing
+            if session_id not in self._sessions and len(self._sessions) >= self.max_sessions:
+                self._evict_expired_locked(time.time())
+                if len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+                    del self._sessions[oldest.session_id]
+                    self.evicted_count += 1
+            self._sessions[session_id] = state
+
+        return state
+
+    def remove(self, session_id: str) -> Optional[DetectionState]:
+        """Remove a session and return its final state"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def list_states(self) -> List[DetectionState]:
+        """Snapshot of active (non-expired) session states"""
+        now = time.time()
+        return [s for s in list(self._sessions.values()) if not self._is_expired(s, now)]
+
+    def evict_expired(self) -> int:
+        """Drop sessions idle for longer than the TTL"""
+        with self._lock:
+            return self._evict_expired_locked(time.time())
+
+    def _is_expired(self, state: DetectionState, now: float) -> bool:
+        return self.ttl > 0 and now - state.last_seen > self.ttl
+
+    def _evict_expired_locked(self, now: float) -> int:
+        expired = [sid for sid, s in self._sessions.items() if self._is_expired(s, now)]
+        for sid in expired:
+            del self._sessions[sid]
+        self.evicted_count += len(expired)
+        self._last_sweep = now
+        return len(expired)
+
+    def _maybe_sweep(self) -> None:
+        """Periodic expiry sweep, at most once per sweep_interval"""
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.evict_expired()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict:
+        """Get store statistics"""
+        return {
+            'active_sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'ttl': self.ttl,
+            'evicted': self.evicted_count
+        }
@@ -5,11 +5,13 @@ Speech-to-text with threat keyword detection for English and Sinhala
 import numpy as np
 import os
 import sys
-import re
+import threading
 from typing import Dict, List, Tuple, Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import ThreatKeywords, ModelConfig
+from config import ModelConfig, SpeechConfig
+from utils.lexicon_store import get_lexicon_store
+from models.streaming_asr import StreamingRecognizer
 
 # Try to import speech recognition libraries
 try:
@@ -25,11 +27,32 @@ try:
 except ImportError:
     VOSK_AVAILABLE = False
 
+# Vosk models are large; each model directory is loaded once per process
+_vosk_models: Dict[str, object] = {}
+_vosk_lock = threading.Lock()
+
+
+def load_vosk_model(model_path) -> Optional[object]:
+    """Shared Vosk model for a directory, or None if Vosk or the model is missing"""
+    model_path = str(model_path)
+    if not VOSK_AVAILABLE or not os.path.isdir(model_path):
+        return None
+
+    with _vosk_lock:
+        if model_path not in _vosk_models:
+            try:
+                _vosk_models[model_path] = VoskModel(model_path)
+                print(f"[Speech] Loaded Vosk model from {model_path}")
+            except Exception as e:
+                print(f"[Speech] Could not load Vosk model from {model_path}: {e}")
+                _vosk_models[model_path] = None
+        return _vosk_models[model_path]
+
 
 class SpeechThreatDetector:
     """Speech-to-text with threat keyword detection"""
 
-    def __init__(self):
+    def __init__(self, lexicon_store=None):
         self.recognizer = None
         if SPEECH_RECOGNITION_AVAILABLE:
             self.recognizer = sr.Recognizer()
@@ -39,130 +62,226 @@ class SpeechThreatDetector:
             self.recognizer.pause_threshold = 0.6  # Reduced from 0.8 for faster response
             self.recognizer.phrase_threshold = 0.3  # Minimum seconds of speaking audio before phrase
             self.recognizer.non_speaking_duration = 0.5  # Seconds of non-speaking audio to keep on both sides
+            self.recognizer.operation_timeout = SpeechConfig.CALL_TIMEOUT  # Per-call deadline
 
-        self.vosk_model = None
-        self.english_threats = [t.lower() for t in ThreatKeywords.ENGLISH_THREATS]
-        self.sinhala_threats = ThreatKeywords.SINHALA_THREATS
-        self.english_profanity = [t.lower() for t in ThreatKeywords.PROFANITY_ENGLISH]
-        self.sinhala_profanity = ThreatKeywords.PROFANITY_SINHALA
+        self.vosk_model = load_vosk_model(SpeechConfig.VOSK_MODEL_PATH)
         self.threshold = ModelConfig.SPEECH_THREAT_THRESHOLD
-        
-    def transcribe_audio(self, audio_data: np.ndarray, sample_rate: int = 16000) -> Dict:
-        """Convert audio to text using multiple engines"""
-        results = {
-            'text': '',
-            'language': 'unknown',
-            'confidence': 0.0,
-            'engine': 'none',
-            'error': None
-        }
 
+        # Keyword lexicon (compiled matcher), shared and hot-reloaded
+        self.lexicon_store = lexicon_store or get_lexicon_store()
+
+        # Offline mode: every transcription runs locally on the Vosk model
+        self.asr_backend = SpeechConfig.ASR_BACKEND
+        self.offline = self.asr_backend == 'vosk' and self.vosk_model is not None
+        if self.asr_backend == 'vosk' and not self.offline:
+            print(f"[Speech] WARNING: ASR_BACKEND=vosk but no Vosk model at "
+                  f"{SpeechConfig.VOSK_MODEL_PATH}; using Google recognition")
+
+    @property
+    def lexicon(self):
+        """The active keyword lexicon"""
+        return self.lexicon_store.get()
+
+    @property
+    def keyword_matcher(self):
+        return self.lexicon.matcher
+
+    @property
+    def english_threats(self) -> List[str]:
+        return self.lexicon.english_threats
+
+    @property
+    def english_profanity(self) -> List[str]:
+        return self.lexicon.english_profanity
+
+    @property
+    def sinhala_threats(self) -> List[str]:
+        return self.lexicon.sinhala_threats
+
+    @property
+    def sinhala_profanity(self) -> List[str]:
+        return self.lexicon.sinhala_profanity
+        
+    def prepare_audio(self, audio_data: np.ndarray, sample_rate: int = 16000) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """
+        Check length and energy and normalize audio for recognition.
+        Returns (normalized_audio, None), or (None, error) if it should not be transcribed.
+        """
         # Check minimum audio length (need at least 1.5 seconds for reliable transcription)
         min_samples = int(sample_rate * 1.5)  # 1.5 second minimum
         if len(audio_data) < min_samples:
-            results['error'] = f'Audio too short ({len(audio_data)/sample_rate:.1f}s < 1.5s)'
-            return results
+            return None, f'Audio too short ({len(audio_data)/sample_rate:.1f}s < 1.5s)'
 
         # Check if audio has enough energy (not silence)
         audio_energy = float(np.sqrt(np.mean(audio_data ** 2)))
         if audio_energy < 0.005:
-            results['error'] = 'Silence detected'
-            return results
+            return None, 'Silence detected'
 
         # Normalize audio for better recognition
         max_val = np.max(np.abs(audio_data))
         if max_val > 0:
             audio_data = audio_data / max_val * 0.9  # Normalize to 90% to avoid clipping
 
-        # Try Google Speech Recognition first
-        if SPEECH_RECOGNITION_AVAILABLE:
+        return audio_data, None
+
+    def recognize_language(self, audio_data: np.ndarray, sample_rate: int, language_code: str) -> Optional[str]:
+        """
+        One Google recognition pass over normalized audio.
+        Returns the text, or None if the speech was not understood; raises on API errors.
+        """
+        if not SPEECH_RECOGNITION_AVAILABLE:
+            raise RuntimeError('Speech recognition not available')
+
+        # Convert numpy array to AudioData (16-bit PCM)
+        audio_int16 = (audio_data * 32767).astype(np.int16)
+        audio = sr.AudioData(audio_int16.tobytes(), sample_rate, 2)  # 2 bytes per sample
+
+        try:
+            return self.recognizer.recognize_google(audio, language=language_code, show_all=False) or None
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise RuntimeError(f'Google API error: {str(e)}')
+
+    def combine_transcriptions(self, english_text: Optional[str], sinhala_text: Optional[str],
+                               english_error: Optional[str] = None,
+                               sinhala_error: Optional[str] = None) -> Dict:
+        """Merge the English and Sinhala passes into one transcription result"""
+        if english_text and sinhala_text:
+            combined_text = f"{english_text} {sinhala_text}"
+            print(f"[Speech] Transcribed (Mixed): '{combined_text}'")
+            return {
+                'text': combined_text,
+                'language': 'mixed',
+                'confidence': 0.8,
+                'engine': 'google',
+                'error': None
+            }
+        if english_text:
+            print(f"[Speech] Transcribed (English): '{english_text}'")
+            return {
+                'text': english_text,
+                'language': 'english',
+                'confidence': 0.85,
+                'engine': 'google',
+                'error': None
+            }
+        if sinhala_text:
+            print(f"[Speech] Transcribed (Sinhala): '{sinhala_text}'")
+            return {
+                'text': sinhala_text,
+                'language': 'sinhala',
+                'confidence': 0.82,  # Slightly higher confidence for Sinhala
+                'engine': 'google',
+                'error': None
+            }
+        return {
+            'text': '',
+            'language': 'unknown',
+            'confidence': 0.0,
+            'engine': 'none',
+            'error': sinhala_error or english_error or 'Could not understand audio in English or Sinhala'
+        }
+
+    def recognize_vosk(self, audio_data: np.ndarray, sample_rate: int = 16000) -> Optional[Dict]:
+        """Offline Vosk fallback; returns a transcription result or None"""
+        if not (VOSK_AVAILABLE and self.vosk_model):
+            return None
+        try:
+            rec = KaldiRecognizer(self.vosk_model, sample_rate)
+            audio_bytes = (audio_data * 32767).astype(np.int16).tobytes()
+            rec.AcceptWaveform(audio_bytes)
+            vosk_result = json.loads(rec.FinalResult())
+            if vosk_result.get('text'):
+                return {
+                    'text': vosk_result['text'],
+                    'language': 'english',
+                    'confidence': 0.7,
+                    'engine': 'vosk',
+                    'error': None
+                }
+        except Exception:
+            pass  # Vosk is optional fallback
+        return None
+
+    def create_stream(self, sample_rate: int = 16000) -> StreamingRecognizer:
+        """New per-session streaming recognizer on the shared Vosk model"""
+        if not (VOSK_AVAILABLE and self.vosk_model):
+            raise RuntimeError('Vosk model not loaded')
+        return StreamingRecognizer(KaldiRecognizer(self.vosk_model, sample_rate), sample_rate)
+
+    def analyze_stream(self, stream: StreamingRecognizer, audio_data: np.ndarray) -> Dict:
+        """
+        Feed a session's new audio to its streaming recognizer and match the
+        current utterance's transcript. Only keywords not already reported
+        for this utterance count as a threat.
+        """
+        text, final = stream.accept(audio_data)
+        transcription = {
+            'text': text,
+            'language': 'english',
+            'confidence': 0.7,
+            'engine': 'vosk-stream',
+            'error': None,
+            'final': final
+        }
+
+        result = self.analyze_transcription(transcription)
+        threat_analysis = result['threat_analysis']
+        threat_analysis['detected_keywords'] = stream.new_keywords(
+            threat_analysis['detected_keywords'], final
+        )
+        if not threat_analysis['detected_keywords']:
+            threat_analysis.update({'is_threat': False, 'threat_level': 'none', 'threat_score': 0.0})
+            result.update({'is_threat': False, 'threat_level': 'none', 'threat_score': 0.0})
+        return result
+
+    def transcribe_audio(self, audio_data: np.ndarray, sample_rate: int = 16000,
+                         languages: Optional[List[str]] = None) -> Dict:
+        """
+        Convert audio to text using multiple engines (English then Sinhala, in this thread).
+        languages restricts the Google passes to some of SpeechConfig.LANGUAGES.
+        """
+        audio_data, error = self.prepare_audio(audio_data, sample_rate)
+        if error:
+            return {
+                'text': '',
+                'language': 'unknown',
+                'confidence': 0.0,
+                'engine': 'none',
+                'error': error
+            }
+
+        if self.offline:
+            return self.recognize_vosk(audio_data, sample_rate) or {
+                'text': '',
+                'language': 'unknown',
+                'confidence': 0.0,
+                'engine': 'vosk',
+                'error': 'Could not understand audio'
+            }
+
+        # Try BOTH English and Sinhala unless routed to one (to catch mixed language)
+        texts, errors = {}, {}
+        for language, code in SpeechConfig.LANGUAGES:
+            if languages is not None and language not in languages:
+                continue
             try:
-                # Convert numpy array to AudioData (16-bit PCM)
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                audio_bytes = audio_int16.tobytes()
-                audio = sr.AudioData(audio_bytes, sample_rate, 2)  # 2 bytes per sample
-
-                # Try BOTH English and Sinhala in parallel for better detection
-                english_text = None
-                sinhala_text = None
-
-                # Try English first
-                try:
-                    english_text = self.recognizer.recognize_google(audio, language='en-US', show_all=False)
-                    if english_text:
-                        results = {
-                            'text': english_text,
-                            'language': 'english',
-                            'confidence': 0.85,
-                            'engine': 'google',
-                            'error': None
-                        }
-                        print(f"[Speech] Transcribed (English): '{english_text}'")
-                except sr.UnknownValueError:
-                    pass  # Try Sinhala
-                except sr.RequestError as e:
-                    results['error'] = f'Google API error: {str(e)}'
-                except Exception as e:
-                    results['error'] = f'English transcription failed: {str(e)}'
-
-                # Try Sinhala (always try, even if English succeeded, to catch mixed language)
-                try:
-                    sinhala_text = self.recognizer.recognize_google(audio, language='si-LK', show_all=False)
-                    if sinhala_text:
-                        # If we got both, combine them
-                        if english_text:
-                            combined_text = f"{english_text} {sinhala_text}"
-                            results = {
-                                'text': combined_text,
-                                'language': 'mixed',
-                                'confidence': 0.8,
-                                'engine': 'google',
-                                'error': None
-                            }
-                            print(f"[Speech] Transcribed (Mixed): '{combined_text}'")
-                        else:
-                            results = {
-                                'text': sinhala_text,
-                                'language': 'sinhala',
-                                'confidence': 0.82,  # Slightly higher confidence for Sinhala
-                                'engine': 'google',
-                                'error': None
-                            }
-                            print(f"[Speech] Transcribed (Sinhala): '{sinhala_text}'")
-                except sr.UnknownValueError:
-                    if not english_text:
-                        results['error'] = 'Could not understand audio in English or Sinhala'
-                except sr.RequestError as e:
-                    if not english_text:
-                        results['error'] = f'Google API error: {str(e)}'
-                except Exception as e:
-                    if not english_text:
-                        results['error'] = f'Sinhala transcription failed: {str(e)}'
+                texts[language] = self.recognize_language(audio_data, sample_rate, code)
             except Exception as e:
-                results['error'] = f'Speech recognition error: {str(e)}'
-        else:
-            results['error'] = 'Speech recognition not available'
+                texts[language], errors[language] = None, str(e)
+
+        results = self.combine_transcriptions(
+            texts.get('english'), texts.get('sinhala'),
+            errors.get('english'), errors.get('sinhala')
+        )
 
         # Fallback to Vosk for offline recognition
-        if not results['text'] and VOSK_AVAILABLE and self.vosk_model:
-            try:
-                rec = KaldiRecognizer(self.vosk_model, sample_rate)
-                audio_bytes = (audio_data * 32767).astype(np.int16).tobytes()
-                rec.AcceptWaveform(audio_bytes)
-                vosk_result = json.loads(rec.FinalResult())
-                if vosk_result.get('text'):
-                    results = {
-                        'text': vosk_result['text'],
-                        'language': 'english',
-                        'confidence': 0.7,
-                        'engine': 'vosk',
-                        'error': None
-                    }
-            except Exception as e:
-                pass  # Vosk is optional fallback
+        if not results['text']:
+            results = self.recognize_vosk(audio_data, sample_rate) or results
 
         return results
-    
+
     def detect_threats(self, text: str, language: str = 'english') -> Dict:
         """Detect threatening content in transcribed text"""
         if not text:
@@ -173,57 +292,9 @@ class SpeechThreatDetector:
                 'threat_score': 0.0
             }
 
-        text_lower = text.lower()
-        detected_keywords = []
-        threat_score = 0.0
-
-        # Check English threats - use word boundary matching for better accuracy
-        for threat in self.english_threats:
-            threat_lower = threat.lower()
-            # Use word boundaries for single words, substring match for phrases
-            if ' ' in threat_lower:
-                # Multi-word phrase - use substring match
-                if threat_lower in text_lower:
-                    detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'english'})
-                    # Higher score for severe threats
-                    if any(word in threat_lower for word in ['kill', 'murder', 'die', 'shoot', 'gun', 'bomb']):
-                        threat_score += 0.5
-                    else:
-                        threat_score += 0.3
-            else:
-                # Single word - use word boundary
-                if re.search(r'\b' + re.escape(threat_lower) + r'\b', text_lower):
-                    detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'english'})
-                    if any(word in threat_lower for word in ['kill', 'murder', 'die', 'shoot', 'gun', 'bomb']):
-                        threat_score += 0.5
-                    else:
-                        threat_score += 0.3
-
-        # Also check individual dangerous words with word boundaries
-        dangerous_words = ['kill', 'murder', 'shoot', 'gun', 'bomb', 'weapon', 'stab', 'hurt', 'attack']
-        for word in dangerous_words:
-            if re.search(r'\b' + re.escape(word) + r'\b', text_lower) and not any(word in kw['keyword'].lower() for kw in detected_keywords):
-                detected_keywords.append({'keyword': word, 'type': 'threat', 'language': 'english'})
-                threat_score += 0.4
-
-        # Check English profanity with word boundaries
-        for profanity in self.english_profanity:
-            if re.search(r'\b' + re.escape(profanity) + r'\b', text_lower):
-                detected_keywords.append({'keyword': profanity, 'type': 'profanity', 'language': 'english'})
-                threat_score += 0.15
-
-        # Check Sinhala threats - use substring matching (Sinhala doesn't have clear word boundaries)
-        for threat in self.sinhala_threats:
-            if threat in text:
-                detected_keywords.append({'keyword': threat, 'type': 'threat', 'language': 'sinhala'})
-                # Higher score for Sinhala threats (they're more specific)
-                threat_score += 0.45
-
-        # Check Sinhala profanity
-        for profanity in self.sinhala_profanity:
-            if profanity in text:
-                detected_keywords.append({'keyword': profanity, 'type': 'profanity', 'language': 'sinhala'})
-                threat_score += 0.15
+        # Single pass over the transcript with the active lexicon's compiled automata
+        lexicon = self.lexicon
+        detected_keywords, threat_score = lexicon.matcher.match(text)
 
         # Cap threat score at 1.0
         threat_score = min(threat_score, 1.0)
@@ -248,12 +319,15 @@ class SpeechThreatDetector:
             'threat_score': threat_score
         }
     
-    def analyze_audio(self, audio_data: np.ndarray, sample_rate: int = 16000) -> Dict:
+    def analyze_audio(self, audio_data: np.ndarray, sample_rate: int = 16000,
+                      languages: Optional[List[str]] = None) -> Dict:
         """Full pipeline: transcribe audio and detect threats"""
         # Transcribe
-        transcription = self.transcribe_audio(audio_data, sample_rate)
-        
-        # Detect threats
+        transcription = self.transcribe_audio(audio_data, sample_rate, languages)
+        return self.analyze_transcription(transcription)
+
+    def analyze_transcription(self, transcription: Dict) -> Dict:
+        """Detect threats in a transcription result"""
         threat_analysis = self.detect_threats(
             transcription['text'], 
             transcription['language']
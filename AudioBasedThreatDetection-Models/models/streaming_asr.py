@@ -0,0 +1,69 @@
+"""
+Streaming Offline ASR
+One incremental Vosk recognizer per detection session. Each chunk's new
+samples are fed as they arrive and the current utterance's partial (or
+final) transcript is returned for keyword matching.
+"""
+from typing import Dict, List, Set, Tuple
+import json
+
+import numpy as np
+
+
+class StreamingRecognizer:
+    """
+    Wraps a KaldiRecognizer fed continuously with 16-bit PCM.
+
+    Keywords are reported once per utterance: a keyword already found in an
+    earlier partial of the same utterance is not reported again when the
+    partial grows or becomes final.
+    """
+
+    def __init__(self, recognizer, sample_rate: int = 16000):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.contiguous = False  # False until fed, and after a gap in the stream
+
+        self.samples_fed = 0
+        self.utterances = 0
+        self._reported: Set[Tuple[str, str, str]] = set()
+
+    def accept(self, audio_data: np.ndarray) -> Tuple[str, bool]:
+        """Feed new samples; returns (text of the current utterance, is_final)"""
+        audio_int16 = (np.clip(audio_data, -1.0, 1.0) * 32767).astype(np.int16)
+        self.samples_fed += len(audio_int16)
+        self.contiguous = True
+
+        if self.recognizer.AcceptWaveform(audio_int16.tobytes()):
+            self.utterances += 1
+            return json.loads(self.recognizer.Result()).get('text', ''), True
+        return json.loads(self.recognizer.PartialResult()).get('partial', ''), False
+
+    def new_keywords(self, detected_keywords: List[Dict], final: bool) -> List[Dict]:
+        """Keywords not yet reported in this utterance"""
+        new = []
+        for keyword in detected_keywords:
+            key = (keyword['keyword'], keyword['type'], keyword['language'])
+            if key not in self._reported:
+                self._reported.add(key)
+                new.append(keyword)
+
+        if final:
+            self._reported.clear()
+        return new
+
+    def mark_gap(self) -> None:
+        """Skipped chunks were not fed, so the next chunk is fed whole"""
+        self.contiguous = False
+
+    def reset(self) -> None:
+        """Drop the current utterance"""
+        self.recognizer.Reset()
+        self._reported.clear()
+        self.contiguous = False
+
+    def get_stats(self) -> Dict:
+        return {
+            'seconds_fed': round(self.samples_fed / self.sample_rate, 2),
+            'utterances': self.utterances
+        }
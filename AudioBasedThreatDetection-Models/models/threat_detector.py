@@ -5,18 +5,198 @@ Professional-grade detection with false positive reduction
 """
 import numpy as np
 import time
+import queue
+import threading
+from concurrent.futures import Future
 from typing import Dict, Optional, Tuple, List
 from collections import deque
 import os
 import sys
+import torch
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import ModelConfig, AudioConfig
+from config import ModelConfig, AudioConfig, SpeechConfig, CascadeConfig, MetricsConfig
 from utils.audio_processor import AudioProcessor
-from utils.feature_extractor import FeatureExtractor
-from utils.noise_profiler import NoiseProfiler
+from utils.feature_extractor import FeatureExtractor, StreamingFeatureExtractor
 from models.non_speech_model import NonSpeechThreatModel
 from models.speech_threat_model import SpeechThreatDetector
+from models.session_state import DetectionState, SessionStateStore
+from models.transcription_service import TranscriptionService
+from utils.gating import CascadeStats, ChunkSpectrum, SpectralGate, VoiceActivityDetector
+from utils.language_id import LanguageRouter
+from utils.noise_profiler import NoiseProfileStore
+from utils.metrics import DetectorMetrics, StageTimer, get_registry
+
+
+def inference_thread_count(workers: int = None) -> int:
+    """Torch intra-op threads per inference worker, so that workers x threads fits the cores"""
+    if ModelConfig.INFERENCE_THREADS > 0:
+        return ModelConfig.INFERENCE_THREADS
+    workers = workers or ModelConfig.INFERENCE_WORKERS
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+class BatchInferenceEngine:
+    """
+    Micro-batching inference service for the non-speech model.
+    Collects feature windows submitted by concurrent requests over a short
+    window and runs them through the CNN-LSTM in one batched forward pass.
+
+    The model only runs on the engine's worker threads, each limited to
+    threads_per_worker intra-op threads, so concurrent requests queue for a
+    worker instead of each spawning a full set of torch threads.
+    """
+
+    def __init__(self, model: NonSpeechThreatModel,
+                 max_batch_size: int = None, max_wait: float = None,
+                 workers: int = None, threads_per_worker: int = None):
+        self.model = model
+        self.max_batch_size = max_batch_size or ModelConfig.INFERENCE_MAX_BATCH
+        self.max_wait = ModelConfig.INFERENCE_MAX_WAIT if max_wait is None else max_wait
+        self.num_workers = max(1, workers or ModelConfig.INFERENCE_WORKERS)
+        self.threads_per_worker = threads_per_worker or inference_thread_count(self.num_workers)
+
+        self._queue: queue.Queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Running statistics
+        self.batches_run = 0
+        self.chunks_processed = 0
+        self.total_forward_time = 0.0
+        self.total_queue_wait = 0.0
+        self.last_batch_size = 0
+        self.in_flight = 0
+        self.started_at: Optional[float] = None
+        self._busy_time: List[float] = []
+
+    def _ensure_worker(self) -> None:
+        """Start the worker threads on first use"""
+        with self._lock:
+            if self._workers and all(worker.is_alive() for worker in self._workers):
+                return
+            if self.started_at is None:
+                self.started_at = time.perf_counter()
+                self._busy_time = [0.0] * self.num_workers
+            for index in range(self.num_workers):
+                if index < len(self._workers) and self._workers[index].is_alive():
+                    continue
+                worker = threading.Thread(
+                    target=self._run, args=(index,), name=f'batch-inference-{index}', daemon=True
+                )
+                if index < len(self._workers):
+                    self._workers[index] = worker
+                else:
+                    self._workers.append(worker)
+                worker.start()
+
+    def submit(self, features: np.ndarray) -> Future:
+        """Queue one (time_steps, features) window and return a future for its result"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((features, future, time.perf_counter()))
+        return future
+
+    def predict(self, features: np.ndarray, timeout: float = None) -> Tuple[str, float, list, Dict]:
+        """
+        Predict a single window through the shared batch.
+
+        Returns:
+            (class_name, confidence, probabilities, batch_info)
+        """
+        return self.submit(features).result(timeout=timeout)
+
+    def _collect_batch(self) -> List[Tuple[np.ndarray, Future, float]]:
+        """Block for the first pending chunk, then gather more until full or max_wait elapses"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self, index: int) -> None:
+        """Worker loop: batch pending chunks, run one forward pass, fan results out"""
+        # Process-wide in most torch builds, per-thread in older OpenMP ones
+        torch.set_num_threads(self.threads_per_worker)
+
+        while True:
+            batch = self._collect_batch()
+            futures = [future for _, future, _ in batch]
+            start = time.perf_counter()
+            queue_wait = sum(start - submitted for _, _, submitted in batch)
+
+            with self._stats_lock:
+                self.in_flight += len(batch)
+            try:
+                features = np.stack([item for item, _, _ in batch])
+                predictions = self.model.predict_batch(features)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            finally:
+                forward_time = time.perf_counter() - start
+                with self._stats_lock:
+                    self.in_flight -= len(batch)
+                    self._busy_time[index] += forward_time
+
+            batch_size = len(batch)
+            with self._stats_lock:
+                self.batches_run += 1
+                self.chunks_processed += batch_size
+                self.total_forward_time += forward_time
+                self.total_queue_wait += queue_wait
+                self.last_batch_size = batch_size
+
+            batch_info = self._throughput(batch_size, forward_time)
+            for future, (class_name, confidence, probs) in zip(futures, predictions):
+                future.set_result((class_name, confidence, probs, batch_info))
+
+    def _throughput(self, batch_size: int, forward_time: float) -> Dict:
+        """Throughput figures for one forward pass"""
+        cores = max(self.threads_per_worker, 1)
+        chunks_per_second = batch_size / forward_time if forward_time > 0 else 0.0
+        return {
+            'batch_size': batch_size,
+            'forward_time': round(forward_time, 4),
+            'chunks_per_second': round(chunks_per_second, 2),
+            'chunks_per_second_per_core': round(chunks_per_second / cores, 2)
+        }
+
+    def get_stats(self) -> Dict:
+        """Get aggregate batching, queue and worker utilization statistics"""
+        with self._stats_lock:
+            throughput = self._throughput(self.chunks_processed, self.total_forward_time)
+            elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+            utilization = [round(busy / elapsed, 4) if elapsed > 0 else 0.0 for busy in self._busy_time]
+            avg_queue_wait = self.total_queue_wait / self.chunks_processed if self.chunks_processed else 0.0
+
+            return {
+                'chunks_per_second': throughput['chunks_per_second'],
+                'chunks_per_second_per_core': throughput['chunks_per_second_per_core'],
+                'last_batch_size': self.last_batch_size,
+                'batches_run': self.batches_run,
+                'chunks_processed': self.chunks_processed,
+                'avg_batch_size': round(self.chunks_processed / self.batches_run, 2) if self.batches_run else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait': self.max_wait,
+                'workers': self.num_workers,
+                'threads_per_worker': self.threads_per_worker,
+                'queue_depth': self._queue.qsize(),
+                'in_flight': self.in_flight,
+                'avg_queue_wait_ms': round(avg_queue_wait * 1000, 3),
+                'worker_utilization': utilization,
+                'utilization': round(sum(utilization) / len(utilization), 4) if utilization else 0.0
+            }
 
 
 class ThreatDetector:
@@ -28,7 +208,6 @@ class ThreatDetector:
     def __init__(self):
         self.audio_processor = AudioProcessor()
         self.feature_extractor = FeatureExtractor()
-        self.noise_profiler = NoiseProfiler()
         self.non_speech_model = NonSpeechThreatModel()
         self.speech_detector = SpeechThreatDetector()
 
@@ -37,25 +216,51 @@ class ThreatDetector:
         self.speech_threshold = ModelConfig.SPEECH_THREAT_THRESHOLD
         self.max_latency = ModelConfig.MAX_LATENCY
 
-        # Consecutive detection tracking (reduces false positives)
-        self.detection_history: deque = deque(maxlen=5)
-        self.consecutive_required = 3  # Must detect threat 3 times in a row
-
-        # Energy-based filtering - INCREASED to reduce false positives
-        self.min_energy_threshold = 0.05  # Increased from 0.03 - ignore very low energy
-        self.high_energy_threshold = 0.30  # Increased from 0.20 - screaming/shouting needs high energy
-
-        # Class-specific thresholds - ADJUSTED for better accuracy
-        self.class_thresholds = {
-            'crying': 0.82,       # Lowered from 0.88 - crying is often quieter
-            'screaming': 0.96,    # Increased from 0.94 - very high to prevent false positives
-            'shouting': 0.97,     # Increased from 0.95 - very high to prevent false positives from normal talking
-            'glass_breaking': 0.78,  # Lowered from 0.85 - distinctive sound, should be easier to detect
-            'normal': 0.0         # Always allow normal
-        }
+        # Default session state (history, noise profile, sensitivity) used when
+        # the caller does not supply its own DetectionState
+        self.state = DetectionState()
+
+        # Per-session states keyed by the session_id issued by /api/detection/start
+        self.sessions = SessionStateStore()
+
+        # Noise profiles saved per camera/microphone location
+        self.noise_profiles = NoiseProfileStore()
+
+        # Counters and stage histograms for /metrics
+        self.metrics = DetectorMetrics()
 
         # Load models
         self._load_models()
+
+        # Dedicated inference executor shared by concurrent requests; micro-batching
+        # can be switched off, but the model still only runs on the executor
+        if ModelConfig.INFERENCE_BATCHING:
+            self.inference_engine = BatchInferenceEngine(self.non_speech_model)
+        else:
+            self.inference_engine = BatchInferenceEngine(self.non_speech_model, max_batch_size=1, max_wait=0.0)
+        torch.set_num_threads(self.inference_engine.threads_per_worker)
+
+        # Speech transcription off the request thread (offline recognition is local and stays inline)
+        self.transcription_service = None
+        if SpeechConfig.ASYNC_TRANSCRIPTION and not self.speech_detector.offline:
+            self.transcription_service = TranscriptionService(self.speech_detector)
+
+        # Streams re-score buffered feature frames at a finer hop than the chunk rate
+        self.rescore_hop_frames = int(round(
+            AudioConfig.RESCORE_HOP * AudioConfig.SAMPLE_RATE / self.feature_extractor.hop_length
+        ))
+
+        # Cheap gates in front of the CNN-LSTM and ASR
+        self.cascade_enabled = CascadeConfig.ENABLED
+        self.spectral_gate = SpectralGate.from_config()
+        self.vad = VoiceActivityDetector()
+        self.cascade_stats = CascadeStats()
+
+        # Online ASR runs in one language when the chunk and session make it clear which
+        self.language_router = LanguageRouter()
+
+        if self.metrics.enabled:
+            get_registry().register_collector('detector', self._metric_gauges)
     
     def _load_models(self) -> None:
         """Load pre-trained models if available"""
@@ -77,42 +282,186 @@ class ThreatDetector:
             print(f"Error loading non-speech model: {e}")
             self.non_speech_model.build_model()
     
+    # Default-state accessors (kept for callers that predate DetectionState)
+    @property
+    def noise_profiler(self):
+        return self.state.noise_profiler
+
+    @property
+    def detection_history(self) -> deque:
+        return self.state.detection_history
+
+    @property
+    def consecutive_required(self) -> int:
+        return self.state.consecutive_required
+
+    @property
+    def class_thresholds(self) -> Dict[str, float]:
+        return self.state.class_thresholds
+
+    @property
+    def min_energy_threshold(self) -> float:
+        return self.state.min_energy_threshold
+
+    @property
+    def high_energy_threshold(self) -> float:
+        return self.state.high_energy_threshold
+
     def _calculate_audio_energy(self, audio: np.ndarray) -> float:
         """Calculate RMS energy of audio signal"""
         return float(np.sqrt(np.mean(audio ** 2)))
 
-    def _check_consecutive_detection(self, class_name: str, is_threat: bool) -> bool:
+    def _check_consecutive_detection(self, state: DetectionState,
+                                     class_name: str, is_threat: bool, weight: float = 1.0) -> bool:
         """
         Check if threat was detected consecutively to reduce false positives.
         Returns True only if threat detected multiple times in a row.
         """
-        self.detection_history.append({
-            'class': class_name,
-            'is_threat': is_threat
-        })
+        return state.record_detection(class_name, is_threat, weight)
+
+    def _adaptive_threshold(self, state: DetectionState, class_name: str,
+                            audio_energy: float) -> Tuple[float, float]:
+        """(class threshold, noise- and energy-adjusted threshold) for a predicted class"""
+        # Get class-specific threshold
+        class_threshold = state.class_thresholds.get(class_name, self.non_speech_threshold)
+
+        # Apply adaptive threshold based on noise profile
+        adaptive_threshold = state.noise_profiler.get_adaptive_threshold(class_threshold)
+
+        # Additional check: for screaming/shouting, require MUCH higher energy
+        if class_name in ['screaming', 'shouting']:
+            if audio_energy < state.high_energy_threshold:
+                # Low energy + screaming/shouting prediction = likely false positive
+                # Increase threshold significantly to prevent false positives
+                adaptive_threshold = min(0.99, adaptive_threshold + 0.15)  # Increased from 0.1 to 0.15
+
+            # Additional spectral check: screaming/shouting has different frequency characteristics
+            # than normal speech or fan noise
+            # If energy is borderline, increase threshold even more
+            elif audio_energy < state.high_energy_threshold * 1.3:
+                adaptive_threshold = min(0.98, adaptive_threshold + 0.05)
+
+        return class_threshold, adaptive_threshold
+
+    def _uses_stream(self, state: DetectionState) -> bool:
+        return (AudioConfig.STREAMING_FEATURES and state.session_id is not None
+                and not self.non_speech_model.uses_global_normalization)
+
+    def _window_weight(self, state: DetectionState) -> float:
+        """Fraction of a chunk each scored window counts for in consecutive confirmation"""
+        if self.rescore_hop_frames > 0 and self._uses_stream(state):
+            return AudioConfig.RESCORE_HOP / AudioConfig.CHUNK_DURATION
+        return 1.0
+
+    def _rescore_windows(self, state: DetectionState, features: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """
+        (offset_frames, window) pairs to score for a stream chunk: windows ending
+        every RESCORE_HOP seconds over the chunk's new frames, from the
+        session's frame ring buffer (the newest is `features`)
+        """
+        if self.rescore_hop_frames <= 0:
+            return [(0, features)]
+        return state.feature_stream.recent_windows(self.rescore_hop_frames)
 
-        if not is_threat:
-            return False
+    def _chunk_features(self, state: DetectionState, audio_data: np.ndarray,
+                        processed_audio: np.ndarray, overlap: float) -> Tuple[np.ndarray, List[Tuple[int, np.ndarray]]]:
+        """
+        The chunk's (features, time) window and the windows to score.
 
-        # Count recent consecutive threat detections of the same class
-        consecutive_count = 0
-        for detection in reversed(self.detection_history):
-            if detection['is_threat'] and detection['class'] == class_name:
-                consecutive_count += 1
-            else:
-                break
+        Streamed frames come from un-normalized audio (preprocess_audio's peak
+        normalization and trimming cannot be applied incrementally), so they
+        are only used for models fed per-chunk z-scored features. Models with
+        global normalization take raw features and need the same gain scale
+        as training, so their sessions use the batch path.
+        """
+        if self._uses_stream(state):
+            features = self._stream_features(state, audio_data, overlap)
+            return features, self._rescore_windows(state, features)
+
+        features = self.feature_extractor.extract_fixed_length_features(processed_audio)
+        return features, [(0, features)]
+
+    def _stream_features(self, state: DetectionState, audio_data: np.ndarray,
+                         overlap: float) -> np.ndarray:
+        """
+        Feature window from the session's streaming extractor.
+        Only samples not already seen in the previous chunk are transformed.
+        """
+        if state.feature_stream is None:
+            state.feature_stream = StreamingFeatureExtractor(self.feature_extractor)
+        stream = state.feature_stream
+
+        audio = np.asarray(audio_data, dtype=np.float32)
+        if state.noise_profiler.is_calibrated:
+            audio = state.noise_profiler.denoise_audio(audio)
+
+        if not stream.is_empty and overlap > 0:
+            audio = audio[int(len(audio) * min(overlap, 1.0)):]
+
+        return stream.push(audio)
+
+    def _stream_speech(self, state: DetectionState, audio_data: np.ndarray,
+                       overlap: float) -> Dict:
+        """
+        Speech analysis from the session's streaming Vosk recognizer.
+        Like the feature stream, only samples not fed with the previous chunk are passed on.
+        """
+        if state.asr_stream is None:
+            state.asr_stream = self.speech_detector.create_stream(AudioConfig.SAMPLE_RATE)
+        stream = state.asr_stream
 
-        return consecutive_count >= self.consecutive_required
+        audio = np.asarray(audio_data, dtype=np.float32)
+        if stream.contiguous and overlap > 0:
+            audio = audio[int(len(audio) * min(overlap, 1.0)):]
+
+        return self.speech_detector.analyze_stream(stream, audio)
+
+    def _model_input(self, features: np.ndarray) -> np.ndarray:
+        """
+        (features, time) -> (time, features) model input. Models trained with
+        dataset statistics normalize inside their first convolution; older
+        models get per-chunk z-scored features.
+        """
+        if not self.non_speech_model.uses_global_normalization:
+            features, _, _ = self.feature_extractor.normalize_features(features)
+        return features.T
+
+    def _break_stream(self, state: DetectionState, features: bool = True, speech: bool = True) -> None:
+        """Skipped chunks leave a gap in the stream, so restart framing"""
+        if features and state.feature_stream is not None:
+            state.feature_stream.reset()
+        if speech and state.asr_stream is not None:
+            state.asr_stream.mark_gap()
+
+    def mark_gap(self, state: Optional[DetectionState]) -> None:
+        """A chunk of the session was dropped before analysis (e.g. silent or still buffering)"""
+        if state is not None:
+            self._break_stream(state)
 
     def analyze_audio(self, audio_data: np.ndarray,
                       enable_speech: bool = True,
-                      enable_non_speech: bool = True) -> Dict:
+                      enable_non_speech: bool = True,
+                      state: Optional[DetectionState] = None,
+                      overlap: float = 0.0,
+                      timer: Optional[StageTimer] = None) -> Dict:
         """
         Analyze audio for threats (both speech and non-speech).
         Raw audio is discarded after feature extraction for privacy.
         Implements professional-grade detection with false positive reduction.
+
+        Args:
+            state: Session state to read and update; defaults to the detector's own
+            overlap: Fraction of this chunk that repeats the end of the previous
+                     chunk of the same session (skipped by the streaming extractor)
+            timer: Stage timer from the caller (e.g. already holding the decode span);
+                   its spans are returned as result['timings'] when it traces
         """
         start_time = time.time()
+        timer = timer or self.metrics.timer(trace=MetricsConfig.TRACE_STAGES)
+        timer.restart()
+        state = state or self.state
+        state.chunks_processed += 1
+        noise_profiler = state.noise_profiler
 
         result = {
             'is_threat': False,
@@ -123,127 +472,212 @@ class ThreatDetector:
             'speech_result': None,
             'processing_time': 0.0,
             'latency_ok': True,
+            'throughput': None,
             'details': {}
         }
 
+        cascade = self.cascade_stats
+        cascade.record_chunk()
+
         try:
+            # Stage 1: energy / SNR
+            stage_start = time.perf_counter()
+
             # Preprocess audio
             processed_audio = self.audio_processor.preprocess_audio(audio_data)
+            timer.lap('preprocess')
 
             # Calculate audio energy for filtering
             audio_energy = self._calculate_audio_energy(processed_audio)
             result['details']['audio_energy'] = round(audio_energy, 4)
 
+            # Background re-calibration compares the raw chunk with the current
+            # floor; the energy above is measured after peak normalization
+            if noise_profiler.is_calibrated:
+                self._recalibrate_noise(state, audio_data)
+
             # Skip very low energy audio (silence/background noise)
-            if audio_energy < self.min_energy_threshold:
+            if audio_energy < state.min_energy_threshold:
                 result['details']['skipped'] = 'Audio energy too low (silence/background)'
-                self.detection_history.append({'class': 'normal', 'is_threat': False})
-                return result
+                state.record_detection('normal', False)
+                self._break_stream(state)
+                cascade.record('energy', False, time.perf_counter() - stage_start)
+                timer.lap('energy')
+                self.metrics.record_skip('low_energy')
+                return self._finish_metrics(result, timer, start_time)
 
             # Check if audio is significant (not just noise)
-            if self.noise_profiler.is_calibrated:
-                if not self.noise_profiler.is_significant_audio(processed_audio):
+            if noise_profiler.is_calibrated:
+                if not noise_profiler.is_significant_audio(processed_audio):
                     result['details']['skipped'] = 'Audio below noise threshold'
-                    self.detection_history.append({'class': 'normal', 'is_threat': False})
-                    return result
+                    state.record_detection('normal', False)
+                    self._break_stream(state)
+                    cascade.record('energy', False, time.perf_counter() - stage_start)
+                    timer.lap('energy')
+                    self.metrics.record_skip('below_noise_floor')
+                    return self._finish_metrics(result, timer, start_time)
 
                 # Apply noise reduction
-                processed_audio = self.noise_profiler.denoise_audio(processed_audio)
-
-            # Extract features (privacy: raw audio can be discarded after this)
-            features = self.feature_extractor.extract_fixed_length_features(processed_audio)
-            features_normalized, _, _ = self.feature_extractor.normalize_features(features)
-
-            # Transpose for model input (batch, time, features)
-            model_input = features_normalized.T
-
-            # Non-speech threat detection
-            if enable_non_speech:
-                class_name, confidence, all_probs = self.non_speech_model.predict(model_input)
-
-                # Get class-specific threshold
-                class_threshold = self.class_thresholds.get(class_name, self.non_speech_threshold)
-
-                # Apply adaptive threshold based on noise profile
-                adaptive_threshold = self.noise_profiler.get_adaptive_threshold(class_threshold)
-
-                # Additional check: for screaming/shouting, require MUCH higher energy
-                if class_name in ['screaming', 'shouting']:
-                    if audio_energy < self.high_energy_threshold:
-                        # Low energy + screaming/shouting prediction = likely false positive
-                        # Increase threshold significantly to prevent false positives
-                        adaptive_threshold = min(0.99, adaptive_threshold + 0.15)  # Increased from 0.1 to 0.15
-
-                    # Additional spectral check: screaming/shouting has different frequency characteristics
-                    # than normal speech or fan noise
-                    # If energy is borderline, increase threshold even more
-                    elif audio_energy < self.high_energy_threshold * 1.3:
-                        adaptive_threshold = min(0.98, adaptive_threshold + 0.05)
-
-                # Initial threat determination
-                initial_is_threat = (
-                    class_name != 'normal' and
-                    confidence >= adaptive_threshold
-                )
-
-                # Apply consecutive detection check to reduce false positives
-                confirmed_threat = self._check_consecutive_detection(class_name, initial_is_threat)
-
-                result['non_speech_result'] = {
-                    'detected_class': class_name,
-                    'confidence': confidence,
-                    'is_threat': confirmed_threat,
-                    'initial_detection': initial_is_threat,
-                    'consecutive_confirmed': confirmed_threat,
-                    'all_probabilities': dict(zip(
-                        self.non_speech_model.classes,
-                        [round(p, 4) for p in all_probs]
-                    )),
-                    'threshold_used': adaptive_threshold,
-                    'class_threshold': class_threshold
-                }
-
-                if confirmed_threat:
+                timer.lap('energy')
+                processed_audio = noise_profiler.denoise_audio(processed_audio)
+                timer.lap('denoise')
+            else:
+                timer.lap('energy')
+            cascade.record('energy', True, time.perf_counter() - stage_start)
+
+            # Stage 2: spectral statistics of the raw chunk decide whether the CNN-LSTM runs
+            spectrum = None
+            run_model = enable_non_speech
+            if self.cascade_enabled:
+                stage_start = time.perf_counter()
+                spectrum = ChunkSpectrum(audio_data, AudioConfig.SAMPLE_RATE)
+                if enable_non_speech and self.spectral_gate.fitted:
+                    gate_score = self.spectral_gate.score(spectrum)
+                    run_model = gate_score >= self.spectral_gate.threshold
+                    result['details']['gate_score'] = round(gate_score, 4)
+                    cascade.record('spectral', run_model, time.perf_counter() - stage_start)
+                timer.lap('spectral')
+
+                if not run_model and enable_non_speech:
+                    self.metrics.record_skip('spectral_gate')
+                    result['details']['non_speech_skipped'] = 'Spectral gate'
+                    state.record_detection('normal', False)
+                    self._break_stream(state, speech=False)
+
+            # Stage 3: non-speech threat detection
+            features = None
+            if run_model:
+                stage_start = time.perf_counter()
+
+                # Extract features (privacy: raw audio can be discarded after this)
+                features, windows = self._chunk_features(state, audio_data, processed_audio, overlap)
+                model_inputs = [self._model_input(window) for _, window in windows]
+                timer.lap('features')
+
+                # Sub-windows of a stream are scored in one batch, oldest first
+                futures = [self.inference_engine.submit(model_input) for model_input in model_inputs]
+                predictions = [future.result() for future in futures]
+                result['throughput'] = predictions[-1][3]
+                timer.lap('model')
+
+                # Each window counts towards consecutive confirmation for the audio
+                # it advances over, so re-scoring does not confirm threats sooner;
+                # report the first confirmed window, else the newest
+                window_weight = self._window_weight(state)
+                reported = None
+                for (offset, _), (class_name, confidence, all_probs, _) in zip(windows, predictions):
+                    class_threshold, adaptive_threshold = self._adaptive_threshold(state, class_name, audio_energy)
+
+                    # Initial threat determination
+                    initial_is_threat = (
+                        class_name != 'normal' and
+                        confidence >= adaptive_threshold
+                    )
+
+                    # Apply consecutive detection check to reduce false positives
+                    confirmed_threat = self._check_consecutive_detection(
+                        state, class_name, initial_is_threat, window_weight)
+
+                    if reported is None or not reported['is_threat']:
+                        reported = {
+                            'detected_class': class_name,
+                            'confidence': confidence,
+                            'is_threat': confirmed_threat,
+                            'initial_detection': initial_is_threat,
+                            'consecutive_confirmed': confirmed_threat,
+                            'all_probabilities': dict(zip(
+                                self.non_speech_model.classes,
+                                [round(p, 4) for p in all_probs]
+                            )),
+                            'threshold_used': adaptive_threshold,
+                            'class_threshold': class_threshold,
+                            'window_offset': round(offset * self.feature_extractor.hop_length / AudioConfig.SAMPLE_RATE, 3)
+                        }
+
+                reported['windows_scored'] = len(windows)
+                result['non_speech_result'] = reported
+
+                if reported['is_threat']:
                     result['is_threat'] = True
                     result['threat_type'] = 'non_speech'
-                    result['confidence'] = confidence
-                    result['details']['non_speech_class'] = class_name
-            
+                    result['confidence'] = reported['confidence']
+                    result['details']['non_speech_class'] = reported['detected_class']
+
+                cascade.record('model', True, time.perf_counter() - stage_start)
+
+            # Voice activity decides whether ASR runs
+            run_asr = enable_speech
+            if enable_speech and self.cascade_enabled and CascadeConfig.VAD_GATES_ASR:
+                stage_start = time.perf_counter()
+                timer.restart()
+                noise_floor = noise_profiler.current_noise_floor if noise_profiler.is_calibrated else None
+                speech_ratio = self.vad.speech_ratio(spectrum, noise_floor)
+                run_asr = speech_ratio >= self.vad.min_speech_ratio
+                result['details']['speech_ratio'] = round(speech_ratio, 4)
+                cascade.record('vad', run_asr, time.perf_counter() - stage_start)
+                timer.lap('vad')
+
+                if not run_asr:
+                    self.metrics.record_skip('no_voice')
+                    result['details']['speech_skipped'] = 'No voice activity'
+                    self._break_stream(state, features=False)
+
             # Speech threat detection
-            if enable_speech:
-                speech_result = self.speech_detector.analyze_audio(
-                    processed_audio,
-                    AudioConfig.SAMPLE_RATE
-                )
+            if run_asr:
+                stage_start = time.perf_counter()
+                timer.restart()
+                languages = None
+                if self.speech_detector.offline and state.session_id is not None:
+                    speech_result, job_id = self._stream_speech(state, audio_data, overlap), None
+                elif self.transcription_service is not None:
+                    # Merge speech if it arrives within the latency budget, else deliver it later
+                    languages = self._route_languages(state, features, result)
+                    deadline = min(SpeechConfig.MERGE_DEADLINE,
+                                   max(0.0, self.max_latency - (time.time() - start_time)))
+                    speech_result, job_id = self.transcription_service.analyze(
+                        processed_audio,
+                        AudioConfig.SAMPLE_RATE,
+                        timeout=deadline,
+                        on_late=lambda late: self._record_late_speech(state, late, languages),
+                        languages=languages
+                    )
+                else:
+                    languages = self._route_languages(state, features, result)
+                    speech_result, job_id = self.speech_detector.analyze_audio(
+                        processed_audio,
+                        AudioConfig.SAMPLE_RATE,
+                        languages
+                    ), None
+
+                if speech_result is None:
+                    result['speech_result'] = {'pending': True, 'job_id': job_id}
+
+                else:
+                    self._observe_languages(state, languages, speech_result)
+                    result['speech_result'] = self._speech_summary(speech_result)
+                    self.metrics.record_asr_error(result['speech_result']['engine'],
+                                                  result['speech_result']['transcription_error'])
+
+                    # Speech threats don't need consecutive detection - immediate alert
+                    if speech_result.get('is_threat', False):
+                        result['is_threat'] = True
+                        if result['threat_type'] is None:
+                            result['threat_type'] = 'speech'
+                        else:
+                            result['threat_type'] = 'combined'
+
+                        speech_score = speech_result.get('threat_score', 0)
+                        result['confidence'] = max(result['confidence'], speech_score)
+                        result['details']['detected_text'] = speech_result.get('text', '')
+                        result['details']['detected_keywords'] = speech_result.get('threat_analysis', {}).get('detected_keywords', [])
+
+                cascade.record('asr', True, time.perf_counter() - stage_start)
+                timer.lap('asr')
 
-                # Get transcription info including any errors
-                transcription = speech_result.get('transcription', {})
-
-                result['speech_result'] = {
-                    'text': speech_result.get('text', ''),
-                    'is_threat': speech_result.get('is_threat', False),
-                    'threat_level': speech_result.get('threat_level', 'none'),
-                    'threat_score': speech_result.get('threat_score', 0.0),
-                    'detected_keywords': speech_result.get('threat_analysis', {}).get('detected_keywords', []),
-                    'engine': transcription.get('engine', 'none'),
-                    'transcription_error': transcription.get('error')
-                }
-
-                # Speech threats don't need consecutive detection - immediate alert
-                if speech_result.get('is_threat', False):
-                    result['is_threat'] = True
-                    if result['threat_type'] is None:
-                        result['threat_type'] = 'speech'
-                    else:
-                        result['threat_type'] = 'combined'
-
-                    speech_score = speech_result.get('threat_score', 0)
-                    result['confidence'] = max(result['confidence'], speech_score)
-                    result['details']['detected_text'] = speech_result.get('text', '')
-                    result['details']['detected_keywords'] = speech_result.get('threat_analysis', {}).get('detected_keywords', [])
-            
             # Determine overall threat level
             if result['is_threat']:
+                self.metrics.record_threat(result['threat_type'],
+                                           result['details'].get('non_speech_class', 'speech'))
                 if result['confidence'] >= 0.8:
                     result['threat_level'] = 'critical'
                 elif result['confidence'] >= 0.6:
@@ -255,97 +689,284 @@ class ThreatDetector:
         
         except Exception as e:
             result['details']['error'] = str(e)
+            self.metrics.record_error()
         
         # Calculate processing time
         processing_time = time.time() - start_time
         result['processing_time'] = round(processing_time, 3)
         result['latency_ok'] = processing_time < self.max_latency
+
+        if result['is_threat']:
+            state.alerts_count += 1
         
         # Privacy: At this point, raw audio should be discarded
         # Only features and results are retained
         
+        return self._finish_metrics(result, timer, start_time)
+
+    def _finish_metrics(self, result: Dict, timer: StageTimer, start_time: float) -> Dict:
+        """Count the chunk and attach its stage spans when traced"""
+        self.metrics.record_chunk(time.time() - start_time)
+        if timer.spans is not None:
+            result['timings'] = timer.spans
         return result
+
+    def _metric_gauges(self) -> List[Tuple]:
+        """Executor and session gauges read at /metrics scrape time"""
+        inference = self.inference_engine.get_stats()
+        gauges = [
+            ('audio_inference_queue_depth', 'Feature windows waiting for an inference worker',
+             [({}, inference['queue_depth'])]),
+            ('audio_inference_in_flight', 'Feature windows in a running forward pass',
+             [({}, inference['in_flight'])]),
+            ('audio_inference_worker_utilization', 'Fraction of time each inference worker is busy',
+             [({'worker': str(i)}, u) for i, u in enumerate(inference['worker_utilization'])]),
+            ('audio_sessions_active', 'Live detection sessions',
+             [({}, self.sessions.get_stats()['active_sessions'])])
+        ]
+        if self.transcription_service is not None:
+            gauges.append(('audio_transcription_pending_jobs', 'Transcriptions queued or running',
+                           [({}, self.transcription_service.get_stats()['pending_jobs'])]))
+        return gauges
     
-    def update_noise_profile(self, audio_data: np.ndarray) -> Dict:
+    def scan_recording(self, chunks, batch_size: int = 64,
+                       state: Optional[DetectionState] = None) -> Dict:
+        """
+        Offline scan of a long recording with the non-speech model.
+        Chunks are batched through the CNN-LSTM and consecutive chunks of the
+        same threat class are merged into timeline segments.
+
+        Args:
+            chunks: Iterable of (start_seconds, chunk) pairs, e.g. AudioProcessor.iter_chunks
+            batch_size: Chunks handed to the inference engine at a time
+            state: Session state supplying sensitivity and noise profile
+
+        Returns:
+            Timeline of detections plus throughput summary
+        """
+        start_time = time.time()
+        state = state or self.state
+        chunk_duration = self.audio_processor.chunk_duration
+
+        timeline = []
+        counts = {'chunks': 0, 'skipped': 0}
+        pending_starts, pending_energies, pending_features = [], [], []
+        end_of_audio = 0.0
+
+        def flush():
+            futures = [self.inference_engine.submit(features) for features in pending_features]
+            predictions = [future.result()[:3] for future in futures]
+            for chunk_start, energy, (class_name, confidence, _) in zip(pending_starts, pending_energies, predictions):
+                # Same thresholds as live detection, including the energy check for screaming/shouting
+                _, threshold = self._adaptive_threshold(state, class_name, energy)
+                if class_name != 'normal' and confidence >= threshold:
+                    self._extend_timeline(timeline, chunk_start, chunk_start + chunk_duration,
+                                          class_name, confidence)
+            pending_starts.clear()
+            pending_energies.clear()
+            pending_features.clear()
+
+        for chunk_start, chunk in chunks:
+            counts['chunks'] += 1
+            end_of_audio = chunk_start + chunk_duration
+
+            processed = self.audio_processor.preprocess_audio(chunk)
+            energy = self._calculate_audio_energy(processed)
+            if energy < state.min_energy_threshold or (
+                    state.noise_profiler.is_calibrated and
+                    not state.noise_profiler.is_significant_audio(processed)):
+                counts['skipped'] += 1
+                continue
+
+            if state.noise_profiler.is_calibrated:
+                processed = state.noise_profiler.denoise_audio(processed)
+
+            features = self.feature_extractor.extract_fixed_length_features(processed)
+            pending_starts.append(chunk_start)
+            pending_energies.append(energy)
+            pending_features.append(self._model_input(features))
+
+            if len(pending_features) >= batch_size:
+                flush()
+
+        if pending_features:
+            flush()
+
+        processing_time = time.time() - start_time
+        return {
+            'timeline': timeline,
+            'duration': round(end_of_audio, 2),
+            'chunks': counts['chunks'],
+            'chunks_skipped': counts['skipped'],
+            'processing_time': round(processing_time, 3),
+            'chunks_per_second': round(counts['chunks'] / processing_time, 2) if processing_time > 0 else 0.0,
+            'realtime_factor': round(end_of_audio / processing_time, 2) if processing_time > 0 else 0.0
+        }
+
+    def _extend_timeline(self, timeline: List[Dict], start: float, end: float,
+                         class_name: str, confidence: float) -> None:
+        """Merge a detection into the last segment if it is the same class and overlaps"""
+        if timeline and timeline[-1]['class'] == class_name and start <= timeline[-1]['end']:
+            segment = timeline[-1]
+            segment['end'] = round(end, 2)
+            segment['confidence'] = round(max(segment['confidence'], confidence), 4)
+            segment['chunks'] += 1
+        else:
+            timeline.append({
+                'start': round(start, 2),
+                'end': round(end, 2),
+                'class': class_name,
+                'confidence': round(confidence, 4),
+                'chunks': 1
+            })
+
+    @staticmethod
+    def _speech_summary(speech_result: Dict) -> Dict:
+        """Speech fields reported in detection results"""
+        # Get transcription info including any errors
+        transcription = speech_result.get('transcription', {})
+
+        return {
+            'text': speech_result.get('text', ''),
+            'is_threat': speech_result.get('is_threat', False),
+            'threat_level': speech_result.get('threat_level', 'none'),
+            'threat_score': speech_result.get('threat_score', 0.0),
+            'detected_keywords': speech_result.get('threat_analysis', {}).get('detected_keywords', []),
+            'engine': transcription.get('engine', 'none'),
+            'transcription_error': transcription.get('error')
+        }
+
+    def _route_languages(self, state: DetectionState, features: Optional[np.ndarray],
+                         result: Dict) -> List[str]:
+        """
+        Languages to transcribe this chunk in (features are None when the model
+        was skipped). Sessionless chunks share the default state, whose prior
+        would mix every caller's languages, so they go to all languages.
+        """
+        prior = state.language_prior if state.session_id is not None else None
+        languages = self.language_router.route(prior, features)
+        result['details']['asr_languages'] = languages
+        self.metrics.record_language_route(languages, len(self.language_router.languages) - len(languages))
+        return languages
+
+    def _observe_languages(self, state: DetectionState, languages: Optional[List[str]],
+                           speech_result: Dict) -> None:
+        """Update a session's language prior from a transcription (never the shared default state)"""
+        if languages is not None and state.session_id is not None:
+            state.language_prior.observe(languages, speech_result['transcription'])
+
+    def _record_late_speech(self, state: DetectionState, speech_result: Dict,
+                            languages: Optional[List[str]] = None) -> None:
+        """Count a speech threat that arrived after its chunk's result was returned"""
+        self._observe_languages(state, languages, speech_result)
+        summary = self._speech_summary(speech_result)
+        self.metrics.record_asr_error(summary['engine'], summary['transcription_error'])
+        if speech_result.get('is_threat', False):
+            self.metrics.record_threat('speech', 'speech')
+            with state.lock:
+                state.alerts_count += 1
+
+    def get_speech_result(self, job_id: str) -> Dict:
+        """Collect a speech result that was still pending when its chunk returned"""
+        if self.transcription_service is None:
+            return {'job_id': job_id, 'status': 'unknown'}
+
+        job = self.transcription_service.get_result(job_id)
+        if job['status'] == 'done':
+            job['speech_result'] = self._speech_summary(job.pop('result'))
+        return job
+
+    def get_session_state(self, session_id: Optional[str],
+                          create: bool = True) -> Optional[DetectionState]:
+        """Look up (or create) the state for a session; None when no session_id is given"""
+        if not session_id:
+            return None
+        return self.sessions.get(session_id, create=create)
+
+    def update_noise_profile(self, audio_data: np.ndarray,
+                             state: Optional[DetectionState] = None) -> Dict:
         """Update noise profile with ambient audio"""
-        self.noise_profiler.update_noise_profile(audio_data)
-        return self.noise_profiler.get_status()
+        state = state or self.state
+        state.noise_profiler.update_noise_profile(audio_data)
+        self.save_noise_profile(state)
+        return state.noise_profiler.get_status()
+
+    def _recalibrate_noise(self, state: DetectionState, audio_data: np.ndarray) -> None:
+        """Offer a chunk to the session's background noise re-calibration"""
+        # The shared default state mixes every caller's audio, so it is never re-calibrated
+        if state.session_id is None and state.location_id is None:
+            return
+        if state.noise_profiler.maybe_recalibrate(audio_data):
+            self.save_noise_profile(state)
+
+    def set_location(self, state: DetectionState, location_id: Optional[str]) -> bool:
+        """Tie a session to a location and restore that location's saved noise profile"""
+        state.location_id = location_id
+        if not location_id:
+            return False
+        return self.noise_profiles.load(location_id, state.noise_profiler)
 
-    def reset_noise_profile(self) -> None:
+    def save_noise_profile(self, state: DetectionState) -> bool:
+        """Persist the session's noise profile under its location, if it has one"""
+        if not state.location_id or not state.noise_profiler.samples_seen:
+            return False
+        try:
+            self.noise_profiles.save(state.location_id, state.noise_profiler)
+        except (OSError, ValueError) as e:
+            print(f"[Noise] Could not save profile for location '{state.location_id}': {e}")
+            return False
+        return True
+
+    def reset_noise_profile(self, state: Optional[DetectionState] = None) -> None:
         """Reset the noise profiler"""
-        self.noise_profiler.reset()
+        (state or self.state).noise_profiler.reset()
 
-    def reset_detection_history(self) -> None:
+    def reset_detection_history(self, state: Optional[DetectionState] = None) -> None:
         """Reset detection history - call when starting new detection session"""
-        self.detection_history.clear()
+        (state or self.state).reset_history()
 
-    def set_sensitivity(self, level: str = 'normal') -> Dict:
+    def set_sensitivity(self, level: str = 'normal',
+                        state: Optional[DetectionState] = None) -> Dict:
         """
         Adjust detection sensitivity.
 
         Args:
             level: 'low' (fewer false positives), 'normal', or 'high' (more sensitive)
+            state: Session state to adjust; defaults to the detector's own
 
         Returns:
             Current sensitivity settings
         """
-        if level == 'low':
-            # Minimal false positives - only very clear threats
-            self.consecutive_required = 4
-            self.class_thresholds = {
-                'crying': 0.88,
-                'screaming': 0.98,
-                'shouting': 0.99,
-                'glass_breaking': 0.85,
-                'normal': 0.0
-            }
-            self.min_energy_threshold = 0.08
-            self.high_energy_threshold = 0.35
-        elif level == 'high':
-            # More sensitive, some false positives possible
-            self.consecutive_required = 2
-            self.class_thresholds = {
-                'crying': 0.75,
-                'screaming': 0.90,
-                'shouting': 0.92,
-                'glass_breaking': 0.70,
-                'normal': 0.0
-            }
-            self.min_energy_threshold = 0.03
-            self.high_energy_threshold = 0.20
-        else:  # normal - balanced
-            self.consecutive_required = 3
-            self.class_thresholds = {
-                'crying': 0.82,
-                'screaming': 0.96,
-                'shouting': 0.97,
-                'glass_breaking': 0.78,
-                'normal': 0.0
-            }
-            self.min_energy_threshold = 0.05
-            self.high_energy_threshold = 0.30
-
-        return self.get_sensitivity_settings()
+        return (state or self.state).set_sensitivity(level)
 
-    def get_sensitivity_settings(self) -> Dict:
+    def get_sensitivity_settings(self, state: Optional[DetectionState] = None) -> Dict:
         """Get current sensitivity settings"""
-        return {
-            'consecutive_required': self.consecutive_required,
-            'class_thresholds': self.class_thresholds,
-            'min_energy_threshold': self.min_energy_threshold,
-            'high_energy_threshold': self.high_energy_threshold
-        }
+        return (state or self.state).get_sensitivity_settings()
 
-    def get_status(self) -> Dict:
+    def get_status(self, state: Optional[DetectionState] = None) -> Dict:
         """Get detector status"""
+        state = state or self.state
         return {
             'non_speech_model_loaded': self.non_speech_model.model is not None,
-            'noise_profiler': self.noise_profiler.get_status(),
+            'optimized_model': self.non_speech_model.optimized_info,
+            'noise_profiler': state.noise_profiler.get_status(),
             'thresholds': {
                 'non_speech': self.non_speech_threshold,
                 'speech': self.speech_threshold
             },
-            'sensitivity': self.get_sensitivity_settings(),
-            'max_latency': self.max_latency
+            'sensitivity': state.get_sensitivity_settings(),
+            'max_latency': self.max_latency,
+            'sessions': self.sessions.get_stats(),
+            'inference': self.inference_engine.get_stats(),
+            'transcription': self.transcription_service.get_stats() if self.transcription_service else None,
+            'cascade': {'enabled': self.cascade_enabled, **self.cascade_stats.get_stats()},
+            'language_routing': {**self.language_router.get_stats(),
+                                 'session_prior': state.language_prior.get_stats()},
+            'asr': {
+                'backend': self.speech_detector.asr_backend,
+                'offline': self.speech_detector.offline,
+                'vosk_model_loaded': self.speech_detector.vosk_model is not None,
+                'stream': state.asr_stream.get_stats() if state.asr_stream else None
+            }
         }
 
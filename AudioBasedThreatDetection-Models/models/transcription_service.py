@@ -0,0 +1,261 @@
+"""
+Transcription Service
+Runs speech transcription off the request thread: language passes run
+concurrently on a bounded worker pool, results are cached by audio
+fingerprint, and callers wait only up to a deadline before getting a job id
+to collect the result later
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import threading
+import time
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SpeechConfig
+
+
+class TranscriptionJob:
+    """One chunk's transcription: a pass per language, combined when all finish"""
+
+    def __init__(self, job_id: str, fingerprint: Optional[str] = None, languages: List[Tuple[str, str]] = ()):
+        self.job_id = job_id
+        self.fingerprint = fingerprint
+        self.languages = list(languages)  # (language, code) passes
+        self.created_at = time.time()
+        self.future: Future = Future()
+        self.texts: Dict[str, Optional[str]] = {}
+        self.errors: Dict[str, Optional[str]] = {}
+        self.lock = threading.Lock()
+
+    def is_expired(self, timeout: float) -> bool:
+        return not self.future.done() and time.time() - self.created_at > timeout
+
+
+class TranscriptionService:
+    """
+    Bounded worker pool for SpeechThreatDetector transcription.
+
+    recognize(audio, sample_rate, language_code) -> text or None does one
+    recognition pass; it defaults to the detector's Google pass and can be
+    swapped for a local recognizer (e.g. in tests).
+    """
+
+    def __init__(self, speech_detector, recognize: Callable = None,
+                 max_workers: int = None, max_pending: int = None,
+                 cache_size: int = None, result_ttl: float = None):
+        self.speech_detector = speech_detector
+        self.recognize = recognize or speech_detector.recognize_language
+        self.languages = SpeechConfig.LANGUAGES
+        self.max_workers = max_workers or SpeechConfig.TRANSCRIPTION_WORKERS
+        self.max_pending = max_pending or SpeechConfig.MAX_PENDING
+        self.cache_size = SpeechConfig.CACHE_SIZE if cache_size is None else cache_size
+        self.result_ttl = SpeechConfig.RESULT_TTL if result_ttl is None else result_ttl
+        # A job whose passes all overran their per-call timeout is reported as timed out
+        self.job_timeout = SpeechConfig.CALL_TIMEOUT * 2
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='transcription')
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._jobs: 'OrderedDict[str, TranscriptionJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        self.jobs_submitted = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.merged = 0
+        self.deferred = 0
+
+    @staticmethod
+    def fingerprint(audio_data: np.ndarray) -> str:
+        """Content hash of the 16-bit audio the recognizer would receive"""
+        audio_int16 = (audio_data * 32767).astype(np.int16)
+        return hashlib.blake2b(audio_int16.tobytes(), digest_size=16).hexdigest()
+
+    def submit(self, audio_data: np.ndarray, sample_rate: int = 16000,
+               languages: Optional[List[str]] = None) -> TranscriptionJob:
+        """
+        Start transcribing a chunk (in every language, or only those in
+        languages); the job's future yields the speech analysis
+        """
+        passes = [(language, code) for language, code in self.languages
+                  if languages is None or language in languages]
+        job = TranscriptionJob(f"tx-{next(self._ids)}", languages=passes)
+        if not passes:
+            self._finish(job, self._error_transcription(f'No recognizer for languages {languages}'))
+            return self._register(job)
+
+        prepared, error = self.speech_detector.prepare_audio(audio_data, sample_rate)
+
+        if error:
+            self._finish(job, self._error_transcription(error))
+            return self._register(job)
+
+        # A result is only reused for the same set of language passes
+        job.fingerprint = f"{self.fingerprint(prepared)}:{','.join(language for language, _ in passes)}"
+        with self._lock:
+            cached = self._cache.get(job.fingerprint)
+            if cached is not None:
+                self._cache.move_to_end(job.fingerprint)
+                self.cache_hits += 1
+            pending = sum(1 for j in self._jobs.values() if not j.future.done())
+
+        if cached is not None:
+            job.future.set_result(cached)
+            return self._register(job)
+
+        if pending >= self.max_pending:
+            self.rejected += 1
+            self._finish(job, self._error_transcription('Transcription queue full'))
+            return self._register(job)
+
+        self.jobs_submitted += 1
+        self._register(job)
+        for language, code in job.languages:
+            future = self.executor.submit(self._run_pass, prepared, sample_rate, code)
+            future.add_done_callback(partial(self._pass_done, job, language, prepared, sample_rate))
+        return job
+
+    def _run_pass(self, audio_data: np.ndarray, sample_rate: int, language_code: str) -> Tuple[Optional[str], Optional[str]]:
+        try:
+            return self.recognize(audio_data, sample_rate, language_code), None
+        except Exception as e:
+            return None, str(e)
+
+    def _pass_done(self, job: TranscriptionJob, language: str,
+                   audio_data: np.ndarray, sample_rate: int, future: Future) -> None:
+        try:
+            self._complete_pass(job, language, audio_data, sample_rate, future)
+        except Exception as e:
+            # Otherwise the job would stay pending forever
+            if not job.future.done():
+                job.future.set_exception(e)
+
+    def _complete_pass(self, job: TranscriptionJob, language: str,
+                       audio_data: np.ndarray, sample_rate: int, future: Future) -> None:
+        text, error = future.result()
+        with job.lock:
+            job.texts[language] = text
+            job.errors[language] = error
+            if len(job.texts) < len(job.languages):
+                return
+
+        transcription = self.speech_detector.combine_transcriptions(
+            job.texts.get('english'), job.texts.get('sinhala'),
+            job.errors.get('english'), job.errors.get('sinhala')
+        )
+        if not transcription['text']:
+            transcription = self.speech_detector.recognize_vosk(audio_data, sample_rate) or transcription
+
+        analysis = self._finish(job, transcription)
+
+        # Recognizer failures are not cached so that the chunk can be retried
+        if transcription['text'] or not any(job.errors.values()):
+            with self._lock:
+                self._cache[job.fingerprint] = analysis
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _finish(self, job: TranscriptionJob, transcription: Dict) -> Dict:
+        analysis = self.speech_detector.analyze_transcription(transcription)
+        if not job.future.done():
+            job.future.set_result(analysis)
+        return analysis
+
+    @staticmethod
+    def _error_transcription(error: str) -> Dict:
+        return {
+            'text': '',
+            'language': 'unknown',
+            'confidence': 0.0,
+            'engine': 'none',
+            'error': error
+        }
+
+    def _register(self, job: TranscriptionJob) -> TranscriptionJob:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune_locked()
+        return job
+
+    def _prune_locked(self) -> None:
+        """Forget finished jobs older than result_ttl"""
+        now = time.time()
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if now - job.created_at <= self.result_ttl or not job.future.done():
+                break
+            self._jobs.popitem(last=False)
+
+    def analyze(self, audio_data: np.ndarray, sample_rate: int = 16000,
+                timeout: float = None,
+                on_late: Optional[Callable[[Dict], None]] = None,
+                languages: Optional[List[str]] = None) -> Tuple[Optional[Dict], str]:
+        """
+        Transcribe and analyze a chunk, waiting at most timeout seconds.
+
+        Returns (speech_analysis, job_id), or (None, job_id) if the result is
+        not ready yet; on_late is then called with it once it arrives.
+        """
+        timeout = SpeechConfig.MERGE_DEADLINE if timeout is None else timeout
+        job = self.submit(audio_data, sample_rate, languages)
+
+        if job.future.done() or timeout > 0:
+            try:
+                result = job.future.result(timeout=timeout)
+                self.merged += 1
+                return result, job.job_id
+            except FutureTimeoutError:
+                pass
+
+        self.deferred += 1
+        if on_late is not None:
+            job.future.add_done_callback(
+                lambda future: on_late(future.result()) if future.exception() is None else None
+            )
+        return None, job.job_id
+
+    def get_result(self, job_id: str) -> Dict:
+        """Status of a transcription job: pending, done, error, timeout or unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+        if job is None:
+            return {'job_id': job_id, 'status': 'unknown'}
+        if job.future.done() and job.future.exception() is not None:
+            return {'job_id': job_id, 'status': 'error', 'error': str(job.future.exception())}
+        if job.future.done():
+            return {'job_id': job_id, 'status': 'done', 'result': job.future.result()}
+        if job.is_expired(self.job_timeout):
+            return {'job_id': job_id, 'status': 'timeout'}
+        return {'job_id': job_id, 'status': 'pending'}
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        """Get service statistics"""
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if not j.future.done())
+            cached = len(self._cache)
+
+        return {
+            'workers': self.max_workers,
+            'pending_jobs': pending,
+            'max_pending': self.max_pending,
+            'jobs_submitted': self.jobs_submitted,
+            'cache_hits': self.cache_hits,
+            'cache_entries': cached,
+            'merged_within_deadline': self.merged,
+            'deferred': self.deferred,
+            'rejected': self.rejected
+        }
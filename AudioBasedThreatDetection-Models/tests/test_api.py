@@ -0,0 +1,569 @@
+"""
+Unit Tests for Audio Threat Detection API
+Using the Flask test client
+"""
+import sys
+import os
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import create_app
+from api.registry import get_threat_detector
+
+
+def voiced_audio(duration=2.0, sample_rate=16000, f0=150, amplitude=0.6):
+    """Harmonic tone with a syllable-rate envelope, which the voice-activity detector accepts"""
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 20) if f0 * k < 3400)
+    envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4 * t)
+    return (amplitude * tone / np.abs(tone).max() * envelope).astype(np.float32)
+
+
+class TestDetectorRegistry(unittest.TestCase):
+    """Test the shared detector registry"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_blueprints_share_detector(self):
+        """Test both blueprints use the same detector instance"""
+        from api.routes import audio_routes, detection_routes
+
+        self.assertIs(audio_routes.threat_detector, detection_routes.threat_detector)
+        self.assertIs(audio_routes.threat_detector, get_threat_detector())
+
+    def test_decoder_pool_on_fresh_registry(self):
+        """Test the decoder pool can be created before the detector is loaded"""
+        import threading
+        from api import registry
+
+        saved = registry._threat_detector, registry._load_time, registry._decoder_pool
+
+        def restore():
+            registry._threat_detector, registry._load_time, registry._decoder_pool = saved
+        self.addCleanup(restore)
+        registry._threat_detector, registry._load_time, registry._decoder_pool = None, None, None
+
+        result = {}
+        worker = threading.Thread(target=lambda: result.setdefault('pool', registry.get_decoder_pool()),
+                                  daemon=True)
+        worker.start()
+        worker.join(timeout=60)
+
+        self.assertFalse(worker.is_alive(), "get_decoder_pool() deadlocked")
+        self.assertEqual(result['pool'].sample_rate, registry._threat_detector.audio_processor.sample_rate)
+
+    def test_status_reports_registry(self):
+        """Test /status exposes load time and memory footprint"""
+        response = self.client.get('/api/audio/status')
+        registry = response.get_json()['registry']
+
+        self.assertTrue(registry['loaded'])
+        self.assertIn('load_time', registry)
+        self.assertGreater(registry['model_memory_mb'], 0)
+
+    def test_lexicon_endpoint(self):
+        """Test /lexicon reports the active lexicon version and build time"""
+        lexicon = self.client.get('/api/audio/lexicon').get_json()['lexicon']
+
+        self.assertIn('version', lexicon)
+        self.assertIn('build_time_ms', lexicon)
+        self.assertGreater(lexicon['keyword_counts']['english_threats'], 0)
+
+
+class TestDetectionSessions(unittest.TestCase):
+    """Test per-session detection state through the API"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.detector = get_threat_detector()
+
+    def test_reset_session_is_scoped(self):
+        """Test resetting one session leaves others untouched"""
+        for session_id in ('room-a', 'room-b'):
+            self.client.post('/api/detection/start', json={'session_id': session_id})
+            self.detector.get_session_state(session_id).record_detection('screaming', True)
+
+        self.client.post('/api/audio/reset-session', json={'session_id': 'room-a'})
+
+        self.assertEqual(len(self.detector.get_session_state('room-a').detection_history), 0)
+        self.assertEqual(len(self.detector.get_session_state('room-b').detection_history), 1)
+
+    def test_sensitivity_per_session(self):
+        """Test sensitivity set for a session does not change the default"""
+        self.client.post('/api/audio/sensitivity', json={'level': 'high', 'session_id': 'room-c'})
+
+        self.assertEqual(self.detector.get_session_state('room-c').consecutive_required, 2)
+        self.assertEqual(self.detector.state.consecutive_required, 3)
+
+    def test_location_noise_profile(self):
+        """Test a location's noise profile is saved on stop and restored by the next session"""
+        import tempfile
+        from utils.noise_profiler import NoiseProfileStore
+
+        original_store = self.detector.noise_profiles
+        with tempfile.TemporaryDirectory() as directory:
+            self.detector.noise_profiles = NoiseProfileStore(directory)
+            try:
+                started = self.client.post('/api/detection/start',
+                                           json={'session_id': 'room-e', 'location_id': 'hall-2'}).get_json()
+                self.assertFalse(started['noise_profile_restored'])
+
+                state = self.detector.get_session_state('room-e')
+                for _ in range(5):
+                    self.detector.update_noise_profile(np.random.randn(16000) * 0.02, state=state)
+                self.client.post('/api/detection/stop', json={'session_id': 'room-e'})
+
+                started = self.client.post('/api/detection/start',
+                                           json={'session_id': 'room-f', 'location_id': 'hall-2'}).get_json()
+                self.assertTrue(started['noise_profile_restored'])
+                self.assertTrue(self.detector.get_session_state('room-f').noise_profiler.is_calibrated)
+            finally:
+                self.detector.noise_profiles = original_store
+
+    def test_quiet_chunks_recalibrate_sessions_only(self):
+        """Test room noise re-calibrates a session's profile but not the shared default state"""
+        rng = np.random.default_rng(0)
+        state = self.detector.get_session_state('room-q')
+        self.addCleanup(self.detector.reset_noise_profile)
+        for profiler in (state.noise_profiler, self.detector.state.noise_profiler):
+            profiler.reset()
+            for _ in range(5):
+                profiler.update_noise_profile(rng.normal(0, 0.01, 16000))
+            profiler.last_update = None
+
+        room_noise = rng.normal(0, 0.01, 32000).astype(np.float32)
+        self.detector.analyze_audio(room_noise)
+        self.detector.analyze_audio(room_noise, state=state)
+
+        self.assertEqual(self.detector.state.noise_profiler.samples_seen, 5)
+        self.assertEqual(state.noise_profiler.samples_seen, 6)
+
+    def test_unfitted_gate_runs_model_at_any_level(self):
+        """Test quiet screams still reach the model while the spectral gate is unfitted"""
+        self.assertFalse(self.detector.spectral_gate.fitted)
+        for peak in (0.3, 0.5):
+            scream = voiced_audio(f0=600, amplitude=peak)
+            result = self.detector.analyze_audio(scream, enable_speech=False)
+
+            self.assertNotIn('non_speech_skipped', result['details'])
+            self.assertIsNotNone(result['non_speech_result'])
+
+    def test_sessionless_speech_leaves_language_prior(self):
+        """Test transcriptions of sessionless chunks do not update the shared default prior"""
+        transcription = {'transcription': {'language': 'english'}}
+        default_counts = dict(self.detector.state.language_prior.counts)
+        state = self.detector.get_session_state('room-l')
+
+        self.detector._observe_languages(self.detector.state, ['english', 'sinhala'], transcription)
+        self.detector._observe_languages(state, ['english', 'sinhala'], transcription)
+
+        self.assertEqual(self.detector.state.language_prior.counts, default_counts)
+        self.assertEqual(state.language_prior.counts['english'], 1.0)
+
+    def test_silent_chunk_breaks_stream(self):
+        """Test a chunk dropped as silent resets the session's feature stream"""
+        import base64
+        import io
+        import soundfile as sf
+        from utils.feature_extractor import StreamingFeatureExtractor
+
+        self.client.post('/api/detection/start', json={'session_id': 'room-g'})
+        state = self.detector.get_session_state('room-g')
+        state.feature_stream = StreamingFeatureExtractor(self.detector.feature_extractor)
+        state.feature_stream.push(np.random.randn(16000).astype(np.float32) * 0.3)
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(32000, dtype=np.float32), 16000, format='WAV')
+        response = self.client.post('/api/detection/process-chunk', json={
+            'session_id': 'room-g',
+            'audio_data': base64.b64encode(buffer.getvalue()).decode('ascii')
+        }).get_json()
+
+        self.assertEqual(response.get('reason'), 'silent_audio')
+        self.assertTrue(state.feature_stream.is_empty)
+
+    def test_invalid_overlap(self):
+        """Test a non-numeric, null or out-of-range overlap is rejected with 400"""
+        import base64
+
+        audio = base64.b64encode((voiced_audio() * 32767).astype('<i2').tobytes()).decode('ascii')
+        for overlap in ('abc', None, -0.5, 1.0):
+            for route in ('/api/detection/process-chunk', '/api/audio/analyze'):
+                response = self.client.post(route, json={'audio_data': audio, 'overlap': overlap})
+                self.assertEqual(response.status_code, 400, (route, overlap))
+
+    def test_silent_chunk_without_session(self):
+        """Test a silent chunk without a session_id is skipped, not an error"""
+        import base64
+        import io
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(32000, dtype=np.float32), 16000, format='WAV')
+        response = self.client.post('/api/detection/process-chunk', json={
+            'audio_data': base64.b64encode(buffer.getvalue()).decode('ascii')
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['reason'], 'silent_audio')
+
+    def test_stop_session(self):
+        """Test stopping a session removes its state"""
+        self.client.post('/api/detection/start', json={'session_id': 'room-d'})
+        response = self.client.post('/api/detection/stop', json={'session_id': 'room-d'})
+
+        self.assertTrue(response.get_json()['success'])
+        self.assertIsNone(self.detector.get_session_state('room-d', create=False))
+
+
+class TestAnalyzeFile(unittest.TestCase):
+    """Test long recording scanning"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_upload_returns_timeline(self):
+        """Test a WAV upload is scanned into a timeline with throughput"""
+        import io
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.random.randn(16000 * 9).astype(np.float32) * 0.3, 16000, format='WAV')
+        buffer.seek(0)
+
+        response = self.client.post(
+            '/api/audio/analyze-file',
+            data={'audio': (buffer, 'recording.wav')},
+            content_type='multipart/form-data'
+        )
+        result = response.get_json()['result']
+
+        self.assertEqual(result['chunks'], 8)
+        self.assertIsInstance(result['timeline'], list)
+        self.assertGreater(result['chunks_per_second'], 0)
+
+    def test_invalid_batch_size(self):
+        """Test a non-numeric or out-of-range batch_size is rejected with 400"""
+        for batch_size in ('many', '0', '100000'):
+            response = self.client.post(f'/api/audio/analyze-file?batch_size={batch_size}',
+                                        json={'path': '/etc/passwd'})
+            self.assertEqual(response.status_code, 400)
+
+    def test_scan_uses_live_thresholds(self):
+        """Test a quiet chunk predicted as screaming is rejected offline as it is live"""
+        from concurrent.futures import Future
+        from unittest.mock import patch
+
+        detector = get_threat_detector()
+        probabilities = [0.0] * len(detector.non_speech_model.classes)
+
+        def predict_screaming(features):
+            future = Future()
+            future.set_result(('screaming', 0.98, probabilities, None))
+            return future
+
+        quiet = np.random.default_rng(0).normal(0, 1, 32000).astype(np.float32)
+        with patch.object(detector.inference_engine, 'submit', side_effect=predict_screaming):
+            scan = detector.scan_recording([(0.0, quiet)], state=detector.get_session_state('scan-a'))
+
+        self.assertEqual(scan['chunks'] - scan['chunks_skipped'], 1)
+        self.assertEqual(scan['timeline'], [])
+
+    def test_path_outside_allowed_dirs(self):
+        """Test server-side paths outside the scan directories are rejected"""
+        response = self.client.post('/api/audio/analyze-file', json={'path': '/etc/passwd'})
+        self.assertEqual(response.status_code, 403)
+
+
+class TestBinaryIngestion(unittest.TestCase):
+    """Test raw PCM request bodies on /analyze"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.audio = (np.random.randn(16000 * 2) * 0.3).clip(-1, 1).astype(np.float32)
+
+    def test_pcm16_body(self):
+        """Test an application/octet-stream pcm16 body is analyzed"""
+        body = (self.audio * 32767).astype('<i2').tobytes()
+        response = self.client.post(
+            '/api/audio/analyze', data=body,
+            content_type='application/octet-stream',
+            headers={'X-Audio-Format': 'pcm16', 'X-Sample-Rate': '16000'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('threat_type', response.get_json()['result'])
+
+    def test_invalid_overlap_header(self):
+        """Test a non-numeric X-Overlap header is rejected with 400"""
+        body = (self.audio * 32767).astype('<i2').tobytes()
+        response = self.client.post(
+            '/api/audio/analyze', data=body,
+            content_type='application/octet-stream',
+            headers={'X-Audio-Format': 'pcm16', 'X-Overlap': 'half'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('X-Overlap', response.get_json()['error'])
+
+    def test_invalid_layout_headers(self):
+        """Test zero channels or unsupported sample rates are rejected with 400"""
+        body = (self.audio * 32767).astype('<i2').tobytes()
+        for headers in ({'X-Channels': '0'}, {'X-Sample-Rate': '0'}, {'X-Sample-Rate': '-16000'},
+                        {'X-Sample-Rate': '47999'}):
+            response = self.client.post('/api/audio/analyze', data=body,
+                                        content_type='application/octet-stream', headers=headers)
+            self.assertEqual(response.status_code, 400)
+
+    def test_decode_matches_float32(self):
+        """Test pcm16 and float32 bodies decode to the same samples"""
+        from utils.audio_decoder import decode_pcm_body
+
+        pcm16 = decode_pcm_body((self.audio * 32768).clip(-32768, 32767).astype('<i2').tobytes(), 'pcm16')
+        float32 = decode_pcm_body(self.audio.astype('<f4').tobytes(), 'float32')
+
+        np.testing.assert_allclose(pcm16, float32, atol=1e-4)
+
+    def test_unsupported_format(self):
+        """Test an unknown X-Audio-Format is rejected"""
+        response = self.client.post(
+            '/api/audio/analyze', data=b'\x00' * 6400,
+            content_type='application/octet-stream',
+            headers={'X-Audio-Format': 'mulaw'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_msgpack_response(self):
+        """Test Accept: application/msgpack returns a MessagePack body"""
+        from api.routes.audio_routes import MSGPACK_AVAILABLE
+        if not MSGPACK_AVAILABLE:
+            self.skipTest('msgpack not installed')
+        import msgpack
+
+        response = self.client.post(
+            '/api/audio/analyze', data=self.audio.astype('<f4').tobytes(),
+            content_type='application/octet-stream',
+            headers={'X-Audio-Format': 'float32', 'Accept': 'application/msgpack'}
+        )
+
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        self.assertTrue(msgpack.unpackb(response.data)['success'])
+
+
+class TestPendingSpeech(unittest.TestCase):
+    """Test speech results delivered after /analyze returns"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.service = get_threat_detector().transcription_service
+        self.original_recognize = self.service.recognize
+
+    def tearDown(self):
+        self.service.recognize = self.original_recognize
+
+    def test_slow_speech_is_collected_later(self):
+        """Test /analyze returns before slow speech and /speech-result delivers it"""
+        import time
+
+        def slow_recognizer(audio_data, sample_rate, language_code):
+            time.sleep(1.5)
+            return 'help me' if language_code == 'en-US' else None
+
+        self.service.recognize = slow_recognizer
+        audio = voiced_audio()
+        body = (audio * 32767).astype('<i2').tobytes()
+
+        start = time.perf_counter()
+        response = self.client.post('/api/audio/analyze', data=body, content_type='application/octet-stream')
+        speech = response.get_json()['result']['speech_result']
+
+        self.assertLess(time.perf_counter() - start, 1.5)
+        self.assertTrue(speech['pending'])
+
+        time.sleep(1.0)
+        job = self.client.get(f"/api/audio/speech-result/{speech['job_id']}").get_json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['speech_result']['text'], 'help me')
+
+    def test_no_voice_skips_asr(self):
+        """Test chunks without voice activity never reach the recognizer"""
+        calls = []
+        self.service.recognize = lambda *args: calls.append(args)
+
+        audio = (np.random.randn(16000 * 2) * 0.3).clip(-1, 1)
+        body = (audio * 32767).astype('<i2').tobytes()
+        result = self.client.post('/api/audio/analyze', data=body,
+                                  content_type='application/octet-stream').get_json()['result']
+
+        self.assertIsNone(result['speech_result'])
+        self.assertEqual(result['details']['speech_skipped'], 'No voice activity')
+        self.assertEqual(calls, [])
+
+        cascade = self.client.get('/api/audio/status').get_json()['detector']['cascade']
+        self.assertGreater(cascade['stages']['vad']['evaluated'], 0)
+
+    def test_unknown_job(self):
+        """Test unknown job ids return 404"""
+        response = self.client.get('/api/audio/speech-result/tx-missing')
+        self.assertEqual(response.status_code, 404)
+
+
+class TestStreamTransport(unittest.TestCase):
+    """Test continuous PCM streams"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.detector = get_threat_detector()
+        audio = (np.random.randn(16000 * 5) * 0.3).clip(-1, 1)
+        self.pcm = (audio * 32767).astype('<i2').tobytes()
+
+    def test_session_handles_split_frames(self):
+        """Test odd-sized writes are buffered into overlapping 2 s chunks"""
+        from api.streaming import StreamSession
+
+        session = StreamSession(self.detector, 'stream-a')
+        events = []
+        for start in range(0, len(self.pcm), 3001):
+            events.extend(session.feed(self.pcm[start:start + 3001]))
+
+        # 5 s of audio, 2 s chunks every 1 s
+        self.assertEqual([e['chunk_index'] for e in events], [0, 1, 2, 3])
+        self.assertEqual(events[1]['stream_time'], 1.0)
+        self.assertEqual(session.close()['chunks_analyzed'], 4)
+
+    def test_stream_rescored_at_finer_hop(self):
+        """Test a session chunk re-scores several sub-windows from buffered frames"""
+        from config import AudioConfig
+        if AudioConfig.RESCORE_HOP <= 0 or not AudioConfig.STREAMING_FEATURES:
+            self.skipTest('re-scoring disabled')
+
+        state = self.detector.get_session_state('stream-rescore')
+        audio = (np.random.randn(16000 * 2) * 0.3).clip(-1, 1).astype(np.float32)
+        first = self.detector.analyze_audio(audio, enable_speech=False, state=state)
+        second = self.detector.analyze_audio(audio, enable_speech=False, state=state)
+
+        self.assertEqual(first['non_speech_result']['windows_scored'], 1)
+        self.assertEqual(second['non_speech_result']['windows_scored'], 4)  # 2 s of new frames, 0.5 s hop
+
+    def test_session_features_match_batch_under_global_normalization(self):
+        """Test a session chunk gets the batch (peak-normalized) features when the model takes raw features"""
+        model = self.detector.non_speech_model
+        saved = (model.feature_mean, model.feature_std, model._inference_model, model.optimized_info)
+
+        def restore():
+            model.feature_mean, model.feature_std, model._inference_model, model.optimized_info = saved
+        self.addCleanup(restore)
+        model.set_normalization(np.zeros(132, dtype=np.float32), np.ones(132, dtype=np.float32))
+
+        state = self.detector.get_session_state('stream-global-norm')
+        audio = (np.random.randn(16000 * 2) * 0.1).clip(-1, 1).astype(np.float32)
+        processed = self.detector.audio_processor.preprocess_audio(audio)
+        features, windows = self.detector._chunk_features(state, audio, processed, overlap=0.0)
+
+        expected = self.detector.feature_extractor.extract_fixed_length_features(processed)
+        np.testing.assert_allclose(features, expected)
+        self.assertEqual(len(windows), 1)
+        self.assertIsNone(state.feature_stream)
+
+    def test_chunked_http_stream(self):
+        """Test /stream returns one NDJSON event per chunk and a summary"""
+        import json
+
+        self.client.post('/api/detection/start', json={'session_id': 'stream-b', 'sensitivity': 'high'})
+        response = self.client.post(
+            '/api/detection/stream', data=self.pcm,
+            content_type='application/octet-stream',
+            headers={'X-Session-Id': 'stream-b'}
+        )
+        events = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        self.assertEqual([e['type'] for e in events], ['detection'] * 4 + ['summary'])
+        self.assertEqual(events[-1]['sensitivity'], 'high')
+        self.assertEqual(self.detector.get_session_state('stream-b').chunks_processed, 4)
+
+    def test_websocket_bad_frames_end_with_summary(self):
+        """Test malformed WebSocket messages produce an error event and a summary, not a crash"""
+        import json
+        from unittest.mock import patch
+        from api.routes import detection_routes
+
+        class FakeSocket:
+            def __init__(self, messages):
+                self.messages = list(messages)
+                self.sent = []
+
+            def receive(self):
+                return self.messages.pop(0) if self.messages else None
+
+            def send(self, data):
+                self.sent.append(json.loads(data))
+
+        bad_config = FakeSocket([json.dumps({'session_id': 'ws-a', 'sample_rate': 0})])
+        detection_routes._run_websocket_stream(bad_config)
+        self.assertEqual([e['type'] for e in bad_config.sent], ['error'])
+
+        ws = FakeSocket([json.dumps({'session_id': 'ws-b'}), 'not json', '[1, 2]', self.pcm[:32000], None])
+        detection_routes._run_websocket_stream(ws)
+        self.assertEqual(ws.sent[0]['type'], 'ready')
+        self.assertEqual(ws.sent[-1]['type'], 'summary')
+
+        failing = FakeSocket([json.dumps({'session_id': 'ws-c'}), b'\x00\x00'])
+        with patch.object(detection_routes.StreamSession, 'feed', side_effect=ValueError('bad frame')):
+            detection_routes._run_websocket_stream(failing)
+        self.assertEqual([e['type'] for e in failing.sent], ['ready', 'error', 'summary'])
+
+    def test_stream_rejects_bad_layout(self):
+        """Test zero channels or an unsupported sample rate are rejected with 400"""
+        for headers in ({'X-Channels': '0'}, {'X-Sample-Rate': '0'}, {'X-Sample-Rate': '44101'}):
+            response = self.client.post('/api/detection/stream', data=self.pcm,
+                                        content_type='application/octet-stream', headers=headers)
+            self.assertEqual(response.status_code, 400)
+
+
+
+class TestMetrics(unittest.TestCase):
+    """Test per-stage spans and the /metrics endpoint"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.body = (voiced_audio() * 32767).astype('<i2').tobytes()
+
+    def analyze(self, query=''):
+        return self.client.post(
+            f'/api/audio/analyze{query}', data=self.body,
+            content_type='application/octet-stream', headers={'X-Audio-Format': 'pcm16'}
+        ).get_json()['result']
+
+    def test_trace_spans(self):
+        """Test ?trace=true attaches stage timings and they are off by default"""
+        self.assertNotIn('timings', self.analyze('?speech=false'))
+
+        timings = self.analyze('?speech=false&trace=true')['timings']
+        stages = [span['stage'] for span in timings]
+        self.assertEqual(stages[:2], ['decode', 'preprocess'])
+        self.assertTrue(all(span['ms'] >= 0 for span in timings))
+
+    def test_metrics_endpoint(self):
+        """Test /metrics exposes counters, stage histograms and executor gauges"""
+        self.analyze('?speech=false')
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE audio_chunks_total counter', text)
+        self.assertIn('audio_stage_seconds_bucket{stage="decode",le="+Inf"}', text)
+        self.assertIn('audio_inference_queue_depth', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,15 +5,31 @@ Using PyTorch backend
 import sys
 import os
 import unittest
+import time
+import json
 import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Only import what we're testing - avoid heavy imports if not needed
 from utils.audio_processor import AudioProcessor
-from utils.feature_extractor import FeatureExtractor
-from utils.noise_profiler import NoiseProfiler
-from models.speech_threat_model import SpeechThreatDetector
+from utils.resampler import StreamingResampler, get_kernel, resample
+from utils.feature_extractor import FeatureExtractor, StreamingFeatureExtractor
+from utils.noise_profiler import NoiseProfiler, NoiseProfileStore
+from models.speech_threat_model import SpeechThreatDetector, load_vosk_model
+from models.streaming_asr import StreamingRecognizer
+from models.non_speech_model import NonSpeechThreatModel
+from models.model_export import export_optimized, fuse_batchnorm
+from models.threat_detector import BatchInferenceEngine
+from models.session_state import DetectionState, SessionStateStore
+from utils.decoder_pool import DecoderPool, PYAV_AVAILABLE
+from models.transcription_service import TranscriptionService
+from utils.lexicon_store import LexiconStore
+from utils.gating import CascadeStats, ChunkSpectrum, SpectralGate, VoiceActivityDetector
+from utils.language_id import LanguageIdentifier, LanguagePrior, LanguageRouter
+from utils.feature_cache import FeatureCache
+from utils.training_data import AugmentedClipDataset, ShardDataset, feature_statistics, make_loader
+from utils.metrics import MetricsRegistry, StageTimer
 
 
 class TestAudioProcessor(unittest.TestCase):
@@ -51,6 +67,59 @@ class TestAudioProcessor(unittest.TestCase):
         for chunk in chunks:
             self.assertEqual(len(chunk), int(self.processor.chunk_duration * self.processor.sample_rate))
 
+    def test_iter_chunks_matches_split(self):
+        """Test block-wise chunking yields the same chunks as splitting the whole signal"""
+        audio = np.random.randn(16000 * 13 + 1234).astype(np.float32)
+        expected = self.processor.split_into_chunks(audio, return_offsets=True)
+
+        blocks = [audio[i:i + 20000] for i in range(0, len(audio), 20000)]
+        streamed = list(self.processor.iter_chunks(blocks))
+
+        self.assertEqual(len(streamed), len(expected))
+        for (start_s, chunk), (start, expected_chunk) in zip(streamed, expected):
+            self.assertAlmostEqual(start_s, start / self.processor.sample_rate)
+            np.testing.assert_array_equal(chunk, expected_chunk)
+
+
+class TestResampler(unittest.TestCase):
+    """Test the cached-kernel and streaming resamplers"""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_matches_torchaudio(self):
+        """Test one-shot resampling matches torchaudio's kernel"""
+        import torch
+        import torchaudio
+
+        for rate in (44100, 48000):
+            audio = self.rng.normal(0, 0.3, rate + 77).astype(np.float32)
+            expected = torchaudio.functional.resample(torch.from_numpy(audio).unsqueeze(0), rate, 16000)[0].numpy()
+            actual = resample(audio, rate, 16000)
+            self.assertEqual(len(actual), len(expected))
+            np.testing.assert_allclose(actual, expected, atol=1e-4)
+        self.assertIs(get_kernel(44100, 16000), get_kernel(44100, 16000))
+
+    def test_streaming_matches_whole_signal(self):
+        """Test a stream resampled in uneven blocks equals the whole signal resampled at once"""
+        audio = self.rng.normal(0, 0.3, 3 * 44100).astype(np.float32)
+        stream = StreamingResampler(44100, 16000)
+
+        parts, start = [], 0
+        for size in (1, 500, 4410, 30000, 88200):
+            parts.append(stream.push(audio[start:start + size]))
+            start += size
+        parts.append(stream.push(audio[start:]))
+        parts.append(stream.flush())
+
+        np.testing.assert_allclose(np.concatenate(parts), resample(audio, 44100, 16000), atol=1e-6)
+
+    def test_rejects_unbounded_rates(self):
+        """Test rates needing a huge filter bank, or non-positive rates, are rejected"""
+        for rate in (44101, 47999, 0, -16000):
+            with self.assertRaises(ValueError):
+                resample(np.zeros(1000, dtype=np.float32), rate, 16000)
+
 
 class TestFeatureExtractor(unittest.TestCase):
     """Test FeatureExtractor class"""
@@ -86,6 +155,85 @@ class TestFeatureExtractor(unittest.TestCase):
         
         self.assertEqual(features.shape[1], target_length)
 
+    def test_matches_reference_pipeline(self):
+        """Test the fused single-STFT pipeline matches the original three-transform path"""
+        from benchmarks.reference_features import ReferenceFeatureExtractor
+
+        reference = ReferenceFeatureExtractor()
+        for audio in (self.test_audio, np.random.randn(16000 * 10) * 0.1):
+            expected = reference.extract_all_features(audio.astype(np.float32))
+            features = self.extractor.extract_all_features(audio)
+
+            self.assertEqual(features.shape, expected.shape)
+            np.testing.assert_allclose(features, expected, rtol=1e-4, atol=1e-3)
+
+
+class TestStreamingFeatureExtractor(unittest.TestCase):
+    """Test StreamingFeatureExtractor class"""
+
+    def setUp(self):
+        self.extractor = FeatureExtractor()
+        rng = np.random.default_rng(0)
+        t = np.arange(48000) / 16000
+        self.audio = (0.3 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 0.05, 48000)).astype(np.float32)
+
+    def test_window_shape(self):
+        """Test the streaming window matches the fixed-length layout"""
+        stream = StreamingFeatureExtractor(self.extractor)
+        window = stream.push(self.audio[:32000])
+        expected = self.extractor.extract_fixed_length_features(self.audio[:32000])
+
+        self.assertEqual(window.shape, expected.shape)
+
+    def test_matches_batch_mfcc(self):
+        """Test MFCCs of streamed frames match the batch extractor"""
+        stream = StreamingFeatureExtractor(self.extractor)
+        window = stream.push(self.audio[:32000])
+        expected = self.extractor.extract_all_features(self.audio[:32000])
+
+        n = stream.frames_computed - 2  # trailing frames differ by end padding
+        np.testing.assert_allclose(window[:40, :n], expected[:40, :n], atol=1e-2)
+
+    def test_piecewise_push_is_consistent(self):
+        """Test pushing in small pieces equals pushing at once"""
+        whole = StreamingFeatureExtractor(self.extractor).push(self.audio)
+
+        stream = StreamingFeatureExtractor(self.extractor)
+        for start in range(0, len(self.audio), 4000):
+            pieces = stream.push(self.audio[start:start + 4000])
+
+        np.testing.assert_allclose(pieces, whole, atol=1e-4)
+
+    def test_only_new_frames_computed(self):
+        """Test overlapping chunks only transform the new half"""
+        stream = StreamingFeatureExtractor(self.extractor)
+        stream.push(self.audio[:32000])
+        first = stream.frames_computed
+        stream.push(self.audio[32000:48000])  # second chunk minus its 50% overlap
+
+        self.assertLessEqual(stream.frames_computed - first, first // 2 + 1)
+
+    def test_recent_windows_match_earlier_windows(self):
+        """Test windows re-assembled from the frame ring equal the windows seen earlier in the stream"""
+        stream = StreamingFeatureExtractor(self.extractor)
+        seen = []
+        for start in range(0, 48000, 8192):
+            stream.push(self.audio[start:start + 8192])
+            seen.append((stream.frames_computed, stream.get_window()))
+
+        total = stream.frames_computed
+        checked = 0
+        for frames, window in seen:
+            if frames >= stream.window_frames:  # earlier windows were still filling up
+                np.testing.assert_allclose(stream.get_window(total - frames), window, atol=1e-5)
+                checked += 1
+        self.assertGreater(checked, 1)
+
+        offsets = [offset for offset, _ in stream.recent_windows(4)]
+        self.assertEqual(offsets[-1], 0)
+        self.assertEqual(offsets, sorted(offsets, reverse=True))
+        self.assertLess(offsets[0], stream.last_push_frames)
+
 
 class TestNoiseProfiler(unittest.TestCase):
     """Test NoiseProfiler class"""
@@ -123,6 +271,103 @@ class TestNoiseProfiler(unittest.TestCase):
         
         self.assertGreater(snr, 0)
     
+    def test_denoise_any_length(self):
+        """Test a profile calibrated on 1 s chunks denoises other lengths"""
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.02)
+
+        t = np.arange(24000) / 16000
+        tone = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        noisy = tone + (np.random.randn(24000) * 0.02).astype(np.float32)
+        clean = self.profiler.denoise_audio(noisy)
+
+        self.assertEqual(clean.shape, noisy.shape)
+        self.assertLess(np.std(clean - tone), np.std(noisy - tone) * 0.7)
+
+    def test_overlap_add_reconstructs(self):
+        """Test nothing subtracted gives back the input"""
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(8000) * 0.01)
+        self.profiler.over_subtraction = 0.0
+
+        audio = (np.random.randn(12345) * 0.3).astype(np.float32)
+        np.testing.assert_allclose(self.profiler.denoise_audio(audio), audio, atol=1e-5)
+
+    def test_denoise_batch(self):
+        """Test batch denoising matches chunk-by-chunk denoising"""
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.02)
+
+        chunks = (np.random.randn(3, 32000) * 0.2).astype(np.float32)
+        batch = self.profiler.denoise_batch(chunks)
+
+        for chunk, denoised in zip(chunks, batch):
+            np.testing.assert_allclose(denoised, self.profiler.denoise_audio(chunk), atol=1e-5)
+
+    def test_running_estimate_tracks_noise(self):
+        """Test the online estimate follows a change in noise level"""
+        for _ in range(20):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.01)
+        quiet_floor = self.profiler.current_noise_floor
+        for _ in range(200):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.05)
+
+        self.assertAlmostEqual(quiet_floor, 0.01, delta=0.003)
+        self.assertAlmostEqual(self.profiler.current_noise_floor, 0.05, delta=0.01)
+        self.assertEqual(self.profiler.samples_seen, 220)
+
+    def test_background_recalibration_interval(self):
+        """Test quiet chunks update the profile at most once per interval"""
+        quiet = np.random.randn(16000) * 0.01
+
+        self.assertTrue(self.profiler.maybe_recalibrate(quiet, now=1000.0))
+        self.assertFalse(self.profiler.maybe_recalibrate(quiet, now=1001.0))
+        self.assertTrue(self.profiler.maybe_recalibrate(quiet, now=1100.0))
+        self.assertEqual(self.profiler.auto_updates, 2)
+
+    def test_background_recalibration_ignores_louder_chunks(self):
+        """Test re-calibration skips chunks above the floor plus the margin"""
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.01)
+        floor = self.profiler.current_noise_floor
+        self.profiler.last_update = None
+
+        self.assertFalse(self.profiler.maybe_recalibrate(np.random.randn(16000) * 0.03, now=1000.0))
+        self.assertEqual(self.profiler.current_noise_floor, floor)
+        self.assertTrue(self.profiler.maybe_recalibrate(np.random.randn(16000) * 0.01, now=1000.0))
+
+    def test_background_recalibration_ignores_digital_silence(self):
+        """Test all-zero chunks never pull the noise floor down"""
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.01)
+        floor = self.profiler.current_noise_floor
+
+        for step in range(8):
+            self.assertFalse(self.profiler.maybe_recalibrate(np.zeros(16000), now=1000.0 + 100 * step))
+        self.assertEqual(self.profiler.current_noise_floor, floor)
+        self.assertEqual(self.profiler.auto_updates, 0)
+
+    def test_profile_store_round_trip(self):
+        """Test a location's profile is saved and restored"""
+        import tempfile
+
+        for _ in range(5):
+            self.profiler.update_noise_profile(np.random.randn(16000) * 0.02)
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = NoiseProfileStore(directory)
+            store.save('gate/cam-1', self.profiler)
+
+            restored = NoiseProfiler()
+            self.assertTrue(store.load('gate/cam-1', restored))
+            self.assertFalse(store.load('library', NoiseProfiler()))
+            self.assertFalse(store.load('gate_cam-1', NoiseProfiler()))
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+        self.assertTrue(restored.is_calibrated)
+        self.assertAlmostEqual(restored.current_noise_floor, self.profiler.current_noise_floor)
+        np.testing.assert_allclose(restored.current_noise_spectrum, self.profiler.current_noise_spectrum)
+
     def test_reset(self):
         """Test profile reset"""
         noise = np.random.randn(16000) * 0.01
@@ -164,6 +409,743 @@ class TestSpeechThreatDetector(unittest.TestCase):
         
         self.assertTrue(result['is_threat'])
 
+    def test_matcher_matches_reference_loop(self):
+        """Test the compiled matcher returns exactly what the per-keyword loop did"""
+        import random
+        from benchmarks.reference_keywords import reference_match
+
+        lists = (self.detector.english_threats, self.detector.english_profanity,
+                 self.detector.sinhala_threats, self.detector.sinhala_profanity)
+        vocab = [k for keywords in lists for k in keywords] + ['killer', 'guns', 'studied', 'hello']
+        rng = random.Random(0)
+
+        for _ in range(300):
+            words = [rng.choice(vocab) for _ in range(rng.randint(1, 20))]
+            text = ''.join(w + rng.choice([' ', '', '-', '_', ', ']) for w in words)
+            if rng.random() < 0.3:
+                text = text.upper()
+            self.assertEqual(self.detector.keyword_matcher.match(text), reference_match(text, *lists))
+
+
+class TestLexiconStore(unittest.TestCase):
+    """Test LexiconStore class"""
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'lexicon.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_lexicon(self, version, english_threats):
+        import json
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'english_threats': english_threats}, f)
+
+    def wait_for_rebuild(self, store):
+        for _ in range(100):
+            if not store.get_status()['rebuilding']:
+                return
+            time.sleep(0.01)
+
+    def test_builtin_without_file(self):
+        """Test the config lists are used when no lexicon file exists"""
+        store = LexiconStore(path=self.path)
+        self.assertEqual(store.get().version, 'builtin')
+        self.assertIn('kill', store.get().english_threats)
+
+    def test_hot_reload(self):
+        """Test a changed file is rebuilt and swapped in"""
+        self.write_lexicon('1', ['Intruder'])
+        store = LexiconStore(path=self.path, poll_interval=0)
+        detector = SpeechThreatDetector(lexicon_store=store)
+        self.assertTrue(detector.detect_threats('an intruder is here')['is_threat'])
+
+        self.write_lexicon('2', ['lockdown'])
+        store.get()
+        self.wait_for_rebuild(store)
+
+        self.assertEqual(store.get().version, '2')
+        self.assertFalse(detector.detect_threats('an intruder is here')['is_threat'])
+        self.assertTrue(detector.detect_threats('lockdown now')['is_threat'])
+
+    def test_invalid_file_keeps_active_lexicon(self):
+        """Test a malformed file does not replace the active lexicon"""
+        self.write_lexicon('1', ['intruder'])
+        store = LexiconStore(path=self.path)
+
+        with open(self.path, 'w') as f:
+            f.write('{"version": "2", "english_threats": [')
+        store.reload()
+
+        self.assertEqual(store.get().version, '1')
+        self.assertIsNotNone(store.get_status()['last_error'])
+
+
+class TestGlobalNormalization(unittest.TestCase):
+    """Test dataset-level normalization folded into NonSpeechThreatModel"""
+
+    def setUp(self):
+        import torch
+
+        self.model = NonSpeechThreatModel()
+        self.model.build_model()
+        for module in self.model.model.modules():
+            if isinstance(module, torch.nn.BatchNorm1d):
+                module.running_mean.uniform_(-1, 1)
+                module.running_var.uniform_(0.5, 2.0)
+
+        self.mean = (np.random.randn(132) * 3).astype(np.float32)
+        self.std = (np.random.rand(132) * 4 + 0.1).astype(np.float32)
+        self.windows = (np.random.randn(3, 128, 132) * self.std + self.mean).astype(np.float32)
+
+    def test_folded_matches_explicit(self):
+        """Test raw features through the folded conv match explicitly normalized input"""
+        import torch
+
+        self.model.model.eval()
+        with torch.no_grad():
+            expected = torch.softmax(self.model.model(
+                torch.as_tensor((self.windows - self.mean) / self.std)), dim=1).numpy()
+
+        self.model.set_normalization(self.mean, self.std)
+        probs = np.array([p for _, _, p in self.model.predict_batch(self.windows)])
+
+        np.testing.assert_allclose(probs, expected, atol=1e-5)
+
+    def test_statistics_saved_with_model(self):
+        """Test normalization statistics are saved next to the weights and restored"""
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.model.model_path = os.path.join(directory, 'model.pth')
+            self.model.normalization_path = os.path.join(directory, 'model_normalization.npz')
+            self.model.set_normalization(*NonSpeechThreatModel.compute_normalization(self.windows))
+            self.model.save_model()
+
+            restored = NonSpeechThreatModel()
+            restored.model_path = self.model.model_path
+            restored.normalization_path = self.model.normalization_path
+            self.assertTrue(restored.load_model())
+
+        self.assertTrue(restored.uses_global_normalization)
+        np.testing.assert_allclose(restored.feature_mean, self.windows.mean(axis=(0, 1)), rtol=1e-5)
+
+
+class TestOptimizedModel(unittest.TestCase):
+    """Test the BatchNorm-folded, quantized TorchScript export"""
+
+    def setUp(self):
+        import tempfile
+        import torch
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.model = NonSpeechThreatModel()
+        self.model.model_path = os.path.join(self.directory.name, 'model.pth')
+        self.model.normalization_path = os.path.join(self.directory.name, 'model_normalization.npz')
+        self.model.optimized_path = os.path.join(self.directory.name, 'model_optimized.pt')
+        self.model.build_model()
+        for module in self.model.model.modules():
+            if isinstance(module, torch.nn.BatchNorm1d):
+                module.running_mean.uniform_(-1, 1)
+                module.running_var.uniform_(0.5, 2.0)
+
+        self.windows = np.random.randn(8, 128, 132).astype(np.float32)
+        self.model.set_normalization(*NonSpeechThreatModel.compute_normalization(self.windows))
+        self.model.save_model()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fused_batchnorm_matches(self):
+        """Test folding BatchNorm leaves the float outputs unchanged"""
+        import torch
+
+        network = self.model._get_inference_model()
+        fused = fuse_batchnorm(network)
+        self.assertFalse(any(isinstance(m, torch.nn.BatchNorm1d) for m in fused.modules()))
+
+        with torch.no_grad():
+            x = torch.as_tensor(self.windows)
+            np.testing.assert_allclose(fused(x).numpy(), network(x).numpy(), atol=1e-4)
+
+    def test_exported_model_loaded(self):
+        """Test the exported artifact is preferred on load and agrees with the float model"""
+        expected = np.array([probs for _, _, probs in self.model.predict_batch(self.windows)])
+        export_optimized(self.model)
+
+        restored = NonSpeechThreatModel()
+        restored.model_path = self.model.model_path
+        restored.normalization_path = self.model.normalization_path
+        restored.optimized_path = self.model.optimized_path
+        self.assertTrue(restored.load_model())
+        self.assertTrue(restored.load_optimized())
+        self.assertTrue(restored.optimized_info['quantized'])
+
+        probs = np.array([probs for _, _, probs in restored.predict_batch(self.windows)])
+        np.testing.assert_allclose(probs, expected, atol=1e-2)
+
+    def test_stale_artifact_ignored(self):
+        """Test an artifact exported from different weights is not used"""
+        export_optimized(self.model)
+        self.model.set_normalization(self.model.feature_mean + 1.0, self.model.feature_std)
+        self.model.save_model()
+
+        self.assertFalse(self.model.load_optimized())
+        self.assertIsNone(self.model.optimized_info)
+
+
+class TestFeatureCache(unittest.TestCase):
+    """Test the content-addressed training feature cache"""
+
+    def setUp(self):
+        import tempfile
+        import soundfile as sf
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i, freq in enumerate((440, 880)):
+            path = os.path.join(self.directory.name, f'clip_{i}.wav')
+            t = np.arange(48000) / 16000
+            sf.write(path, (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32), 16000)
+            self.paths.append(path)
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_warm_run_reads_shards(self):
+        """Test a second run reads memory-mapped shards identical to the extracted windows"""
+        cold = FeatureCache(self.cache_dir, workers=1)
+        X, y = cold.build_dataset(self.paths, ['a', 'b'])
+        self.assertEqual(cold.misses, 2)
+        self.assertEqual(X.shape[1:], (128, 132))
+        self.assertEqual(len(y), len(X))
+
+        warm = FeatureCache(self.cache_dir, workers=1)
+        shards = warm.load_files(self.paths)
+        self.assertEqual((warm.hits, warm.misses), (2, 0))
+        self.assertIsInstance(shards[0], np.memmap)
+        np.testing.assert_array_equal(np.concatenate(shards), X)
+
+    def test_changed_file_is_a_miss(self):
+        """Test shards are keyed by file content, not path"""
+        import soundfile as sf
+
+        FeatureCache(self.cache_dir, workers=1).load_files(self.paths)
+        sf.write(self.paths[0], np.zeros(16000, dtype=np.float32), 16000)
+
+        cache = FeatureCache(self.cache_dir, workers=1)
+        cache.load_files(self.paths)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class TestTrainingData(unittest.TestCase):
+    """Test the streaming training datasets"""
+
+    def setUp(self):
+        import tempfile
+        import soundfile as sf
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        t = np.arange(40000) / 16000
+        for i, freq in enumerate((440, 880, 1320)):
+            path = os.path.join(self.directory.name, f'clip_{i}.wav')
+            sf.write(path, (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32), 16000)
+            self.paths.append(path)
+        self.noise_path = os.path.join(self.directory.name, 'noise.wav')
+        sf.write(self.noise_path, np.random.default_rng(0).normal(0, 0.1, 16000).astype(np.float32), 16000)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_shard_dataset_matches_cache(self):
+        """Test shard items are the cached windows, labelled by file"""
+        cache = FeatureCache(os.path.join(self.directory.name, 'cache'), workers=1)
+        X, _ = cache.build_dataset(self.paths, [0, 1, 2])
+        dataset = ShardDataset(self.paths, [0, 1, 2], cache=cache)
+
+        self.assertEqual(len(dataset), len(X))
+        for index in (0, len(X) // 2, len(X) - 1):
+            window, label = dataset[index]
+            np.testing.assert_array_equal(window.numpy(), X[index])
+        self.assertEqual(sorted(set(dataset.labels.tolist())), [0, 1, 2])
+
+        mean, std = feature_statistics(dataset, workers=0)
+        np.testing.assert_allclose(mean, NonSpeechThreatModel.compute_normalization(X)[0], rtol=1e-4, atol=1e-4)
+
+    def test_augmentation_is_reproducible(self):
+        """Test augmented items depend only on seed, epoch and index, also across loader workers"""
+        import torch
+
+        dataset = AugmentedClipDataset(self.paths, [0, 1, 2], noise_paths=[self.noise_path], seed=7)
+        first = dataset[1][0]
+        self.assertEqual(tuple(first.shape), (128, 132))
+        np.testing.assert_array_equal(first.numpy(), dataset[1][0].numpy())
+
+        dataset.set_epoch(1)
+        self.assertFalse(np.array_equal(first.numpy(), dataset[1][0].numpy()))
+
+        dataset.set_epoch(0)
+        batches = [torch.cat([x for x, _ in make_loader(dataset, 2, shuffle=True, workers=workers, seed=3)])
+                   for workers in (0, 2)]
+        np.testing.assert_array_equal(batches[0].numpy(), batches[1].numpy())
+
+    def test_augmented_crops_match_inference_level(self):
+        """Test crops are peak-normalized like inference chunks"""
+        dataset = AugmentedClipDataset(self.paths, [0, 1, 2], augment=False)
+        processor, extractor = dataset._get_tools()
+        audio = processor.preprocess_audio(processor.load_audio(self.paths[0])[0])
+        crop = dataset._crop(audio, max(len(audio) - dataset.chunk_samples, 0) // 2)
+        expected = extractor.extract_fixed_length_features(processor.normalize_audio(crop), 128).T
+        np.testing.assert_allclose(dataset[0][0].numpy(), expected, rtol=1e-5, atol=1e-5)
+
+    def test_train_streaming(self):
+        """Test a streaming training epoch sets the normalization and reports history"""
+        model = NonSpeechThreatModel()
+        dataset = AugmentedClipDataset(self.paths, [0, 1, 2], seed=1)
+        history = model.train_streaming(dataset, epochs=1, batch_size=2, workers=0)
+
+        self.assertEqual(len(history['loss']), 1)
+        self.assertTrue(model.uses_global_normalization)
+        self.assertEqual(model.feature_mean.shape, (132,))
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test Prometheus text rendering and the stage timer"""
+
+    def test_render(self):
+        """Test counters and cumulative histogram buckets are rendered"""
+        registry = MetricsRegistry()
+        skips = registry.counter('skips_total', 'Skipped chunks', ['reason'])
+        latency = registry.histogram('stage_seconds', 'Stage time', ['stage'], buckets=(0.01, 0.1))
+        skips.inc(reason='no_voice')
+        skips.inc(reason='no_voice')
+        for value in (0.005, 0.05, 0.5):
+            latency.observe(value, stage='model')
+
+        text = registry.render()
+        self.assertIn('skips_total{reason="no_voice"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="model",le="0.01"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="model",le="0.1"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="model",le="+Inf"} 3', text)
+        self.assertIn('stage_seconds_count{stage="model"} 3', text)
+
+    def test_disabled_timer(self):
+        """Test a timer with no histogram and no tracing records nothing"""
+        timer = StageTimer()
+        timer.lap('model')
+        self.assertFalse(timer.enabled)
+        self.assertIsNone(timer.spans)
+
+
+class TestBatchInferenceEngine(unittest.TestCase):
+    """Test BatchInferenceEngine class"""
+
+    def setUp(self):
+        self.model = NonSpeechThreatModel()
+        self.model.build_model()
+        self.engine = BatchInferenceEngine(self.model, max_batch_size=8, max_wait=0.2)
+
+    def test_batched_matches_single(self):
+        """Test batched results match per-chunk prediction"""
+        import threading
+
+        windows = [np.random.randn(128, 132).astype(np.float32) for _ in range(6)]
+        futures = [None] * len(windows)
+
+        def submit(i):
+            futures[i] = self.engine.submit(windows[i])
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(windows))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for window, future in zip(windows, futures):
+            class_name, confidence, probs, batch_info = future.result(timeout=10)
+            expected_class, expected_conf, _ = self.model.predict(window)
+            self.assertEqual(class_name, expected_class)
+            self.assertAlmostEqual(confidence, expected_conf, places=4)
+            self.assertIn('chunks_per_second_per_core', batch_info)
+
+        self.assertLess(self.engine.get_stats()['batches_run'], len(windows))
+
+    def test_worker_pool_stats(self):
+        """Test several workers share the queue and report depth and utilization"""
+        engine = BatchInferenceEngine(self.model, max_batch_size=2, max_wait=0.0,
+                                      workers=2, threads_per_worker=1)
+        futures = [engine.submit(np.random.randn(128, 132).astype(np.float32)) for _ in range(6)]
+        for future in futures:
+            future.result(timeout=10)
+
+        stats = engine.get_stats()
+        self.assertEqual(stats['workers'], 2)
+        self.assertEqual(stats['threads_per_worker'], 1)
+        self.assertEqual(stats['chunks_processed'], 6)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(len(stats['worker_utilization']), 2)
+        self.assertGreater(stats['utilization'], 0.0)
+
+
+class TestDetectionState(unittest.TestCase):
+    """Test DetectionState class"""
+
+    def test_states_are_independent(self):
+        """Test sensitivity and history do not leak between states"""
+        first = DetectionState()
+        second = DetectionState()
+
+        first.set_sensitivity('high')
+        first.detection_history.append({'class': 'screaming', 'is_threat': True})
+
+        self.assertEqual(first.consecutive_required, 2)
+        self.assertEqual(second.consecutive_required, 3)
+        self.assertEqual(len(second.detection_history), 0)
+
+        first.class_thresholds['crying'] = 0.1
+        self.assertEqual(DetectionState().class_thresholds['crying'], 0.82)
+
+    def test_rescored_windows_confirm_over_whole_chunks(self):
+        """Test quarter-chunk windows need as much audio as whole chunks to confirm"""
+        state = DetectionState()
+        confirmed = [state.record_detection('screaming', True, weight=0.25) for _ in range(12)]
+
+        self.assertEqual(confirmed.index(True), 11)
+        self.assertFalse(DetectionState().record_detection('screaming', True))
+
+
+class TestSessionStateStore(unittest.TestCase):
+    """Test SessionStateStore class"""
+
+    def test_get_creates_and_reuses(self):
+        """Test sessions are created once and then reused"""
+        store = SessionStateStore()
+        state = store.get('room-1')
+
+        self.assertIs(store.get('room-1'), state)
+        self.assertIsNone(store.get('room-2', create=False))
+
+    def test_ttl_eviction(self):
+        """Test idle sessions expire"""
+        store = SessionStateStore(ttl=60)
+        store.get('room-1').last_seen -= 120
+
+        self.assertEqual(store.evict_expired(), 1)
+        self.assertNotIn('room-1', store)
+
+    def test_bounded_size(self):
+        """Test the least recently seen session is evicted when full"""
+        store = SessionStateStore(max_sessions=2)
+        store.get('room-1').last_seen -= 10
+        store.get('room-2')
+        store.get('room-3')
+
+        self.assertEqual(len(store), 2)
+        self.assertNotIn('room-1', store)
+
+    def test_concurrent_first_requests_share_state(self):
+        """Test racing first lookups of a session all get the same state"""
+        import threading
+
+        store = SessionStateStore()
+        barrier = threading.Barrier(8)
+        states = []
+
+        def first_request():
+            barrier.wait()
+            states.append(store.get('room-1'))
+
+        threads = [threading.Thread(target=first_request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(state is store.get('room-1') for state in states))
+        self.assertIs(store.create('room-1', replace=False), states[0])
+        self.assertIsNot(store.create('room-1'), states[0])
+
+
+class StubRecognizer:
+    """Local recognizer: fixed text per language after a delay"""
+
+    def __init__(self, texts, delay=0.0):
+        self.texts = texts
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, audio_data, sample_rate, language_code):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.texts.get(language_code)
+
+
+class TestTranscriptionService(unittest.TestCase):
+    """Test TranscriptionService class"""
+
+    def setUp(self):
+        self.audio = (np.random.randn(16000 * 2) * 0.2).astype(np.float32)
+
+    def test_passes_run_concurrently(self):
+        """Test both language passes overlap and are combined"""
+        stub = StubRecognizer({'en-US': 'i will kill you', 'si-LK': 'උදව්'}, delay=0.3)
+        service = TranscriptionService(SpeechThreatDetector(), recognize=stub)
+
+        start = time.perf_counter()
+        result, _ = service.analyze(self.audio, timeout=2.0)
+
+        self.assertLess(time.perf_counter() - start, 0.55)
+        self.assertEqual(result['transcription']['language'], 'mixed')
+        self.assertTrue(result['is_threat'])
+
+    def test_deadline_defers_result(self):
+        """Test a slow transcription is returned later via its job id"""
+        stub = StubRecognizer({'en-US': 'hello everyone'}, delay=0.3)
+        service = TranscriptionService(SpeechThreatDetector(), recognize=stub)
+        late = []
+
+        result, job_id = service.analyze(self.audio, timeout=0.01, on_late=late.append)
+
+        self.assertIsNone(result)
+        self.assertEqual(service.get_result(job_id)['status'], 'pending')
+        time.sleep(0.5)
+        self.assertEqual(service.get_result(job_id)['status'], 'done')
+        self.assertEqual(late[0]['text'], 'hello everyone')
+
+    def test_cache_by_fingerprint(self):
+        """Test repeated audio is served from the cache"""
+        stub = StubRecognizer({'en-US': 'hello everyone'})
+        service = TranscriptionService(SpeechThreatDetector(), recognize=stub)
+
+        service.analyze(self.audio, timeout=1.0)
+        result, _ = service.analyze(self.audio.copy(), timeout=1.0)
+
+        self.assertEqual(result['text'], 'hello everyone')
+        self.assertEqual(stub.calls, 2)
+        self.assertEqual(service.get_stats()['cache_hits'], 1)
+
+    def test_routed_to_one_language(self):
+        """Test a routed chunk runs only its language's pass"""
+        stub = StubRecognizer({'en-US': 'hello everyone', 'si-LK': 'උදව්'})
+        service = TranscriptionService(SpeechThreatDetector(), recognize=stub)
+
+        result, _ = service.analyze(self.audio, timeout=1.0, languages=['english'])
+
+        self.assertEqual(stub.calls, 1)
+        self.assertEqual(result['transcription']['language'], 'english')
+
+    def test_jobs_always_resolve(self):
+        """Test jobs with no language pass, or a failing combine step, do not stay pending"""
+        stub = StubRecognizer({'en-US': 'hello everyone'})
+        service = TranscriptionService(SpeechThreatDetector(), recognize=stub)
+
+        result, _ = service.analyze(self.audio, timeout=1.0, languages=['klingon'])
+        self.assertEqual(stub.calls, 0)
+        self.assertIn('klingon', result['transcription']['error'])
+
+        def broken_combine(*args):
+            raise RuntimeError('combine failed')
+        service.speech_detector.combine_transcriptions = broken_combine
+        job = service.submit(self.audio)
+        job.future.exception(timeout=1.0)
+        self.assertEqual(service.get_result(job.job_id)['status'], 'error')
+
+
+class TestLanguageRouting(unittest.TestCase):
+    """Test language-ID routing of ASR passes"""
+
+    def test_session_prior_routes_to_one_language(self):
+        """Test a session that keeps coming back English is routed to English only"""
+        router = LanguageRouter(LanguageIdentifier(), confidence=0.8, explore_every=8, enabled=True)
+        prior = LanguagePrior(decay=0.9)
+
+        self.assertEqual(router.route(prior), ['english', 'sinhala'])
+        for _ in range(4):
+            prior.observe(['english', 'sinhala'], {'language': 'english'})
+        self.assertEqual(router.route(prior), ['english'])
+        self.assertEqual(router.get_stats()['asr_calls_saved'], 1)
+
+        # Nothing understood in the routed language: check both again
+        prior.observe(['english'], {'language': 'unknown', 'error': 'Could not understand audio'})
+        self.assertEqual(router.route(prior), ['english', 'sinhala'])
+
+        # Without a session prior (sessionless callers) every language is checked
+        self.assertEqual(router.route(None), ['english', 'sinhala'])
+
+    def test_identifier_routes_without_history(self):
+        """Test a fitted identifier routes a chunk of a session with no history"""
+        rng = np.random.default_rng(0)
+
+        def chunk_features(offset):
+            features = rng.normal(0, 1.0, (132, 64))
+            features[1:13] += offset + rng.normal(0, 0.5)
+            return features
+
+        statistics = [LanguageIdentifier.statistics(chunk_features(offset))
+                      for offset in [2.0] * 30 + [-2.0] * 30]
+        identifier = LanguageIdentifier().fit(np.array(statistics), [1] * 30 + [0] * 30)
+        router = LanguageRouter(identifier, confidence=0.8, enabled=True)
+
+        self.assertEqual(router.route(LanguagePrior(), chunk_features(-2.0)), ['sinhala'])
+        self.assertEqual(router.route(LanguagePrior(), chunk_features(2.0)), ['english'])
+        self.assertEqual(router.route(LanguagePrior(), None), ['english', 'sinhala'])
+
+
+class TestGatingCascade(unittest.TestCase):
+    """Test SpectralGate, VoiceActivityDetector and CascadeStats"""
+
+    def setUp(self):
+        t = np.arange(32000) / 16000
+        voiced = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 20))
+        self.talk = (0.05 * voiced / np.abs(voiced).max() * (0.55 + 0.45 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+        self.noise = (np.random.randn(32000) * 0.3).astype(np.float32)
+        self.hum = (0.05 * np.sin(2 * np.pi * 100 * t)).astype(np.float32)
+
+    def test_gate_passes_loud_broadband(self):
+        """Test loud broadband audio reaches the model and quiet talk or hum does not"""
+        gate = SpectralGate(threshold=0.35)
+
+        self.assertTrue(gate.passes(ChunkSpectrum(self.noise)))
+        self.assertFalse(gate.passes(ChunkSpectrum(self.talk)))
+        self.assertFalse(gate.passes(ChunkSpectrum(self.hum)))
+
+    def test_vad(self):
+        """Test voiced audio is detected as speech and noise or hum is not"""
+        vad = VoiceActivityDetector()
+
+        self.assertTrue(vad.is_speech(ChunkSpectrum(self.talk)))
+        self.assertFalse(vad.is_speech(ChunkSpectrum(self.noise)))
+        self.assertFalse(vad.is_speech(ChunkSpectrum(self.hum)))
+
+    def test_gate_fit(self):
+        """Test fitting the gate on labelled chunks separates them"""
+        stats = np.array([SpectralGate.statistics(ChunkSpectrum(a)) for a in (self.noise, self.talk, self.hum)])
+        gate = SpectralGate(weights=[0.0] * 5, bias=0.0, threshold=0.5).fit(stats, np.array([0, 1, 0]))
+
+        self.assertTrue(gate.passes(ChunkSpectrum(self.talk)))
+        self.assertFalse(gate.passes(ChunkSpectrum(self.noise)))
+        self.assertTrue(gate.fitted)
+        self.assertFalse(SpectralGate().fitted)
+
+    def test_stats(self):
+        """Test per-stage pass rates"""
+        stats = CascadeStats()
+        for passed in (True, False, False, False):
+            stats.record_chunk()
+            stats.record('spectral', passed, 0.001)
+
+        summary = stats.get_stats()
+        self.assertEqual(summary['stages']['spectral']['pass_rate'], 0.25)
+        self.assertEqual(summary['model_run_rate'], 0.0)
+
+
+class StubKaldiRecognizer:
+    """KaldiRecognizer stand-in returning scripted (text, is_final) steps"""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.bytes_fed = 0
+        self.text = ''
+
+    def AcceptWaveform(self, data):
+        self.bytes_fed += len(data)
+        self.text, final = self.steps.pop(0)
+        return final
+
+    def PartialResult(self):
+        return json.dumps({'partial': self.text})
+
+    def Result(self):
+        return json.dumps({'text': self.text})
+
+    def Reset(self):
+        self.text = ''
+
+
+class TestStreamingRecognizer(unittest.TestCase):
+    """Test StreamingRecognizer with SpeechThreatDetector.analyze_stream"""
+
+    def setUp(self):
+        self.detector = SpeechThreatDetector()
+        self.audio = (np.random.randn(16000) * 0.2).astype(np.float32)
+
+    def test_keyword_reported_once_per_utterance(self):
+        """Test a growing partial does not re-alert on the same keyword"""
+        stream = StreamingRecognizer(StubKaldiRecognizer([
+            ('i will', False),
+            ('i will kill', False),
+            ('i will kill you', False),
+            ('i will kill you', True),
+            ('kill', False)
+        ]))
+
+        alerts = [self.detector.analyze_stream(stream, self.audio)['is_threat'] for _ in range(5)]
+
+        self.assertEqual(alerts, [False, True, False, False, True])
+        self.assertEqual(stream.utterances, 1)
+        self.assertEqual(stream.recognizer.bytes_fed, 5 * 16000 * 2)
+
+    def test_partial_transcript_matched(self):
+        """Test keywords in a partial transcript are reported immediately"""
+        stream = StreamingRecognizer(StubKaldiRecognizer([('he has a gun', False)]))
+        result = self.detector.analyze_stream(stream, self.audio)
+
+        self.assertTrue(result['is_threat'])
+        self.assertFalse(result['transcription']['final'])
+        self.assertEqual(result['transcription']['engine'], 'vosk-stream')
+
+    def test_missing_model_path(self):
+        """Test a missing Vosk model leaves offline mode unavailable"""
+        self.assertIsNone(load_vosk_model('/nonexistent/vosk-model'))
+
+
+@unittest.skipUnless(PYAV_AVAILABLE, 'PyAV not installed')
+class TestDecoderPool(unittest.TestCase):
+    """Test DecoderPool class"""
+
+    def setUp(self):
+        from benchmarks.decoder_benchmark import make_webm_recording, split_fragments
+        self.pool = DecoderPool(backend='pyav')
+        self.recording = make_webm_recording(4.0)
+        self.split_fragments = split_fragments
+
+    def tearDown(self):
+        self.pool.close_all()
+
+    def test_continuous_fragments(self):
+        """Test header-less continuation fragments decode on the stream's decoder"""
+        fragments = self.split_fragments(self.recording, 4)
+        decoded = [self.pool.decode('room-1', fragment) for fragment in fragments]
+
+        self.assertGreater(sum(len(a) for a in decoded), 16000 * 4 - 320)
+        self.assertTrue(all(len(a) > 0 for a in decoded[1:]))
+        self.assertEqual(self.pool.get_stats()['decoders_started'], 1)
+
+    def test_new_container_restarts_decoder(self):
+        """Test a chunk starting a new WebM file replaces the stream's decoder"""
+        self.pool.decode('room-1', self.recording)
+        audio = self.pool.decode('room-1', self.recording)
+
+        self.assertGreater(len(audio), 16000 * 3)
+        self.assertEqual(self.pool.get_stats()['decoders_started'], 2)
+
+    def test_wav_uses_oneshot(self):
+        """Test non-streamable formats fall back to the one-shot decoder"""
+        import io
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format='WAV')
+        audio = self.pool.decode('room-1', buffer.getvalue())
+
+        self.assertEqual(len(audio), 16000)
+        self.assertNotIn('room-1', self.pool)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -7,7 +7,10 @@ import sys
 import subprocess
 import io
 import numpy as np
-from typing import Optional
+from typing import Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AudioConfig
 
 # Suppress FFmpeg output
 DEVNULL = subprocess.DEVNULL if hasattr(subprocess, 'DEVNULL') else open(os.devnull, 'wb')
@@ -56,6 +59,63 @@ def decode_with_pydub_silent(audio_bytes: bytes, format: str = 'webm', sample_ra
         return None
 
 
+PCM_DTYPES = {
+    'pcm16': np.dtype('<i2'),
+    'float32': np.dtype('<f4')
+}
+
+
+def check_pcm_layout(sample_rate, channels) -> Tuple[int, int]:
+    """
+    Validate a raw PCM stream's sample rate and channel count.
+    Raises ValueError unless the rate is one of AudioConfig.INPUT_SAMPLE_RATES
+    and there are 1 to AudioConfig.MAX_INPUT_CHANNELS channels.
+    """
+    try:
+        sample_rate, channels = int(sample_rate), int(channels)
+    except (TypeError, ValueError):
+        raise ValueError('Sample rate and channels must be integers')
+    if sample_rate not in AudioConfig.INPUT_SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample rate {sample_rate}. "
+                         f"Use: {', '.join(map(str, AudioConfig.INPUT_SAMPLE_RATES))}")
+    if not 1 <= channels <= AudioConfig.MAX_INPUT_CHANNELS:
+        raise ValueError(f"Channels must be between 1 and {AudioConfig.MAX_INPUT_CHANNELS}")
+    return sample_rate, channels
+
+
+def decode_pcm_body(body: bytes, sample_format: str = 'pcm16', channels: int = 1) -> np.ndarray:
+    """
+    Decode a raw little-endian PCM request body.
+    float32 bodies are returned as a read-only view of the buffer (no copy);
+    pcm16 bodies need a single int16 -> float32 conversion.
+
+    Args:
+        body: Raw PCM bytes
+        sample_format: 'pcm16' or 'float32'
+        channels: Interleaved channel count (downmixed to mono)
+
+    Returns:
+        Mono float32 samples in [-1, 1]
+    """
+    dtype = PCM_DTYPES.get(sample_format)
+    if dtype is None:
+        raise ValueError(f"Unsupported PCM format '{sample_format}'. Use: {', '.join(PCM_DTYPES)}")
+    if channels < 1:
+        raise ValueError('Channels must be at least 1')
+    if len(body) % (dtype.itemsize * channels) != 0:
+        raise ValueError('PCM body length is not a whole number of frames')
+
+    samples = np.frombuffer(body, dtype=dtype)
+    if sample_format == 'pcm16':
+        samples = samples.astype(np.float32)
+        samples *= 1.0 / 32768.0
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+    return samples
+
+
 def detect_audio_format(audio_bytes: bytes) -> str:
     """
     Detect audio format from magic bytes
@@ -111,11 +171,8 @@ def decode_audio_smart(audio_bytes: bytes, sample_rate: int = 16000) -> np.ndarr
             if len(audio.shape) > 1:
                 audio = audio.mean(axis=1)
             if sr != sample_rate:
-                import torchaudio
-                import torch
-                waveform = torch.FloatTensor(audio).unsqueeze(0)
-                resampler = torchaudio.transforms.Resample(sr, sample_rate)
-                audio = resampler(waveform).squeeze().numpy()
+                from utils.resampler import resample
+                audio = resample(audio, sr, sample_rate)
             return audio.astype(np.float32)
         except Exception:
             pass
@@ -15,6 +15,7 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import AudioConfig
+from utils.resampler import StreamingResampler, resample
 
 
 class AudioProcessor:
@@ -35,12 +36,8 @@ class AudioProcessor:
             if waveform.shape[0] > 1:
                 waveform = torch.mean(waveform, dim=0, keepdim=True)
 
-            # Resample if needed
-            if sr != self.sample_rate:
-                resampler = torchaudio.transforms.Resample(sr, self.sample_rate)
-                waveform = resampler(waveform)
-
-            audio = waveform.squeeze().numpy()
+            # Resample if needed (cached kernel for the rate pair)
+            audio = resample(waveform.squeeze(0).numpy(), sr, self.sample_rate)
             return audio, self.sample_rate
 
         except Exception as e:
@@ -97,8 +94,11 @@ class AudioProcessor:
             audio = audio / max_val
         return audio
     
-    def split_into_chunks(self, audio: np.ndarray) -> list:
-        """Split audio into overlapping chunks for processing"""
+    def split_into_chunks(self, audio: np.ndarray, return_offsets: bool = False) -> list:
+        """
+        Split audio into overlapping chunks for processing.
+        With return_offsets, returns (start_sample, chunk) pairs instead of chunks.
+        """
         chunk_samples = int(self.chunk_duration * self.sample_rate)
         overlap_samples = int(chunk_samples * self.overlap)
         step = chunk_samples - overlap_samples
@@ -106,7 +106,7 @@ class AudioProcessor:
         chunks = []
         for start in range(0, len(audio) - chunk_samples + 1, step):
             chunk = audio[start:start + chunk_samples]
-            chunks.append(chunk)
+            chunks.append((start, chunk))
         
         # Handle remaining audio
         if len(audio) > chunk_samples and (len(audio) - chunk_samples) % step != 0:
@@ -114,15 +114,81 @@ class AudioProcessor:
             last_chunk = audio[-chunk_samples:]
             if len(last_chunk) < chunk_samples:
                 last_chunk = np.pad(last_chunk, (0, chunk_samples - len(last_chunk)))
-            chunks.append(last_chunk)
+            chunks.append((len(audio) - len(last_chunk), last_chunk))
         
         # If audio is shorter than chunk duration, pad it
         if len(chunks) == 0:
             padded = np.pad(audio, (0, chunk_samples - len(audio)), mode='constant')
-            chunks.append(padded)
+            chunks.append((0, padded))
         
-        return chunks
-    
+        if return_offsets:
+            return chunks
+        return [chunk for _, chunk in chunks]
+
+    def iter_audio_blocks(self, source, block_duration: float = 60.0):
+        """
+        Yield mono float32 blocks of a recording at self.sample_rate without
+        loading the whole file.
+
+        Args:
+            source: Path or seekable file object readable by soundfile
+            block_duration: Seconds of audio read per block
+        """
+        with sf.SoundFile(source) as audio_file:
+            sr = audio_file.samplerate
+            # Filter state carries across blocks, so block edges leave no artifacts
+            resampler = None
+            if sr != self.sample_rate:
+                resampler = StreamingResampler(sr, self.sample_rate)
+
+            for block in audio_file.blocks(blocksize=int(block_duration * sr),
+                                           dtype='float32', always_2d=True):
+                mono = block.mean(axis=1)
+                if resampler is not None:
+                    mono = resampler.push(mono)
+                yield mono
+            if resampler is not None:
+                yield resampler.flush()
+
+    def iter_chunks(self, blocks):
+        """
+        Stream consecutive audio blocks through split_into_chunks in bounded memory.
+        Only the overlap tail of the previous block is carried between blocks.
+
+        Yields:
+            (start_seconds, chunk) for every overlapping chunk
+        """
+        chunk_samples = int(self.chunk_duration * self.sample_rate)
+        step = chunk_samples - int(chunk_samples * self.overlap)
+
+        carry = np.zeros(0, dtype=np.float32)
+        offset = 0
+        last_chunk = None
+
+        for block in blocks:
+            carry = np.concatenate([carry, np.asarray(block, dtype=np.float32)])
+            if len(carry) < chunk_samples:
+                continue
+
+            # Whole steps only, so split_into_chunks never pads mid-recording
+            n_chunks = (len(carry) - chunk_samples) // step + 1
+            usable = chunk_samples + (n_chunks - 1) * step
+            for start, chunk in self.split_into_chunks(carry[:usable], return_offsets=True):
+                yield (offset + start) / self.sample_rate, chunk
+            last_chunk = chunk
+
+            carry = carry[n_chunks * step:]
+            offset += n_chunks * step
+
+        if last_chunk is None:
+            # Recording shorter than one chunk: split_into_chunks pads it
+            for start, chunk in self.split_into_chunks(carry, return_offsets=True):
+                yield (offset + start) / self.sample_rate, chunk
+        elif len(carry) > chunk_samples - step:
+            # Trailing audio after the last full step: final chunk ends at the end of the recording
+            tail = np.concatenate([last_chunk, carry[chunk_samples - step:]])[-chunk_samples:]
+            yield (offset + len(carry) - chunk_samples) / self.sample_rate, tail
+
     def decode_base64_audio(self, base64_data: str) -> np.ndarray:
         """Decode base64 audio data from browser"""
         try:
@@ -135,12 +201,10 @@ class AudioProcessor:
 
             # Try to load with soundfile
             try:
-                audio, sr = sf.read(audio_buffer)
-                if sr != self.sample_rate:
-                    # Resample using torchaudio
-                    waveform = torch.FloatTensor(audio).unsqueeze(0)
-                    resampler = torchaudio.transforms.Resample(sr, self.sample_rate)
-                    audio = resampler(waveform).squeeze().numpy()
+                audio, sr = sf.read(audio_buffer, dtype='float32')
+                if audio.ndim > 1:
+                    audio = audio.mean(axis=1)
+                audio = resample(audio, sr, self.sample_rate)
             except:
                 # Try with pydub for webm/mp4
                 audio_buffer.seek(0)
@@ -0,0 +1,328 @@
+"""
+Streaming Decoder Pool
+Long-lived per-stream decoders for browser WebM/Opus and Ogg chunks.
+Container bytes are fed incrementally and the PCM decoded so far is returned,
+so a stream pays decoder start-up once instead of on every chunk.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Optional in-process libav binding
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DecoderConfig
+from utils.audio_decoder import decode_audio_smart, detect_audio_format
+
+# Containers whose chunks can continue a previous chunk's stream
+STREAMABLE_FORMATS = ('webm', 'ogg')
+
+
+class _BytePipe:
+    """
+    Blocking in-memory pipe between request threads and a decoder thread.
+    Tracks when the reader is waiting on an empty buffer, i.e. every byte
+    written so far has been consumed.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._closed = False
+        self._starved = False
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes) -> None:
+        with self._cond:
+            self._buffer.extend(data)
+            self._starved = False
+            self._cond.notify_all()
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while not self._buffer and not self._closed:
+                self._starved = True
+                self._cond.notify_all()
+                self._cond.wait()
+
+            if size < 0 or size >= len(self._buffer):
+                data = bytes(self._buffer)
+                self._buffer.clear()
+            else:
+                data = bytes(self._buffer[:size])
+                del self._buffer[:size]
+            return data
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wait_starved(self, timeout: float) -> bool:
+        """Block until the reader has consumed everything written"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._starved or self._closed, timeout)
+
+
+class StreamDecoder(ABC):
+    """Base class: one container stream decoded to mono float32 PCM"""
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.bytes_fed = 0
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+        self.error: Optional[Exception] = None
+
+        self._output = []
+        self._output_lock = threading.Lock()
+
+    @abstractmethod
+    def feed(self, data: bytes, timeout: float = None) -> np.ndarray:
+        """Feed container bytes; return PCM decoded since the last call"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop decoding and release the decoder's resources"""
+
+    def _take_output(self) -> np.ndarray:
+        with self._output_lock:
+            chunks, self._output = self._output, []
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(chunks)
+
+
+class PyAVStreamDecoder(StreamDecoder):
+    """In-process libav decoder running on its own thread"""
+
+    def __init__(self, sample_rate: int = 16000):
+        super().__init__(sample_rate)
+        self._pipe = _BytePipe()
+        self._thread = threading.Thread(target=self._run, name='pyav-decoder', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            container = av.open(self._pipe, mode='r', options={'probesize': '4096', 'analyzeduration': '0'})
+            resampler = av.AudioResampler(format='flt', layout='mono', rate=self.sample_rate)
+            for frame in container.decode(audio=0):
+                for out in resampler.resample(frame):
+                    samples = out.to_ndarray().reshape(-1).astype(np.float32, copy=False)
+                    with self._output_lock:
+                        self._output.append(samples)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._pipe.close()
+
+    def feed(self, data: bytes, timeout: float = None) -> np.ndarray:
+        timeout = DecoderConfig.FEED_TIMEOUT if timeout is None else timeout
+        with self.lock:
+            self.last_used = time.time()
+            self.bytes_fed += len(data)
+            self._pipe.write(data)
+            self._pipe.wait_starved(timeout)
+
+            if self.error is not None:
+                raise RuntimeError(f"Stream decode failed: {self.error}")
+            return self._take_output()
+
+    def close(self) -> None:
+        self._pipe.close()
+
+
+class FFmpegStreamDecoder(StreamDecoder):
+    """Persistent FFmpeg subprocess reading container bytes on stdin"""
+
+    def __init__(self, sample_rate: int = 16000, binary: str = None):
+        super().__init__(sample_rate)
+        self._process = subprocess.Popen(
+            [binary or DecoderConfig.FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+             '-fflags', 'nobuffer', '-probesize', '4096', '-analyzeduration', '0',
+             '-i', 'pipe:0', '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate),
+             '-flush_packets', '1', 'pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+        )
+        self._pending = b''
+        self._received = 0
+        self._output_event = threading.Event()
+        self._thread = threading.Thread(target=self._read_stdout, name='ffmpeg-decoder', daemon=True)
+        self._thread.start()
+
+    def _read_stdout(self) -> None:
+        fd = self._process.stdout.fileno()
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            data = self._pending + data
+            usable = len(data) - len(data) % 4
+            self._pending = data[usable:]
+            with self._output_lock:
+                self._output.append(np.frombuffer(data[:usable], dtype='<f4'))
+                self._received += usable
+            self._output_event.set()
+        self._output_event.set()
+
+    def feed(self, data: bytes, timeout: float = None) -> np.ndarray:
+        timeout = DecoderConfig.FEED_TIMEOUT if timeout is None else timeout
+        with self.lock:
+            self.last_used = time.time()
+            self.bytes_fed += len(data)
+            try:
+                self._process.stdin.write(data)
+            except (BrokenPipeError, OSError) as e:
+                raise RuntimeError(f"Stream decode failed: {e}")
+
+            # FFmpeg gives no per-chunk completion signal: wait until output goes quiet
+            deadline = time.time() + timeout
+            while time.time() < deadline and self._process.poll() is None:
+                self._output_event.clear()
+                if not self._output_event.wait(DecoderConfig.OUTPUT_IDLE) and self._received > 0:
+                    break
+            return self._take_output()
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+
+class DecoderPool:
+    """
+    Stream decoders keyed by stream (session) id.
+    WebM/Ogg chunks are fed to the stream's long-lived decoder; a chunk that
+    starts a new container restarts it. Other formats, streams without an id
+    and decoder failures fall back to the one-shot decode_audio_smart path.
+    """
+
+    def __init__(self, sample_rate: int = 16000, backend: str = None,
+                 max_streams: int = None, idle_ttl: float = None):
+        self.sample_rate = sample_rate
+        self.backend = self._resolve_backend(backend or DecoderConfig.BACKEND)
+        self.max_streams = max_streams or DecoderConfig.MAX_STREAMS
+        self.idle_ttl = DecoderConfig.IDLE_TTL if idle_ttl is None else idle_ttl
+
+        self._decoders: 'OrderedDict[str, StreamDecoder]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.chunks_streamed = 0
+        self.chunks_oneshot = 0
+        self.fallbacks = 0
+        self.decoders_started = 0
+        self.stream_decode_time = 0.0
+
+    @staticmethod
+    def _resolve_backend(backend: str) -> str:
+        if backend == 'auto':
+            if PYAV_AVAILABLE:
+                return 'pyav'
+            if shutil.which(DecoderConfig.FFMPEG_BINARY):
+                return 'ffmpeg'
+            return 'oneshot'
+        if backend == 'pyav' and not PYAV_AVAILABLE:
+            raise ValueError("DECODER_BACKEND 'pyav' requires the av package")
+        if backend not in ('pyav', 'ffmpeg', 'oneshot'):
+            raise ValueError(f"Unknown decoder backend '{backend}'")
+        return backend
+
+    def _new_decoder(self) -> StreamDecoder:
+        self.decoders_started += 1
+        if self.backend == 'pyav':
+            return PyAVStreamDecoder(self.sample_rate)
+        return FFmpegStreamDecoder(self.sample_rate)
+
+    def decode(self, stream_id: Optional[str], audio_bytes: bytes) -> np.ndarray:
+        """Decode one chunk of a stream to mono float32 PCM at sample_rate"""
+        audio_format = detect_audio_format(audio_bytes)
+        starts_container = audio_format in STREAMABLE_FORMATS
+
+        if self.backend == 'oneshot' or stream_id is None or \
+                (not starts_container and stream_id not in self._decoders):
+            return self._decode_oneshot(audio_bytes)
+
+        with self._lock:
+            decoder = self._decoders.get(stream_id)
+            if decoder is not None and starts_container and decoder.bytes_fed > 0:
+                # A new container header: the client restarted its recorder
+                decoder.close()
+                decoder = None
+            if decoder is None:
+                self._evict_locked()
+                decoder = self._new_decoder()
+                self._decoders[stream_id] = decoder
+            self._decoders.move_to_end(stream_id)
+
+        start = time.perf_counter()
+        try:
+            audio = decoder.feed(audio_bytes)
+        except Exception:
+            self.close(stream_id)
+            self.fallbacks += 1
+            return self._decode_oneshot(audio_bytes)
+
+        self.stream_decode_time += time.perf_counter() - start
+        self.chunks_streamed += 1
+        return audio
+
+    def _decode_oneshot(self, audio_bytes: bytes) -> np.ndarray:
+        self.chunks_oneshot += 1
+        return decode_audio_smart(audio_bytes, self.sample_rate)
+
+    def _evict_locked(self) -> None:
+        """Close idle decoders, then the least recently used if the pool is full"""
+        now = time.time()
+        for stream_id in [sid for sid, d in self._decoders.items() if now - d.last_used > self.idle_ttl]:
+            self._decoders.pop(stream_id).close()
+        while len(self._decoders) >= self.max_streams:
+            _, decoder = self._decoders.popitem(last=False)
+            decoder.close()
+
+    def close(self, stream_id: str) -> None:
+        """Close a stream's decoder"""
+        with self._lock:
+            decoder = self._decoders.pop(stream_id, None)
+        if decoder is not None:
+            decoder.close()
+
+    def close_all(self) -> None:
+        """Close every decoder"""
+        with self._lock:
+            decoders, self._decoders = list(self._decoders.values()), OrderedDict()
+        for decoder in decoders:
+            decoder.close()
+
+    def __contains__(self, stream_id: str) -> bool:
+        return stream_id in self._decoders
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics"""
+        return {
+            'backend': self.backend,
+            'active_streams': len(self._decoders),
+            'decoders_started': self.decoders_started,
+            'chunks_streamed': self.chunks_streamed,
+            'chunks_oneshot': self.chunks_oneshot,
+            'fallbacks': self.fallbacks,
+            'avg_stream_decode_ms': round(
+                self.stream_decode_time / self.chunks_streamed * 1000, 3
+            ) if self.chunks_streamed else 0.0
+        }
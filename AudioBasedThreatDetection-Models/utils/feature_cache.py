@@ -0,0 +1,213 @@
+"""
+Training Feature Cache
+Content-addressed on-disk cache of per-file feature windows, so repeated
+training and tuning runs skip decoding and feature extraction. Each audio
+file maps to one .npy shard of (chunks, time, features) float32 windows,
+keyed by the file's content hash under a directory keyed by the feature
+settings; shards are opened memory-mapped. Cache misses are extracted in
+parallel worker processes.
+
+    cache = FeatureCache()
+    X, y = cache.build_dataset(files, labels)
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import multiprocessing
+import hashlib
+import json
+import time
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AudioConfig, FeatureCacheConfig
+
+# Source files whose code determines the cached features
+_FEATURE_SOURCES = ['audio_processor.py', 'feature_extractor.py', 'resampler.py']
+
+
+def feature_config_key(target_length: int = None) -> str:
+    """Hash of the audio/feature settings and extraction code the shards were built with"""
+    settings = {
+        'sample_rate': AudioConfig.SAMPLE_RATE,
+        'chunk_duration': AudioConfig.CHUNK_DURATION,
+        'overlap': AudioConfig.OVERLAP,
+        'n_mfcc': AudioConfig.N_MFCC,
+        'n_fft': AudioConfig.N_FFT,
+        'hop_length': AudioConfig.HOP_LENGTH,
+        'n_mels': AudioConfig.N_MELS,
+        'fmax': AudioConfig.FMAX,
+        'target_length': target_length or FeatureCacheConfig.TARGET_LENGTH
+    }
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    utils_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in _FEATURE_SOURCES:
+        with open(os.path.join(utils_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_worker_tools = None
+
+
+def extract_file_features(path: str, target_length: int = None) -> np.ndarray:
+    """Decode one file and return its (chunks, time, features) windows"""
+    global _worker_tools
+
+    if _worker_tools is None:
+        from utils.audio_processor import AudioProcessor
+        from utils.feature_extractor import FeatureExtractor
+        _worker_tools = AudioProcessor(), FeatureExtractor()
+    processor, extractor = _worker_tools
+
+    target_length = target_length or FeatureCacheConfig.TARGET_LENGTH
+    audio, _ = processor.load_audio(path)
+    audio = processor.preprocess_audio(audio)
+
+    windows = [
+        extractor.extract_fixed_length_features(chunk, target_length).T
+        for chunk in processor.split_into_chunks(audio)
+    ]
+    return np.stack(windows).astype(np.float32)
+
+
+def _extract_worker(path: str, target_length: int) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Process-pool entry point: (windows, None) or (None, error)"""
+    import torch
+    torch.set_num_threads(1)  # one process per core already
+    try:
+        return extract_file_features(path, target_length), None
+    except Exception as e:
+        return None, str(e)
+
+
+class FeatureCache:
+    """
+    Feature shards under <directory>/<feature_config_key>/<hash[:2]>/<hash>.npy.
+    Changing any feature setting or the extraction code selects a new key
+    directory, so stale shards are never read.
+    """
+
+    # Starting a worker process (importing torch) costs seconds; small miss sets stay in-process
+    MIN_PARALLEL_FILES = 64
+
+    def __init__(self, directory: str = None, workers: int = None, target_length: int = None):
+        self.target_length = target_length or FeatureCacheConfig.TARGET_LENGTH
+        self.config_key = feature_config_key(self.target_length)
+        self.directory = os.path.join(str(directory or FeatureCacheConfig.CACHE_DIR), self.config_key)
+        workers = FeatureCacheConfig.WORKERS if workers is None else workers
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+
+        self.hits = 0
+        self.misses = 0
+        self.errors: Dict[str, str] = {}
+
+    def _shard_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash[:2], f"{content_hash}.npy")
+
+    def get(self, content_hash: str, mmap: bool = True) -> Optional[np.ndarray]:
+        """Cached windows for a content hash, memory-mapped read-only; None on a miss"""
+        path = self._shard_path(content_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r' if mmap else None)
+        except (OSError, ValueError) as e:
+            print(f"[FeatureCache] Ignoring unreadable shard {path}: {e}")
+            return None
+
+    def put(self, content_hash: str, windows: np.ndarray) -> None:
+        """Write a shard (replaced atomically)"""
+        path = self._shard_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(windows, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+    def load_files(self, paths: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Windows for each file, in order: shards for hits, extraction for misses
+        (in worker processes when there are several). Files that fail to decode
+        give None and are listed in self.errors.
+        """
+        return self._load(paths)[1]
+
+    def shard_paths(self, paths: Sequence[str]) -> List[Optional[str]]:
+        """Shard file for each path, extracting misses first; None for files that failed to decode"""
+        hashes, results = self._load(paths)
+        return [self._shard_path(h) if windows is not None else None
+                for h, windows in zip(hashes, results)]
+
+    def _load(self, paths: Sequence[str]) -> Tuple[List[str], List[Optional[np.ndarray]]]:
+        hashes = [file_hash(path) for path in paths]
+        results: List[Optional[np.ndarray]] = [self.get(h) for h in hashes]
+        missing = [i for i, windows in enumerate(results) if windows is None]
+        self.hits += len(paths) - len(missing)
+        self.misses += len(missing)
+
+        for i, (windows, error) in zip(missing, self._extract([paths[i] for i in missing])):
+            if windows is None:
+                self.errors[paths[i]] = error
+                continue
+            self.put(hashes[i], windows)
+            results[i] = windows
+        return hashes, results
+
+    def _extract(self, paths: List[str]):
+        """(windows, error) per path, in order"""
+        if self.workers <= 1 or len(paths) < self.MIN_PARALLEL_FILES:
+            for path in paths:
+                try:
+                    yield extract_file_features(path, self.target_length), None
+                except Exception as e:
+                    yield None, str(e)
+            return
+
+        # spawn: forked children would inherit the parent's torch thread pools
+        context = multiprocessing.get_context('spawn')
+        workers = min(self.workers, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            yield from pool.map(_extract_worker, paths, [self.target_length] * len(paths),
+                                chunksize=max(1, len(paths) // (workers * 4)))
+
+    def build_dataset(self, paths: Sequence[str], labels: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stack every file's windows into X (n, time, features) with each window
+        labelled by its file's label; files that failed to decode are skipped
+        """
+        start = time.perf_counter()
+        windows, window_labels = [], []
+        for label, file_windows in zip(labels, self.load_files(paths)):
+            if file_windows is None:
+                continue
+            windows.append(file_windows)
+            window_labels.extend([label] * len(file_windows))
+
+        if not windows:
+            raise ValueError("No features could be extracted from the given files")
+        X = np.concatenate(windows)
+        print(f"[FeatureCache] {len(X)} windows from {len(paths)} files in "
+              f"{time.perf_counter() - start:.1f}s ({self.hits} cached, {self.misses} extracted)")
+        return X, np.asarray(window_labels)
+
+    def get_stats(self) -> Dict:
+        return {
+            'directory': self.directory,
+            'config_key': self.config_key,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': len(self.errors),
+            'workers': self.workers
+        }
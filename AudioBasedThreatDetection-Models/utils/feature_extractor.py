@@ -6,12 +6,14 @@ Using torchaudio for Python 3.14 compatibility
 import numpy as np
 import torch
 import torchaudio
-import torchaudio.transforms as T
-from typing import Dict, Tuple
+import torchaudio.functional as AF
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Optional, Tuple
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import AudioConfig
+from utils.ring_buffer import RingBuffer
 
 
 class FeatureExtractor:
@@ -25,25 +27,18 @@ class FeatureExtractor:
         self.n_mels = AudioConfig.N_MELS
         self.fmax = AudioConfig.FMAX
 
-        # Initialize torchaudio transforms
-        self.mfcc_transform = T.MFCC(
-            sample_rate=self.sample_rate,
-            n_mfcc=self.n_mfcc,
-            melkwargs={
-                'n_fft': self.n_fft,
-                'hop_length': self.hop_length,
-                'n_mels': self.n_mels,
-                'f_max': self.fmax
-            }
-        )
-
-        self.mel_transform = T.MelSpectrogram(
-            sample_rate=self.sample_rate,
-            n_fft=self.n_fft,
-            hop_length=self.hop_length,
-            n_mels=self.n_mels,
-            f_max=self.fmax
-        )
+        # Cached analysis window, filterbank and DCT - every feature is derived
+        # from one magnitude spectrogram per chunk
+        self.n_bins = self.n_fft // 2 + 1
+        self.window = torch.hann_window(self.n_fft)
+        self.window_np = self.window.numpy()
+        self.mel_fbank = AF.melscale_fbanks(
+            n_freqs=self.n_bins, f_min=0.0, f_max=self.fmax,
+            n_mels=self.n_mels, sample_rate=self.sample_rate
+        ).numpy()
+        self.dct_matrix = AF.create_dct(self.n_mfcc, self.n_mels, norm='ortho').numpy()
+        self.freqs = np.fft.rfftfreq(self.n_fft, 1 / self.sample_rate)
+        self.n_contrast_bands = 7
 
     def _compute_delta(self, features: np.ndarray, order: int = 1) -> np.ndarray:
         """Compute delta features manually"""
@@ -55,127 +50,151 @@ class FeatureExtractor:
             delta = self._compute_delta(first_delta, 1)
         return delta
 
-    def extract_mfcc(self, audio: np.ndarray) -> np.ndarray:
-        """Extract MFCC features using torchaudio"""
-        # Convert to tensor
-        if isinstance(audio, np.ndarray):
-            waveform = torch.FloatTensor(audio).unsqueeze(0)
-        else:
-            waveform = audio.unsqueeze(0) if audio.dim() == 1 else audio
-
-        # Extract MFCC
-        mfcc = self.mfcc_transform(waveform).squeeze(0).numpy()
-
-        # Add delta and delta-delta features
-        mfcc_delta = self._compute_delta(mfcc, order=1)
-        mfcc_delta2 = self._compute_delta(mfcc, order=2)
-
-        # Stack features
-        features = np.vstack([mfcc, mfcc_delta, mfcc_delta2])
-        return features
-
-    def extract_spectral_features(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
-        """Extract various spectral features"""
-        features = {}
-
-        # Convert to tensor
-        waveform = torch.FloatTensor(audio)
-
-        # Compute spectrogram with Hann window to reduce spectral leakage
+    def magnitude_spectrogram(self, audio: np.ndarray) -> np.ndarray:
+        """Centred Hann-window STFT magnitude, (n_bins, time_steps)"""
+        waveform = torch.as_tensor(np.asarray(audio, dtype=np.float32))
         spectrogram = torch.stft(
             waveform,
             n_fft=self.n_fft,
             hop_length=self.hop_length,
-            window=torch.hann_window(self.n_fft),
+            window=self.window,
             return_complex=True
         )
-        magnitude = torch.abs(spectrogram).numpy()
+        return torch.abs(spectrogram).numpy()
+
+    def mel_power(self, magnitude: np.ndarray) -> np.ndarray:
+        """Power mel spectrogram from a magnitude spectrogram"""
+        return self.mel_fbank.T @ (magnitude ** 2)
+
+    def frame_rms(self, audio: np.ndarray, n_frames: int) -> np.ndarray:
+        """
+        RMS of non-centred n_fft frames at hop_length, edge-padded to n_frames.
+        Uses a running sum of squares, so frames are never materialised.
+        """
+        frame_length = self.n_fft
+        n_rms = (len(audio) - frame_length) // self.hop_length + 1
+        if n_rms <= 0:
+            return np.zeros(n_frames)
+
+        energy = np.concatenate([[0.0], np.cumsum(np.square(audio, dtype=np.float64))])
+        starts = np.arange(n_rms) * self.hop_length
+        rms = np.sqrt(np.maximum(energy[starts + frame_length] - energy[starts], 0.0) / frame_length)
+
+        # Pad or truncate to match magnitude time dimension
+        if len(rms) < n_frames:
+            rms = np.pad(rms, (0, n_frames - len(rms)), mode='edge')
+        return rms[:n_frames]
 
-        # Frequency bins
-        freqs = np.fft.rfftfreq(self.n_fft, 1/self.sample_rate)[:magnitude.shape[0]]
+    def zero_crossing_rate(self, audio: np.ndarray) -> float:
+        """Chunk-level zero crossing rate"""
+        return float(np.abs(np.diff(np.sign(audio))).sum() / len(audio))
 
-        # Spectral Centroid
+    def extract_mfcc(self, audio: np.ndarray) -> np.ndarray:
+        """Extract MFCC + delta + delta-delta features"""
+        if isinstance(audio, torch.Tensor):
+            audio = audio.squeeze().numpy()
+        return self.mfcc_from_mel_power(self.mel_power(self.magnitude_spectrogram(audio)))
+
+    def extract_spectral_features(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
+        """Extract various spectral features"""
+        magnitude = self.magnitude_spectrogram(audio)
+        spectral = self.frame_spectral_features(magnitude)
+        n_frames = magnitude.shape[1]
+
+        return {
+            'spectral_centroid': spectral[0],
+            'spectral_bandwidth': spectral[1],
+            'spectral_rolloff': spectral[2],
+            'zero_crossing_rate': np.full(n_frames, self.zero_crossing_rate(audio)),
+            'rms': self.frame_rms(audio, n_frames),
+            'spectral_contrast': spectral[3:]
+        }
+
+    def frames_magnitude(self, frames: np.ndarray) -> np.ndarray:
+        """Windowed magnitude spectrum of (n_frames, n_fft) frames -> (n_bins, n_frames)"""
+        windowed = np.multiply(frames, self.window_np, dtype=np.float32)
+        return torch.fft.rfft(torch.from_numpy(windowed), dim=-1).abs().numpy().T
+
+    def frame_spectral_features(self, magnitude: np.ndarray) -> np.ndarray:
+        """
+        Per-frame spectral statistics from a magnitude spectrogram.
+
+        Returns:
+            (10, n_frames) array: centroid, bandwidth, rolloff and 7 contrast bands
+        """
+        freqs = self.freqs[:magnitude.shape[0]]
         norm = magnitude.sum(axis=0) + 1e-8
-        features['spectral_centroid'] = np.sum(freqs[:, None] * magnitude, axis=0) / norm
 
-        # Spectral Bandwidth
-        centroid = features['spectral_centroid']
-        features['spectral_bandwidth'] = np.sqrt(
+        centroid = (freqs @ magnitude) / norm
+        bandwidth = np.sqrt(
             np.sum(((freqs[:, None] - centroid) ** 2) * magnitude, axis=0) / norm
         )
 
         # Spectral Rolloff (85%)
         cumsum = np.cumsum(magnitude, axis=0)
-        threshold = 0.85 * cumsum[-1]
-        rolloff_idx = np.argmax(cumsum >= threshold, axis=0)
-        features['spectral_rolloff'] = freqs[np.clip(rolloff_idx, 0, len(freqs)-1)]
-
-        # Zero Crossing Rate
-        zcr = np.abs(np.diff(np.sign(audio))).sum() / len(audio)
-        features['zero_crossing_rate'] = np.full(magnitude.shape[1], zcr)
+        rolloff_idx = np.argmax(cumsum >= 0.85 * cumsum[-1], axis=0)
+        rolloff = freqs[np.clip(rolloff_idx, 0, len(freqs) - 1)]
 
-        # RMS Energy
-        frame_length = self.n_fft
-        frames = np.array([audio[i:i+frame_length] for i in range(0, len(audio)-frame_length+1, self.hop_length)])
-        if len(frames) > 0:
-            rms = np.sqrt(np.mean(frames**2, axis=1))
-            # Pad or truncate to match magnitude time dimension
-            if len(rms) < magnitude.shape[1]:
-                rms = np.pad(rms, (0, magnitude.shape[1] - len(rms)), mode='edge')
-            else:
-                rms = rms[:magnitude.shape[1]]
-            features['rms'] = rms
-        else:
-            features['rms'] = np.zeros(magnitude.shape[1])
-
-        # Spectral Contrast (simplified - using 7 bands)
-        n_bands = 7
-        band_size = magnitude.shape[0] // n_bands
-        contrast = []
-        for i in range(n_bands):
-            band = magnitude[i*band_size:(i+1)*band_size]
-            if band.size > 0:
-                contrast.append(np.max(band, axis=0) - np.min(band, axis=0))
-        features['spectral_contrast'] = np.array(contrast) if contrast else np.zeros((n_bands, magnitude.shape[1]))
+        # Spectral Contrast (simplified - peak minus valley in 7 equal bands)
+        band_size = magnitude.shape[0] // self.n_contrast_bands
+        bands = magnitude[:band_size * self.n_contrast_bands].reshape(
+            self.n_contrast_bands, band_size, -1
+        )
+        contrast = bands.max(axis=1) - bands.min(axis=1)
+
+        return np.vstack([centroid, bandwidth, rolloff, contrast])
+
+    def mfcc_from_mel_power(self, mel_power: np.ndarray) -> np.ndarray:
+        """MFCC + delta + delta-delta from a (n_mels, time) power mel spectrogram"""
+        mel_db = AF.amplitude_to_DB(
+            torch.as_tensor(mel_power, dtype=torch.float32).unsqueeze(0),
+            multiplier=10.0, amin=1e-10, db_multiplier=0.0, top_db=80.0
+        ).squeeze(0).numpy()
+        mfcc = self.dct_matrix.T @ mel_db
+
+        return np.vstack([
+            mfcc,
+            self._compute_delta(mfcc, order=1),
+            self._compute_delta(mfcc, order=2)
+        ])
 
-        return features
+    def assemble_features(self, mel_power: np.ndarray, spectral: np.ndarray,
+                          zcr: float, rms: np.ndarray) -> np.ndarray:
+        """
+        Combine frame-level mel power and spectral statistics into the model's
+        feature layout: MFCC x3, centroid, bandwidth, rolloff, ZCR, RMS, contrast.
+        """
+        n_frames = mel_power.shape[1]
+        return np.vstack([
+            self.mfcc_from_mel_power(mel_power),
+            spectral[:3],
+            np.full((1, n_frames), zcr),
+            rms.reshape(1, -1),
+            spectral[3:]
+        ])
 
     def extract_mel_spectrogram(self, audio: np.ndarray) -> np.ndarray:
         """Extract mel spectrogram"""
-        waveform = torch.FloatTensor(audio).unsqueeze(0)
-        mel_spec = self.mel_transform(waveform).squeeze(0)
+        mel_spec = torch.as_tensor(self.mel_power(self.magnitude_spectrogram(audio)))
 
         # Convert to dB scale
-        mel_spec_db = torchaudio.transforms.AmplitudeToDB()(mel_spec)
+        mel_spec_db = AF.amplitude_to_DB(mel_spec, multiplier=10.0, amin=1e-10, db_multiplier=0.0)
         return mel_spec_db.numpy()
 
     def extract_all_features(self, audio: np.ndarray) -> np.ndarray:
-        """Extract combined feature vector for CNN-LSTM model"""
-        # Get MFCC features (n_mfcc * 3 x time_steps)
-        mfcc_features = self.extract_mfcc(audio)
-
-        # Get spectral features
-        spectral = self.extract_spectral_features(audio)
-
-        # Combine spectral features
-        spectral_combined = np.vstack([
-            spectral['spectral_centroid'].reshape(1, -1),
-            spectral['spectral_bandwidth'].reshape(1, -1),
-            spectral['spectral_rolloff'].reshape(1, -1),
-            spectral['zero_crossing_rate'].reshape(1, -1),
-            spectral['rms'].reshape(1, -1),
-            spectral['spectral_contrast']
-        ])
-
-        # Ensure same time dimension
-        min_time = min(mfcc_features.shape[1], spectral_combined.shape[1])
-        mfcc_features = mfcc_features[:, :min_time]
-        spectral_combined = spectral_combined[:, :min_time]
-
-        # Combine all features
-        all_features = np.vstack([mfcc_features, spectral_combined])
-
-        return all_features
+        """
+        Extract combined feature vector for CNN-LSTM model.
+        One STFT per chunk; mel/MFCC and spectral statistics are all derived from it.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        magnitude = self.magnitude_spectrogram(audio)
+
+        return self.assemble_features(
+            self.mel_power(magnitude),
+            self.frame_spectral_features(magnitude),
+            self.zero_crossing_rate(audio),
+            self.frame_rms(audio, magnitude.shape[1])
+        )
 
     def extract_fixed_length_features(self, audio: np.ndarray, target_length: int = 128) -> np.ndarray:
         """Extract features with fixed time dimension for model input"""
@@ -204,3 +223,125 @@ class FeatureExtractor:
         normalized = (features - mean) / std
         return normalized, mean, std
 
+
+
+class StreamingFeatureExtractor:
+    """
+    Incremental feature extraction for one continuous audio stream.
+    Keeps STFT framing state between pushes so every sample is transformed
+    once, and emits the same (features, target_length) window as
+    FeatureExtractor.extract_fixed_length_features from a rolling frame buffer.
+
+    Frames are centred like torch.stft(center=True); the last frame of a push
+    is emitted once the following n_fft/2 samples have arrived.
+
+    Frame statistics are kept in ring buffers holding one window plus
+    context_frames of history, so windows ending earlier than the newest
+    frame can be re-assembled without touching audio again.
+    """
+
+    def __init__(self, extractor: Optional[FeatureExtractor] = None,
+                 window_frames: Optional[int] = None, target_length: int = 128,
+                 context_frames: Optional[int] = None):
+        self.extractor = extractor or FeatureExtractor()
+        self.n_fft = self.extractor.n_fft
+        self.hop_length = self.extractor.hop_length
+        # Default window covers one chunk, matching the per-chunk layout used today
+        chunk_samples = int(AudioConfig.CHUNK_DURATION * AudioConfig.SAMPLE_RATE)
+        self.window_frames = window_frames or chunk_samples // self.hop_length + 1
+        self.target_length = target_length
+        if context_frames is None:
+            context_frames = int(AudioConfig.CONTEXT_SECONDS * AudioConfig.SAMPLE_RATE) // self.hop_length
+        capacity = self.window_frames + context_frames
+
+        self._mel = RingBuffer(capacity, self.extractor.n_mels)
+        self._spectral = RingBuffer(capacity, 3 + self.extractor.n_contrast_bands)
+        self._rms = RingBuffer(capacity)
+        self._zcr = RingBuffer(capacity)
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all buffered samples and frames (start of a new stream)"""
+        self._pending = np.zeros(0, dtype=np.float32)
+        for ring in (self._mel, self._spectral, self._rms, self._zcr):
+            ring.clear()
+        self.samples_seen = 0
+        self.frames_computed = 0
+        self.last_push_frames = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.samples_seen == 0
+
+    def push(self, samples: np.ndarray) -> np.ndarray:
+        """Append newly arrived samples and return the current feature window"""
+        samples = np.asarray(samples, dtype=np.float32)
+
+        if self.is_empty and len(samples) > 0:
+            # Mirror torch.stft(center=True) padding at the start of the stream
+            pad = self.n_fft // 2
+            mode = 'reflect' if len(samples) > pad else 'constant'
+            samples = np.pad(samples, (pad, 0), mode=mode)
+            self.samples_seen -= pad
+
+        self.samples_seen += len(samples)
+        self._pending = np.concatenate([self._pending, samples])
+        self.last_push_frames = 0
+
+        if len(self._pending) >= self.n_fft:
+            n_frames = (len(self._pending) - self.n_fft) // self.hop_length + 1
+            frames = sliding_window_view(self._pending, self.n_fft)[::self.hop_length][:n_frames]
+            self._append_frames(frames)
+            self._pending = self._pending[n_frames * self.hop_length:]
+
+        return self.get_window()
+
+    def _append_frames(self, frames: np.ndarray) -> None:
+        """Compute and buffer frame-level statistics for new frames only"""
+        extractor = self.extractor
+        magnitude = extractor.frames_magnitude(frames)
+
+        mel = extractor.mel_power(magnitude)
+        spectral = extractor.frame_spectral_features(magnitude)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        # Zero crossings over each frame's own hop segment (no double counting)
+        centre = self.n_fft // 2
+        segment = frames[:, centre - self.hop_length // 2:centre + self.hop_length // 2]
+        zcr = np.abs(np.diff(np.sign(segment), axis=1)).sum(axis=1) / segment.shape[1]
+
+        self._mel.append(mel)
+        self._spectral.append(spectral)
+        self._rms.append(rms)
+        self._zcr.append(zcr)
+        self.frames_computed += len(frames)
+        self.last_push_frames += len(frames)
+
+    def get_window(self, offset: int = 0) -> np.ndarray:
+        """
+        (features, target_length) window ending `offset` frames before the newest,
+        zero-padded like extract_fixed_length_features
+        """
+        n_frames = min(self.window_frames, len(self._mel) - offset)
+        if n_frames <= 0:
+            n_features = self.extractor.n_mfcc * 3 + 5 + self.extractor.n_contrast_bands
+            return np.zeros((n_features, self.target_length), dtype=np.float32)
+
+        features = self.extractor.assemble_features(
+            self._mel.latest(n_frames, offset), self._spectral.latest(n_frames, offset),
+            float(np.mean(self._zcr.latest(n_frames, offset))), self._rms.latest(n_frames, offset)
+        )[:, :self.target_length]
+
+        if n_frames < self.target_length:
+            features = np.pad(features, ((0, 0), (0, self.target_length - n_frames)), mode='constant')
+
+        return features
+
+    def recent_windows(self, hop_frames: int) -> List[Tuple[int, np.ndarray]]:
+        """
+        (offset, window) pairs, oldest first, for windows ending every hop_frames
+        within the frames added by the last push. Only full windows are re-scored;
+        the newest window (offset 0) is always included.
+        """
+        latest_offset = min(self.last_push_frames - 1, len(self._mel) - self.window_frames)
+        offsets = list(range(0, max(latest_offset, 0) + 1, max(hop_frames, 1)))
+        return [(offset, self.get_window(offset)) for offset in reversed(offsets)]
@@ -0,0 +1,214 @@
+"""
+Detection Gating Cascade
+Cheap checks that run before the expensive stages of ThreatDetector.analyze_audio:
+a spectral-statistics classifier decides whether a chunk goes to the CNN-LSTM,
+and a voice-activity detector decides whether it goes to ASR. Both read one
+power spectrogram computed from the raw chunk.
+"""
+from typing import Dict, List, Optional
+import json
+import threading
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CascadeConfig
+
+
+class ChunkSpectrum:
+    """Hann-windowed power spectrogram of one chunk (frames x bins)"""
+
+    def __init__(self, audio: np.ndarray, sample_rate: int = 16000,
+                 n_fft: int = 512, hop_length: int = 256):
+        audio = np.asarray(audio, dtype=np.float32)
+        if len(audio) < n_fft:
+            audio = np.pad(audio, (0, n_fft - len(audio)))
+
+        n_frames = 1 + (len(audio) - n_fft) // hop_length
+        frames = np.lib.stride_tricks.as_strided(
+            audio, shape=(n_frames, n_fft),
+            strides=(audio.strides[0] * hop_length, audio.strides[0])
+        )
+
+        self.sample_rate = sample_rate
+        self.power = np.abs(np.fft.rfft(frames * np.hanning(n_fft).astype(np.float32), axis=1)) ** 2
+        self.freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+        self.frame_rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        self.rms = float(np.sqrt(np.mean(audio ** 2)))
+
+    def band_ratio(self, low: float, high: float) -> np.ndarray:
+        """Per-frame fraction of power between low and high Hz"""
+        band = (self.freqs >= low) & (self.freqs <= high)
+        return self.power[:, band].sum(axis=1) / (self.power.sum(axis=1) + 1e-12)
+
+    def flatness(self) -> np.ndarray:
+        """Per-frame spectral flatness (geometric / arithmetic mean power)"""
+        power = self.power + 1e-12
+        return np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    def centroid(self) -> np.ndarray:
+        """Per-frame spectral centroid as a fraction of the Nyquist frequency"""
+        total = self.power.sum(axis=1) + 1e-12
+        return (self.power @ self.freqs) / total / (self.sample_rate / 2)
+
+
+class SpectralGate:
+    """
+    Logistic classifier over a handful of chunk statistics, estimating whether
+    the CNN-LSTM could find a threat in it. Loud, bright, broadband or impulsive
+    chunks pass; steady mid-level talk and hum do not.
+
+    The default weights are a hand-set starting point for fit(), which tunes
+    them on labelled chunks; save()/load() keep the result next to the models.
+    Only a fitted gate skips the model: the statistics are taken from the raw
+    chunk, so unfitted weights would make the decision depend on mic gain.
+    """
+
+    FEATURES = ['energy', 'high_band', 'centroid', 'flatness', 'impulsiveness']
+    DEFAULT_WEIGHTS = [3.0, 4.0, 3.0, 1.0, 2.5]
+    DEFAULT_BIAS = -4.0
+
+    def __init__(self, weights: Optional[List[float]] = None, bias: Optional[float] = None,
+                 threshold: float = None):
+        self.weights = np.array(self.DEFAULT_WEIGHTS if weights is None else weights, dtype=np.float64)
+        self.bias = self.DEFAULT_BIAS if bias is None else float(bias)
+        self.threshold = CascadeConfig.SPECTRAL_THRESHOLD if threshold is None else threshold
+        self.fitted = weights is not None
+
+    @staticmethod
+    def statistics(spectrum: ChunkSpectrum) -> np.ndarray:
+        """Feature vector in FEATURES order"""
+        rms_db = 20 * np.log10(spectrum.rms + 1e-10)
+        frame_power = spectrum.frame_rms ** 2 + 1e-12
+        impulsiveness = np.log10(frame_power.max() / np.median(frame_power)) / 3
+
+        return np.array([
+            np.clip((rms_db + 30) / 30, 0.0, 1.5),  # -30 dBFS -> 0, full scale -> 1
+            float(spectrum.band_ratio(2000, spectrum.sample_rate / 2).mean()),
+            float(spectrum.centroid().mean()),
+            float(spectrum.flatness().mean()),
+            np.clip(impulsiveness, 0.0, 1.5)
+        ])
+
+    def score(self, spectrum: ChunkSpectrum) -> float:
+        """Probability that the chunk is worth running through the CNN-LSTM"""
+        z = self.bias + float(self.statistics(spectrum) @ self.weights)
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def passes(self, spectrum: ChunkSpectrum) -> bool:
+        return self.score(spectrum) >= self.threshold
+
+    def fit(self, statistics: np.ndarray, labels: np.ndarray,
+            epochs: int = 2000, learning_rate: float = 0.5) -> 'SpectralGate':
+        """Logistic regression on (n, len(FEATURES)) statistics; label 1 = send to the model"""
+        X = np.asarray(statistics, dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64)
+
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+            error = p - y
+            self.weights -= learning_rate * (X.T @ error) / len(y)
+            self.bias -= learning_rate * float(error.mean())
+        self.fitted = True
+        return self
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({'features': self.FEATURES, 'weights': self.weights.tolist(),
+                       'bias': self.bias, 'threshold': self.threshold}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'SpectralGate':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('features') != cls.FEATURES:
+            raise ValueError(f"Gate file features {data.get('features')} do not match {cls.FEATURES}")
+        return cls(data['weights'], data['bias'], data.get('threshold'))
+
+    @classmethod
+    def from_config(cls) -> 'SpectralGate':
+        """Fitted gate from SPECTRAL_GATE_PATH if present, else an unfitted one that passes every chunk"""
+        if os.path.exists(CascadeConfig.SPECTRAL_GATE_PATH):
+            try:
+                return cls.load(CascadeConfig.SPECTRAL_GATE_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Cascade] Using default gate weights; could not load "
+                      f"{CascadeConfig.SPECTRAL_GATE_PATH}: {e}")
+        return cls()
+
+
+class VoiceActivityDetector:
+    """
+    Frame-level speech detector: a frame is voiced when it is well above the
+    noise floor, most of its power is in the speech band and it is tonal
+    rather than noise-like. A chunk has speech when enough frames are voiced.
+    """
+
+    def __init__(self, min_speech_ratio: float = None, energy_ratio: float = None,
+                 band_ratio: float = None, max_flatness: float = None):
+        self.min_speech_ratio = CascadeConfig.VAD_MIN_SPEECH_RATIO if min_speech_ratio is None else min_speech_ratio
+        self.energy_ratio = CascadeConfig.VAD_ENERGY_RATIO if energy_ratio is None else energy_ratio
+        self.band_ratio = CascadeConfig.VAD_BAND_RATIO if band_ratio is None else band_ratio
+        self.max_flatness = CascadeConfig.VAD_MAX_FLATNESS if max_flatness is None else max_flatness
+        self.speech_band = CascadeConfig.VAD_SPEECH_BAND
+
+    def speech_ratio(self, spectrum: ChunkSpectrum, noise_floor: Optional[float] = None) -> float:
+        """Fraction of voiced frames; noise_floor is an RMS level (estimated from the chunk if None)"""
+        if noise_floor is None:
+            noise_floor = float(np.percentile(spectrum.frame_rms, 10))
+        loud = spectrum.frame_rms > max(noise_floor * self.energy_ratio, 1e-3)
+        in_band = spectrum.band_ratio(*self.speech_band) >= self.band_ratio
+        tonal = spectrum.flatness() <= self.max_flatness
+        return float(np.mean(loud & in_band & tonal))
+
+    def is_speech(self, spectrum: ChunkSpectrum, noise_floor: Optional[float] = None) -> bool:
+        return self.speech_ratio(spectrum, noise_floor) >= self.min_speech_ratio
+
+
+class CascadeStats:
+    """
+    Per-stage counters for the detection cascade: how many chunks each stage
+    saw, how many it passed on and the time spent in it.
+    """
+
+    STAGES = ['energy', 'spectral', 'model', 'vad', 'asr']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self._stages = {stage: {'evaluated': 0, 'passed': 0, 'time': 0.0} for stage in self.STAGES}
+
+    def record_chunk(self) -> None:
+        with self._lock:
+            self.chunks += 1
+
+    def record(self, stage: str, passed: bool, seconds: float) -> None:
+        with self._lock:
+            counters = self._stages[stage]
+            counters['evaluated'] += 1
+            counters['passed'] += int(passed)
+            counters['time'] += seconds
+
+    def get_stats(self) -> Dict:
+        """Pass rate and mean time per stage, plus how often the expensive stages ran"""
+        with self._lock:
+            stages = {}
+            for stage, counters in self._stages.items():
+                evaluated = counters['evaluated']
+                stages[stage] = {
+                    'evaluated': evaluated,
+                    'passed': counters['passed'],
+                    'pass_rate': round(counters['passed'] / evaluated, 4) if evaluated else None,
+                    'total_time': round(counters['time'], 4),
+                    'avg_time_ms': round(counters['time'] / evaluated * 1000, 3) if evaluated else None
+                }
+            chunks = self.chunks
+
+        return {
+            'chunks': chunks,
+            'model_run_rate': round(stages['model']['evaluated'] / chunks, 4) if chunks else None,
+            'asr_run_rate': round(stages['asr']['evaluated'] / chunks, 4) if chunks else None,
+            'stages': stages
+        }
@@ -0,0 +1,172 @@
+"""
+Keyword Matcher
+Aho-Corasick automata compiled once from the threat keyword lists, so that
+each transcript is scanned in a single pass instead of one regex per keyword
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words scored as severe when they appear inside an English threat keyword
+SEVERE_WORDS = ['kill', 'murder', 'die', 'shoot', 'gun', 'bomb']
+
+# Dangerous words reported on their own unless already covered by a detected keyword
+DANGEROUS_WORDS = ['kill', 'murder', 'shoot', 'gun', 'bomb', 'weapon', 'stab', 'hurt', 'attack']
+
+
+def _is_word_char(char: str) -> bool:
+    """Same definition of a word character as re's \\w for str patterns"""
+    return char.isalnum() or char == '_'
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring automaton.
+    find_all(text) yields (pattern_index, end) for every occurrence, where
+    text[end - len(pattern):end] == patterns[pattern_index].
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        # Breadth-first failure links; outputs of the failure state are inherited
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find_all(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = position + 1
+                for index in out[state]:
+                    yield index, end
+
+
+class KeywordMatcher:
+    """
+    Compiled form of SpeechThreatDetector's keyword lists.
+
+    Matching semantics are those of the original per-keyword loop:
+    English threats match as substrings when they contain a space and on
+    regex word boundaries (\\b) otherwise, English profanity always on word
+    boundaries, and Sinhala keywords as plain substrings of the original
+    (not lower-cased) text. Results keep list order and duplicates.
+    """
+
+    def __init__(self, english_threats: List[str], english_profanity: List[str],
+                 sinhala_threats: List[str], sinhala_profanity: List[str]):
+        # One entry per list item: (keyword, type, language, score, needs_word_boundary)
+        self.entries: List[Tuple[str, str, str, float, bool]] = []
+
+        for threat in english_threats:
+            threat_lower = threat.lower()
+            score = 0.5 if any(word in threat_lower for word in SEVERE_WORDS) else 0.3
+            self.entries.append((threat, 'threat', 'english', score, ' ' not in threat_lower))
+        self.english_threat_count = len(self.entries)
+
+        for word in DANGEROUS_WORDS:
+            self.entries.append((word, 'threat', 'english', 0.4, True))
+        self.dangerous_start = self.english_threat_count
+
+        for profanity in english_profanity:
+            self.entries.append((profanity, 'profanity', 'english', 0.15, True))
+        self.english_count = len(self.entries)
+
+        for threat in sinhala_threats:
+            self.entries.append((threat, 'threat', 'sinhala', 0.45, False))
+        for profanity in sinhala_profanity:
+            self.entries.append((profanity, 'profanity', 'sinhala', 0.15, False))
+
+        # English entries are matched in lower-cased text, Sinhala in the original
+        self._english = self._compile(range(0, self.english_count), lower=True)
+        self._sinhala = self._compile(range(self.english_count, len(self.entries)), lower=False)
+
+        # A dangerous word is suppressed by any earlier detected keyword containing it
+        self._covers: Dict[int, List[int]] = {}
+        for offset, word in enumerate(DANGEROUS_WORDS):
+            entry = self.dangerous_start + offset
+            self._covers[entry] = [
+                i for i in range(entry)
+                if word in self.entries[i][0].lower()
+            ]
+
+    def _compile(self, entry_indices: Iterable[int], lower: bool) -> Tuple[Optional[AhoCorasick], List[List[int]]]:
+        """Automaton over the distinct patterns, plus pattern -> entry indices"""
+        patterns: Dict[str, List[int]] = {}
+        for i in entry_indices:
+            keyword = self.entries[i][0]
+            patterns.setdefault(keyword.lower() if lower else keyword, []).append(i)
+        if not patterns:
+            return None, []
+        return AhoCorasick(patterns.keys()), list(patterns.values())
+
+    def _scan(self, compiled, text: str, matched: set) -> None:
+        automaton, pattern_entries = compiled
+        if automaton is None:
+            return
+        for pattern_index, end in automaton.find_all(text):
+            entries = pattern_entries[pattern_index]
+            if all(i in matched for i in entries):
+                continue
+            start = end - len(automaton.patterns[pattern_index])
+            at_boundary = (
+                self._is_boundary(text, start) and self._is_boundary(text, end)
+            )
+            for i in entries:
+                if not self.entries[i][4] or at_boundary:
+                    matched.add(i)
+
+    @staticmethod
+    def _is_boundary(text: str, position: int) -> bool:
+        before = position > 0 and _is_word_char(text[position - 1])
+        after = position < len(text) and _is_word_char(text[position])
+        return before != after
+
+    def match(self, text: str) -> Tuple[List[Dict], float]:
+        """
+        Scan a transcript once per script.
+
+        Returns:
+            (detected_keywords, threat_score) - the score is uncapped
+        """
+        matched: set = set()
+        self._scan(self._english, text.lower(), matched)
+        self._scan(self._sinhala, text, matched)
+
+        detected_keywords = []
+        detected = set()
+        threat_score = 0.0
+        for i in sorted(matched):
+            if i in self._covers and any(j in detected for j in self._covers[i]):
+                continue
+            detected.add(i)
+            keyword, keyword_type, language, score, _ = self.entries[i]
+            detected_keywords.append({'keyword': keyword, 'type': keyword_type, 'language': language})
+            threat_score += score
+
+        return detected_keywords, threat_score
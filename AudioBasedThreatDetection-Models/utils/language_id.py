@@ -0,0 +1,187 @@
+"""
+Spoken Language Routing
+Decides which recognizer languages a chunk is transcribed in, so that
+chunks only go to both English and Sinhala when the language is unclear.
+The decision combines a logistic language identifier over MFCC statistics of
+the chunk's model features with a per-session prior learned from the
+languages ASR actually returned for that session's earlier chunks.
+"""
+from typing import Dict, List, Optional, Sequence
+import json
+import threading
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LanguageIDConfig, SpeechConfig
+
+N_COEFFICIENTS = 12  # MFCC 1..12; coefficient 0 is overall level
+
+
+class LanguageIdentifier:
+    """
+    Logistic regression on the per-coefficient mean and std of MFCC 1..12,
+    giving log-odds that a chunk is English rather than Sinhala. Without
+    fitted weights (LANGUAGE_ID_PATH) every chunk scores 0, so routing
+    rests on the session prior alone.
+    """
+
+    def __init__(self, weights: Optional[Sequence[float]] = None, bias: float = 0.0,
+                 center: Optional[Sequence[float]] = None, scale: Optional[Sequence[float]] = None):
+        size = 2 * N_COEFFICIENTS
+        self.weights = np.zeros(size) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.center = np.zeros(size) if center is None else np.asarray(center, dtype=np.float64)
+        self.scale = np.ones(size) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    @property
+    def fitted(self) -> bool:
+        return bool(np.any(self.weights)) or self.bias != 0.0
+
+    @staticmethod
+    def statistics(features: np.ndarray) -> np.ndarray:
+        """Statistics vector from (features, time) model features"""
+        mfcc = np.asarray(features[1:N_COEFFICIENTS + 1], dtype=np.float64)
+        return np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1)])
+
+    def log_odds(self, features: Optional[np.ndarray]) -> float:
+        """log P(english) / P(sinhala); 0 when unfitted or without features"""
+        if features is None or not self.fitted:
+            return 0.0
+        z = (self.statistics(features) - self.center) / self.scale
+        return float(z @ self.weights + self.bias)
+
+    def fit(self, statistics: np.ndarray, labels: np.ndarray,
+            epochs: int = 2000, learning_rate: float = 0.5) -> 'LanguageIdentifier':
+        """Logistic regression on (n, 24) statistics; label 1 = English, 0 = Sinhala"""
+        X = np.asarray(statistics, dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64)
+        self.center = X.mean(axis=0)
+        self.scale = X.std(axis=0) + 1e-8
+        X = (X - self.center) / self.scale
+
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+            error = p - y
+            self.weights -= learning_rate * (X.T @ error) / len(y)
+            self.bias -= learning_rate * float(error.mean())
+        return self
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({'weights': self.weights.tolist(), 'bias': self.bias,
+                       'center': self.center.tolist(), 'scale': self.scale.tolist()}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'LanguageIdentifier':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if len(data['weights']) != 2 * N_COEFFICIENTS:
+            raise ValueError(f"Expected {2 * N_COEFFICIENTS} weights, got {len(data['weights'])}")
+        return cls(data['weights'], data['bias'], data['center'], data['scale'])
+
+    @classmethod
+    def from_config(cls) -> 'LanguageIdentifier':
+        """Fitted identifier from LANGUAGE_ID_PATH if present, else an unfitted one"""
+        if os.path.exists(LanguageIDConfig.MODEL_PATH):
+            try:
+                return cls.load(LanguageIDConfig.MODEL_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[LanguageID] Routing on session priors only; could not load "
+                      f"{LanguageIDConfig.MODEL_PATH}: {e}")
+        return cls()
+
+
+class LanguagePrior:
+    """
+    One session's decayed counts of the languages its transcriptions came
+    back in. A single-language pass that understood nothing sends the
+    session's next chunk to every language.
+    """
+
+    def __init__(self, decay: float = None):
+        self.decay = LanguageIDConfig.PRIOR_DECAY if decay is None else decay
+        self.counts = {'english': 0.0, 'sinhala': 0.0}
+        self.check_all = False
+        self.single_routes = 0  # chunks routed to one language since the last full check
+        self.lock = threading.Lock()
+
+    def log_odds(self) -> float:
+        """log P(english) / P(sinhala) with add-one smoothing"""
+        return float(np.log((self.counts['english'] + 1.0) / (self.counts['sinhala'] + 1.0)))
+
+    def observe(self, languages: Sequence[str], transcription: Dict) -> None:
+        """Update from the transcription of a chunk routed to languages"""
+        detected = transcription.get('language')
+        with self.lock:
+            if detected in ('english', 'sinhala', 'mixed'):
+                for language in self.counts:
+                    self.counts[language] *= self.decay
+                for language in (self.counts if detected == 'mixed' else [detected]):
+                    self.counts[language] += 1.0
+            elif len(languages) == 1 and 'could not understand' in (transcription.get('error') or '').lower():
+                self.check_all = True
+
+    def get_stats(self) -> Dict:
+        return {
+            'counts': {language: round(count, 3) for language, count in self.counts.items()},
+            'p_english': round(float(1.0 / (1.0 + np.exp(-self.log_odds()))), 4)
+        }
+
+
+class LanguageRouter:
+    """
+    Picks the SpeechConfig.LANGUAGES a chunk is transcribed in. A chunk goes
+    to one language when P(that language) >= confidence, otherwise to all of
+    them; every explore_every single-language chunks a session is checked in
+    all languages again so that its prior can follow a change of speaker.
+    """
+
+    def __init__(self, identifier: LanguageIdentifier = None, confidence: float = None,
+                 explore_every: int = None, enabled: bool = None):
+        self.identifier = identifier or LanguageIdentifier.from_config()
+        self.confidence = LanguageIDConfig.CONFIDENCE if confidence is None else confidence
+        self.explore_every = LanguageIDConfig.EXPLORE_EVERY if explore_every is None else explore_every
+        self.enabled = LanguageIDConfig.ENABLED if enabled is None else enabled
+        self.languages = [language for language, _ in SpeechConfig.LANGUAGES]
+
+        self._lock = threading.Lock()
+        self.routes = {language: 0 for language in self.languages}
+        self.routes['all'] = 0
+        self.calls_saved = 0
+
+    def route(self, prior: Optional[LanguagePrior], features: Optional[np.ndarray] = None) -> List[str]:
+        """
+        Languages to transcribe a chunk in; features are its (features, time)
+        model features. Without a session prior the chunk goes to all languages.
+        """
+        languages = self.languages
+        if self.enabled and prior is not None:
+            p_english = 1.0 / (1.0 + np.exp(-(self.identifier.log_odds(features) + prior.log_odds())))
+            with prior.lock:
+                if prior.check_all or prior.single_routes >= self.explore_every:
+                    prior.check_all = False
+                    prior.single_routes = 0
+                elif p_english >= self.confidence:
+                    languages = ['english']
+                elif 1.0 - p_english >= self.confidence:
+                    languages = ['sinhala']
+                if len(languages) == 1:
+                    prior.single_routes += 1
+
+        with self._lock:
+            self.routes[languages[0] if len(languages) == 1 else 'all'] += 1
+            self.calls_saved += len(self.languages) - len(languages)
+        return languages
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'identifier_fitted': self.identifier.fitted,
+                'confidence': self.confidence,
+                'routes': dict(self.routes),
+                'asr_calls_saved': self.calls_saved
+            }
@@ -0,0 +1,238 @@
+"""
+Threat Lexicon Store
+Versioned threat/profanity keyword lexicon loaded from a JSON file and
+compiled once into a KeywordMatcher. When the file changes the new matcher
+is built on a background thread and swapped in atomically; requests already
+holding the previous lexicon finish with it.
+
+Lexicon file format:
+    {
+        "version": "2026.10.1",
+        "english_threats": ["kill", "i will hurt you", ...],
+        "english_profanity": [...],
+        "sinhala_threats": [...],
+        "sinhala_profanity": [...]
+    }
+
+Export the built-in lists as a starting point with:
+    python -m utils.lexicon_store --export config/threat_lexicon.json
+"""
+from typing import Dict, List, Optional
+import hashlib
+import json
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LexiconConfig, ThreatKeywords
+from utils.keyword_matcher import KeywordMatcher
+
+LEXICON_LISTS = ['english_threats', 'english_profanity', 'sinhala_threats', 'sinhala_profanity']
+
+
+class Lexicon:
+    """An immutable keyword lexicon and its compiled matcher"""
+
+    def __init__(self, version: str, lists: Dict[str, List[str]], source: str):
+        self.version = str(version)
+        self.source = source
+
+        # English keywords are matched lower-cased; Sinhala as written
+        self.english_threats = [k.lower() for k in lists['english_threats']]
+        self.english_profanity = [k.lower() for k in lists['english_profanity']]
+        self.sinhala_threats = list(lists['sinhala_threats'])
+        self.sinhala_profanity = list(lists['sinhala_profanity'])
+
+        self.checksum = hashlib.sha256(
+            json.dumps([self.english_threats, self.english_profanity,
+                        self.sinhala_threats, self.sinhala_profanity],
+                       ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+
+        start = time.perf_counter()
+        self.matcher = KeywordMatcher(
+            self.english_threats, self.english_profanity,
+            self.sinhala_threats, self.sinhala_profanity
+        )
+        self.build_time = time.perf_counter() - start
+        self.built_at = time.time()
+
+    @classmethod
+    def builtin(cls) -> 'Lexicon':
+        """Lexicon from the ThreatKeywords lists in config"""
+        return cls('builtin', {
+            'english_threats': ThreatKeywords.ENGLISH_THREATS,
+            'english_profanity': ThreatKeywords.PROFANITY_ENGLISH,
+            'sinhala_threats': ThreatKeywords.SINHALA_THREATS,
+            'sinhala_profanity': ThreatKeywords.PROFANITY_SINHALA
+        }, source='builtin')
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Lexicon':
+        """Load and validate a lexicon file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict) or 'version' not in data:
+            raise ValueError("Lexicon file must be an object with a 'version'")
+        for name in LEXICON_LISTS:
+            keywords = data.get(name, [])
+            if not isinstance(keywords, list) or not all(isinstance(k, str) and k for k in keywords):
+                raise ValueError(f"Lexicon list '{name}' must be a list of non-empty strings")
+
+        return cls(data['version'], {name: data.get(name, []) for name in LEXICON_LISTS}, source=str(path))
+
+    def get_info(self) -> Dict:
+        """Version and build information"""
+        return {
+            'version': self.version,
+            'source': self.source,
+            'checksum': self.checksum,
+            'built_at': self.built_at,
+            'build_time_ms': round(self.build_time * 1000, 2),
+            'keyword_counts': {
+                'english_threats': len(self.english_threats),
+                'english_profanity': len(self.english_profanity),
+                'sinhala_threats': len(self.sinhala_threats),
+                'sinhala_profanity': len(self.sinhala_profanity)
+            }
+        }
+
+
+class LexiconStore:
+    """
+    Holds the active Lexicon. get() never blocks on a rebuild: at most every
+    poll_interval seconds it checks the file's mtime and size and, if they changed,
+    starts a background rebuild that replaces the active lexicon when done.
+    A file that fails to load or validate leaves the active lexicon in place.
+    """
+
+    def __init__(self, path: str = None, poll_interval: float = None):
+        self.path = str(path or LexiconConfig.LEXICON_PATH)
+        self.poll_interval = LexiconConfig.POLL_INTERVAL if poll_interval is None else poll_interval
+
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._rebuilding = False
+        self._last_check = 0.0
+        self._loaded_signature: Optional[tuple] = None
+
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+        self._lexicon = Lexicon.builtin()
+        self.reload()
+
+    def get(self) -> Lexicon:
+        """The active lexicon (callers should keep the reference for one request)"""
+        now = time.time()
+        if now - self._last_check >= self.poll_interval:
+            self._last_check = now
+            if self._file_signature() != self._loaded_signature:
+                self._reload_in_background()
+        return self._lexicon
+
+    def _file_signature(self) -> Optional[tuple]:
+        """(mtime, size) of the lexicon file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def run():
+            try:
+                self.reload()
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, name='lexicon-reload', daemon=True).start()
+
+    def reload(self) -> Lexicon:
+        """Load the lexicon file now and swap it in; returns the active lexicon"""
+        with self._reload_lock:
+            signature = self._file_signature()
+
+            if signature is None:
+                # File removed (or never created): fall back to the built-in lists
+                if self._lexicon.source != 'builtin':
+                    self._lexicon = Lexicon.builtin()
+                    self.reloads += 1
+                self._loaded_signature = None
+                return self._lexicon
+
+            try:
+                lexicon = Lexicon.from_file(self.path)
+            except (OSError, ValueError) as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+                print(f"[Lexicon] Keeping version {self._lexicon.version}; failed to load {self.path}: {e}")
+            else:
+                self._lexicon = lexicon  # atomic reference swap
+                self.last_error = None
+                self.reloads += 1
+                print(f"[Lexicon] Loaded version {lexicon.version} ({lexicon.build_time * 1000:.0f}ms build)")
+
+            self._loaded_signature = signature
+            return self._lexicon
+
+    def get_status(self) -> Dict:
+        """Active lexicon version, build time and reload state"""
+        return {
+            **self._lexicon.get_info(),
+            'path': self.path,
+            'reloads': self.reloads,
+            'rebuilding': self._rebuilding,
+            'poll_interval': self.poll_interval,
+            'last_error': self.last_error
+        }
+
+
+_default_store: Optional[LexiconStore] = None
+_default_lock = threading.Lock()
+
+
+def get_lexicon_store() -> LexiconStore:
+    """Process-wide lexicon store shared by every SpeechThreatDetector"""
+    global _default_store
+
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = LexiconStore()
+    return _default_store
+
+
+def export_builtin(path: str, version: str = '1') -> None:
+    """Write the built-in ThreatKeywords lists as a lexicon file"""
+    data = {
+        'version': version,
+        'english_threats': ThreatKeywords.ENGLISH_THREATS,
+        'english_profanity': ThreatKeywords.PROFANITY_ENGLISH,
+        'sinhala_threats': ThreatKeywords.SINHALA_THREATS,
+        'sinhala_profanity': ThreatKeywords.PROFANITY_SINHALA
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Threat lexicon tools")
+    parser.add_argument('--export', metavar='PATH', help='Write the built-in keyword lists as a lexicon file')
+    parser.add_argument('--version', default='1', help='Version for the exported lexicon')
+    args = parser.parse_args()
+
+    if args.export:
+        export_builtin(args.export, args.version)
+        print(f"Exported built-in lexicon version {args.version} to {args.export}")
+    else:
+        parser.print_help()
@@ -0,0 +1,278 @@
+"""
+Detection Metrics
+Per-stage timing spans for analyze_audio and process-wide counters and
+histograms, rendered in the Prometheus text exposition format for /metrics.
+No client library is needed; a metric is a dict of label values to numbers.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import MetricsConfig
+
+# Seconds; covers sub-millisecond gates up to the 3 s latency budget and slow ASR
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(name, '') for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics plus gauge collectors. A collector is a callable returning
+    (name, help, [(labels_dict, value), ...]) tuples, read at scrape time;
+    registering a collector under an existing key replaces it.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, key: str, collector: Callable) -> None:
+        with self._lock:
+            self._collectors[key] = collector
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                gauges = collector()
+            except Exception as e:
+                lines.append(f'# collector error: {type(e).__name__}')
+                continue
+            for name, help_text, samples in gauges:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f'{name}{_format_labels(tuple(labels), tuple(labels.values()))} '
+                                 f'{_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """
+    Lap timer for one analyze_audio call: lap(stage) records the time since
+    the previous lap (or start) under that stage. Spans are kept for the
+    result only when tracing; with neither tracing nor a histogram, lap()
+    returns immediately.
+    """
+
+    def __init__(self, histogram: Optional[Histogram] = None, trace: bool = False):
+        self.histogram = histogram
+        self.spans: Optional[List[Dict]] = [] if trace else None
+        self.enabled = histogram is not None or trace
+        self._last = time.perf_counter()
+
+    def restart(self) -> None:
+        """Start the next lap now (time since the last lap belongs to no stage)"""
+        if self.enabled:
+            self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.record(stage, now - self._last)
+        self._last = now
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record a stage timed elsewhere (e.g. request decoding)"""
+        if self.histogram is not None:
+            self.histogram.observe(seconds, stage=stage)
+        if self.spans is not None:
+            self.spans.append({'stage': stage, 'ms': round(seconds * 1000, 3)})
+
+
+class DetectorMetrics:
+    """The detector's counters and histograms; every method is a no-op when disabled"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, enabled: bool = None):
+        self.enabled = MetricsConfig.ENABLED if enabled is None else enabled
+        if not self.enabled:
+            self.stage_seconds = None
+            return
+
+        registry = registry or get_registry()
+        self.stage_seconds = registry.histogram(
+            'audio_stage_seconds', 'Time spent in each analyze_audio stage', ['stage'])
+        self.chunk_seconds = registry.histogram(
+            'audio_chunk_processing_seconds', 'End-to-end analyze_audio time per chunk')
+        self.chunks = registry.counter('audio_chunks_total', 'Chunks analyzed')
+        self.skips = registry.counter(
+            'audio_chunks_skipped_total', 'Chunks or stages skipped, by reason', ['reason'])
+        self.threats = registry.counter(
+            'audio_threats_total', 'Confirmed threats, by type and class', ['type', 'class'])
+        self.asr_errors = registry.counter(
+            'audio_asr_errors_total', 'Transcriptions that failed or were not understood', ['engine', 'kind'])
+        self.errors = registry.counter('audio_analysis_errors_total', 'analyze_audio calls that raised')
+        self.language_routes = registry.counter(
+            'audio_asr_language_routes_total', 'Chunks sent to online ASR, by language route', ['route'])
+        self.asr_calls_saved = registry.counter(
+            'audio_asr_calls_saved_total', 'Recognizer passes skipped by language routing')
+
+    def timer(self, trace: bool = False) -> StageTimer:
+        return StageTimer(self.stage_seconds, trace)
+
+    def record_chunk(self, seconds: float) -> None:
+        if self.enabled:
+            self.chunks.inc()
+            self.chunk_seconds.observe(seconds)
+
+    def record_skip(self, reason: str) -> None:
+        if self.enabled:
+            self.skips.inc(reason=reason)
+
+    def record_threat(self, threat_type: str, class_name: str) -> None:
+        if self.enabled:
+            self.threats.inc(type=threat_type, **{'class': class_name})
+
+    def record_asr_error(self, engine: str, error: Optional[str]) -> None:
+        if self.enabled and error:
+            kind = 'unrecognized' if 'could not understand' in error.lower() else 'failed'
+            self.asr_errors.inc(engine=engine or 'none', kind=kind)
+
+    def record_error(self) -> None:
+        if self.enabled:
+            self.errors.inc()
+
+    def record_language_route(self, languages: Sequence[str], saved: int) -> None:
+        if self.enabled:
+            self.language_routes.inc(route=languages[0] if len(languages) == 1 else 'all')
+            if saved:
+                self.asr_calls_saved.inc(saved)
+
+
+_default_registry: Optional[MetricsRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """Process-wide registry rendered by /metrics"""
+    global _default_registry
+
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = MetricsRegistry()
+    return _default_registry
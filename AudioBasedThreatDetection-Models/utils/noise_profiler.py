@@ -3,87 +3,268 @@ Adaptive Noise Profiler Module
 Maintains noise profiles for accurate threat detection across varying acoustic environments
 """
 import numpy as np
-from collections import deque
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import re
+import tempfile
+import time
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import NoiseConfig, AudioConfig
 
+
+class OnlineQuantile:
+    """
+    Streaming per-element quantile estimate in O(size) per update.
+
+    Stochastic approximation: each update moves the estimate up by
+    step * scale * quantile when the value is above it and down by
+    step * scale * (1 - quantile) when below, which settles where that
+    fraction of values lies below. scale is a running mean absolute deviation
+    so the steps follow the spread of each element, and step decays as 1/n
+    down to min_step, so old samples are gradually forgotten.
+    """
+
+    def __init__(self, quantile: float, min_step: float):
+        self.quantile = quantile
+        self.min_step = min_step
+        self.estimate: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.count = 0
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        self.count += 1
+
+        if self.estimate is None:
+            self.estimate = values.copy()
+            self.scale = np.zeros_like(values)
+            return self.estimate
+
+        step = max(1.0 / self.count, self.min_step)
+        self.scale += step * (np.abs(values - self.estimate) - self.scale)
+        self.estimate += step * self.scale * (self.quantile - (values < self.estimate))
+        return self.estimate
+
+    def get_state(self) -> Dict:
+        return {
+            'count': self.count,
+            'estimate': None if self.estimate is None else self.estimate.tolist(),
+            'scale': None if self.scale is None else self.scale.tolist()
+        }
+
+    def set_state(self, state: Dict) -> None:
+        self.count = int(state['count'])
+        self.estimate = None if state['estimate'] is None else np.array(state['estimate'], dtype=np.float64)
+        self.scale = None if state['scale'] is None else np.array(state['scale'], dtype=np.float64)
+
+
 class NoiseProfiler:
-    """Adaptive noise profiling for robust threat detection"""
+    """
+    Adaptive noise profiling for robust threat detection.
+
+    The noise profile is a per-bin magnitude spectrum over fixed n_fft frames,
+    so it applies to chunks of any length. Denoising is frame-based spectral
+    subtraction with weighted overlap-add: square-root Hann analysis and
+    synthesis windows at 50% overlap, which reconstruct the input exactly
+    when nothing is subtracted.
+
+    Noise level and spectrum are tracked with OnlineQuantile estimates over
+    log magnitudes, so each calibration sample costs O(bins) and memory does
+    not grow under continuous re-calibration.
+    """
+
+    CALIBRATION_SAMPLES = 5  # samples before the profile is used
     
-    def __init__(self):
+    # Frames transformed at a time by _subtract (across the whole batch)
+    FRAME_BLOCK = 256
+
+    def __init__(self, n_fft: int = None):
         self.sample_rate = AudioConfig.SAMPLE_RATE
-        self.noise_samples = deque(maxlen=NoiseConfig.NOISE_FLOOR_SAMPLES)
+        self.n_fft = n_fft or NoiseConfig.DENOISE_N_FFT
+        self.hop_length = self.n_fft // 2
+        self.over_subtraction = NoiseConfig.OVER_SUBTRACTION
+        self.spectral_floor = NoiseConfig.SPECTRAL_FLOOR
+        # Periodic Hann; its square root squared sums to 1 at 50% overlap
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.n_fft) / self.n_fft)).astype(np.float32)
         self.current_noise_floor = None
         self.current_noise_spectrum = None
         self.is_calibrated = False
         self.snr_minimum = NoiseConfig.SNR_MINIMUM
         self.noise_floor_percentile = 75  # Use 75th percentile instead of median for more robust noise estimation
-    
+
+        # Estimates follow roughly the last NOISE_FLOOR_SAMPLES samples
+        min_step = 1.0 / NoiseConfig.NOISE_FLOOR_SAMPLES
+        self._energy = OnlineQuantile(self.noise_floor_percentile / 100, min_step)
+        self._spectrum = OnlineQuantile(self.noise_floor_percentile / 100, min_step)
+        self.last_update: Optional[float] = None
+        self.auto_updates = 0
+
+    @property
+    def samples_seen(self) -> int:
+        return self._energy.count
+
     def update_noise_profile(self, audio: np.ndarray) -> None:
         """Update noise profile with new ambient audio sample"""
-        # Calculate noise energy
-        energy = np.sqrt(np.mean(audio**2))
-        
-        # Calculate noise spectrum
-        spectrum = np.abs(np.fft.rfft(audio))
-        
-        self.noise_samples.append({
-            'energy': energy,
-            'spectrum': spectrum
-        })
-        
-        if len(self.noise_samples) >= 5:
+        audio = np.asarray(audio, dtype=np.float32)
+
+        # Noise energy and mean magnitude per frequency bin, tracked in log domain
+        energy = np.sqrt(np.mean(audio ** 2))
+        spectrum = np.abs(self._stft(audio[np.newaxis])[0]).mean(axis=0)
+
+        self._energy.update(np.log([energy + 1e-10]))
+        self._spectrum.update(np.log(spectrum + 1e-10))
+        self.last_update = time.time()
+
+        if self.samples_seen >= self.CALIBRATION_SAMPLES:
             self._recalculate_noise_floor()
             self.is_calibrated = True
-    
+
     def _recalculate_noise_floor(self) -> None:
-        """Recalculate noise floor from collected samples"""
-        energies = [s['energy'] for s in self.noise_samples]
-        # Use percentile instead of median for more robust noise estimation
-        # This helps ignore occasional loud noises in the noise samples
-        self.current_noise_floor = np.percentile(energies, self.noise_floor_percentile)
-
-        # Average spectrum using percentile
-        spectrums = [s['spectrum'] for s in self.noise_samples]
-        min_len = min(len(s) for s in spectrums)
-        spectrums = [s[:min_len] for s in spectrums]
-        self.current_noise_spectrum = np.percentile(np.array(spectrums), self.noise_floor_percentile, axis=0)
-    
+        """Noise floor and spectrum from the running quantile estimates"""
+        self.current_noise_floor = float(np.exp(self._energy.estimate[0]))
+        self.current_noise_spectrum = np.exp(self._spectrum.estimate).astype(np.float32)
+
+    def maybe_recalibrate(self, audio: np.ndarray, now: float = None) -> bool:
+        """
+        Background re-calibration: feed a raw (un-normalized) chunk into the
+        profile at most every NOISE_UPDATE_INTERVAL seconds. Once calibrated,
+        only chunks no louder than the floor plus RECALIBRATE_MARGIN_DB are
+        taken, so quiet speech or activity cannot ratchet the floor upwards;
+        digital silence below RECALIBRATE_MIN_RMS is never taken, so a muted
+        mic cannot drag it down. Returns True if the profile was updated.
+        """
+        if not NoiseConfig.AUTO_RECALIBRATE:
+            return False
+
+        now = time.time() if now is None else now
+        if self.last_update is not None and now - self.last_update < NoiseConfig.NOISE_UPDATE_INTERVAL:
+            return False
+
+        rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+        if rms < NoiseConfig.RECALIBRATE_MIN_RMS:
+            return False
+        if self.is_calibrated and rms > self.current_noise_floor * 10 ** (NoiseConfig.RECALIBRATE_MARGIN_DB / 20):
+            return False
+
+        self.update_noise_profile(audio)
+        self.last_update = now
+        self.auto_updates += 1
+        return True
+
+    def get_state(self) -> Dict:
+        """Serializable estimator state"""
+        return {
+            'n_fft': self.n_fft,
+            'sample_rate': self.sample_rate,
+            'percentile': self.noise_floor_percentile,
+            'updated_at': self.last_update,
+            'energy': self._energy.get_state(),
+            'spectrum': self._spectrum.get_state()
+        }
+
+    def set_state(self, state: Dict) -> None:
+        """Restore state saved by get_state"""
+        if state['n_fft'] != self.n_fft or state['sample_rate'] != self.sample_rate:
+            raise ValueError(f"Noise profile is for n_fft={state['n_fft']} at {state['sample_rate']} Hz, "
+                             f"expected n_fft={self.n_fft} at {self.sample_rate} Hz")
+
+        self._energy.set_state(state['energy'])
+        self._spectrum.set_state(state['spectrum'])
+        self.last_update = state.get('updated_at')
+        self.is_calibrated = self.samples_seen >= self.CALIBRATION_SAMPLES
+        if self.is_calibrated:
+            self._recalculate_noise_floor()
+
+    def _frame_count(self, n_samples: int) -> int:
+        """Frames needed so every sample is covered by two windows"""
+        return -(-n_samples // self.hop_length) + 1
+
+    def _stft(self, audio: np.ndarray) -> np.ndarray:
+        """(batch, samples) -> (batch, frames, bins) complex spectra"""
+        hop = self.hop_length
+        n_frames = self._frame_count(audio.shape[1])
+
+        # One hop of padding in front, and enough behind to fill the last frame
+        padded = np.zeros((audio.shape[0], (n_frames + 1) * hop), dtype=np.float32)
+        padded[:, hop:hop + audio.shape[1]] = audio
+
+        frames = np.lib.stride_tricks.as_strided(
+            padded,
+            shape=(audio.shape[0], n_frames, self.n_fft),
+            strides=(padded.strides[0], padded.strides[1] * hop, padded.strides[1])
+        )
+        return np.fft.rfft(frames * self.window, axis=-1)
+
+    def _subtract(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Spectral subtraction over a (batch, samples) array.
+        Frames are transformed FRAME_BLOCK at a time and overlap-added into the
+        output, so memory stays bounded for long inputs.
+        """
+        hop = self.hop_length
+        batch, n_samples = audio.shape
+        n_frames = self._frame_count(n_samples)
+
+        padded = np.zeros((batch, (n_frames + 1) * hop), dtype=np.float32)
+        padded[:, hop:hop + n_samples] = audio
+        frames = np.lib.stride_tricks.as_strided(
+            padded,
+            shape=(batch, n_frames, self.n_fft),
+            strides=(padded.strides[0], padded.strides[1] * hop, padded.strides[1])
+        )
+
+        # At 50% overlap each output hop is the second half of one frame plus the first half of the next
+        output = np.zeros((batch, n_frames + 1, hop), dtype=np.float32)
+        noise = self.current_noise_spectrum * self.over_subtraction
+        block = max(1, self.FRAME_BLOCK // batch)
+
+        for start in range(0, n_frames, block):
+            stop = min(start + block, n_frames)
+            stft = np.fft.rfft(frames[:, start:stop] * self.window, axis=-1)
+
+            # Subtract noise with flooring, as a per-bin gain so the phase is kept:
+            # max(|X| - a * N, floor * |X|) / |X| = max(1 - a * N / |X|, floor)
+            gain = np.maximum(np.abs(stft), 1e-10)
+            np.divide(noise, gain, out=gain)
+            np.subtract(1.0, gain, out=gain)
+            np.maximum(gain, self.spectral_floor, out=gain)
+            stft *= gain
+
+            clean = np.fft.irfft(stft, n=self.n_fft, axis=-1).astype(np.float32, copy=False)
+            clean *= self.window
+            output[:, start:stop] += clean[:, :, :hop]
+            output[:, start + 1:stop + 1] += clean[:, :, hop:]
+
+        return output.reshape(batch, -1)[:, hop:hop + n_samples]
+
     def denoise_audio(self, audio: np.ndarray) -> np.ndarray:
         """Apply spectral subtraction for noise reduction"""
         if not self.is_calibrated or self.current_noise_spectrum is None:
             return audio
-        
-        # Compute STFT
-        n_fft = 2048
-        hop_length = 512
-        stft = np.fft.rfft(audio)
-        
-        # Ensure same length
-        noise_len = len(self.current_noise_spectrum)
-        stft_len = len(stft)
-        min_len = min(noise_len, stft_len)
-        
-        # Spectral subtraction
-        magnitude = np.abs(stft[:min_len])
-        phase = np.angle(stft[:min_len])
-        noise_mag = self.current_noise_spectrum[:min_len]
-        
-        # Subtract noise with flooring
-        clean_magnitude = np.maximum(magnitude - noise_mag * 1.5, magnitude * 0.1)
-        
-        # Reconstruct
-        clean_stft = clean_magnitude * np.exp(1j * phase)
-        
-        # Pad back to original length if needed
-        if stft_len > min_len:
-            clean_stft = np.pad(clean_stft, (0, stft_len - min_len))
-        
-        clean_audio = np.fft.irfft(clean_stft, n=len(audio))
-        return clean_audio.astype(np.float32)
+
+        audio = np.asarray(audio, dtype=np.float32)
+        return self._subtract(audio[np.newaxis])[0]
+
+    def denoise_batch(self, chunks: Union[np.ndarray, List[np.ndarray]]) -> np.ndarray:
+        """
+        Denoise equal-length chunks in one pass.
+
+        Args:
+            chunks: (n_chunks, samples) array or list of equal-length arrays
+
+        Returns:
+            (n_chunks, samples) float32 array
+        """
+        chunks = np.asarray(chunks, dtype=np.float32)
+        if chunks.ndim != 2:
+            raise ValueError(f"Expected (n_chunks, samples) audio, got shape {chunks.shape}")
+        if not self.is_calibrated or self.current_noise_spectrum is None:
+            return chunks
+
+        return self._subtract(chunks)
     
     def calculate_snr(self, audio: np.ndarray) -> float:
         """Calculate Signal-to-Noise Ratio"""
@@ -120,7 +301,10 @@ class NoiseProfiler:
     
     def reset(self) -> None:
         """Reset noise profile"""
-        self.noise_samples.clear()
+        min_step = 1.0 / NoiseConfig.NOISE_FLOOR_SAMPLES
+        self._energy = OnlineQuantile(self.noise_floor_percentile / 100, min_step)
+        self._spectrum = OnlineQuantile(self.noise_floor_percentile / 100, min_step)
+        self.last_update = None
         self.current_noise_floor = None
         self.current_noise_spectrum = None
         self.is_calibrated = False
@@ -130,7 +314,55 @@ class NoiseProfiler:
         return {
             'is_calibrated': self.is_calibrated,
             'noise_floor': float(self.current_noise_floor) if self.current_noise_floor else None,
-            'samples_collected': len(self.noise_samples),
-            'samples_required': 5
+            'samples_collected': self.samples_seen,
+            'samples_required': self.CALIBRATION_SAMPLES,
+            'auto_updates': self.auto_updates,
+            'last_update': self.last_update,
+            'n_fft': self.n_fft
         }
 
+
+class NoiseProfileStore:
+    """Noise profiler states saved as JSON files, one per camera/microphone location"""
+
+    def __init__(self, directory: str = None):
+        self.directory = str(directory or NoiseConfig.PROFILE_DIR)
+
+    def _path(self, location_id: str) -> str:
+        """
+        File for a location: a readable prefix of the id plus a hash of the
+        whole id, so ids that sanitize alike (e.g. 'a/b' and 'a_b') never share a file
+        """
+        location_id = str(location_id)
+        if not location_id:
+            raise ValueError("Location id must not be empty")
+        prefix = re.sub(r'[^A-Za-z0-9_-]', '_', location_id)[:40]
+        digest = hashlib.sha256(location_id.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{prefix}-{digest}.json")
+
+    def save(self, location_id: str, profiler: NoiseProfiler) -> None:
+        """Write a location's profile (replaced atomically)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(location_id)
+        # A temporary file per writer, so concurrent saves cannot interleave
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False) as f:
+            json.dump({'location_id': location_id, **profiler.get_state()}, f)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def load(self, location_id: str, profiler: NoiseProfiler) -> bool:
+        """Restore a location's profile into profiler; False if none is saved or it does not fit"""
+        path = self._path(location_id)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r') as f:
+                profiler.set_state(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Noise] Ignoring saved profile for location '{location_id}': {e}")
+            return False
+        return True
+
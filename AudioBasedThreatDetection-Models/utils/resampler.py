@@ -0,0 +1,165 @@
+"""
+Polyphase Resampling
+Band-limited sample-rate conversion in numpy with the same windowed-sinc
+kernel as torchaudio.transforms.Resample. Kernels are built once per
+(source_rate, target_rate) and cached; StreamingResampler carries the filter
+history across blocks so a continuous stream converted block by block matches
+the whole signal converted at once, with no artifacts at block edges.
+
+    audio_16k = resample(audio, 44100, 16000)
+
+    stream = StreamingResampler(48000, 16000)
+    for block in blocks:
+        out = stream.push(block)
+    out = stream.flush()
+"""
+from math import ceil, gcd
+from typing import Dict, Tuple
+import threading
+
+import numpy as np
+
+LOWPASS_FILTER_WIDTH = 6  # zero crossings each side (torchaudio default)
+ROLLOFF = 0.99  # cutoff as a fraction of the lower Nyquist frequency
+MAX_CACHED_KERNELS = 32
+# Taps in one filter bank (up * length). Common rates need well under 1e6
+# (11025 -> 16000 is about 3e5); rates with a tiny common divisor with the
+# target, e.g. 44101 Hz, would need billions and are rejected.
+MAX_KERNEL_TAPS = 1 << 20
+
+
+class ResampleKernel:
+    """
+    Polyphase filter bank for source_rate -> target_rate. With the rates
+    reduced to down:up, every `down` input samples produce `up` output
+    samples, each the dot product of a window of `length` input samples with
+    one row of `filters`. Raises ValueError for rates that are not positive
+    or whose filter bank would exceed MAX_KERNEL_TAPS.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.source_rate = int(source_rate)
+        self.target_rate = int(target_rate)
+        if self.source_rate <= 0 or self.target_rate <= 0:
+            raise ValueError(f"Sample rates must be positive, got {self.source_rate} -> {self.target_rate}")
+        divisor = gcd(self.source_rate, self.target_rate)
+        self.down = self.source_rate // divisor
+        self.up = self.target_rate // divisor
+
+        base_freq = min(self.down, self.up) * ROLLOFF
+        self.width = int(ceil(LOWPASS_FILTER_WIDTH * self.down / base_freq))
+        self.length = 2 * self.width + self.down
+        if self.up * self.length > MAX_KERNEL_TAPS:
+            raise ValueError(f"Unsupported sample rate conversion {self.source_rate} -> {self.target_rate} Hz")
+
+        idx = np.arange(-self.width, self.width + self.down, dtype=np.float64)[None, :] / self.down
+        t = (np.arange(0, -self.up, -1, dtype=np.float64)[:, None] / self.up + idx) * base_freq
+        t = np.clip(t, -LOWPASS_FILTER_WIDTH, LOWPASS_FILTER_WIDTH)
+        window = np.cos(t * np.pi / LOWPASS_FILTER_WIDTH / 2) ** 2  # Hann
+        t *= np.pi
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sinc = np.where(t == 0, 1.0, np.sin(t) / t)
+        # (length, up) so that frames @ filters gives (frames, up) outputs
+        self.filters = np.ascontiguousarray((sinc * window * base_freq / self.down).T, dtype=np.float32)
+
+        # When windows overlap heavily (few phases, e.g. 48k -> 16k), split the
+        # filters into blocks of `down` taps applied to the input reshaped into
+        # rows of `down` samples, instead of materializing every window
+        self.blocks = -(-self.length // self.down)
+        self.use_blocks = self.blocks > 4
+        padded_filters = np.zeros((self.blocks * self.down, self.up), dtype=np.float32)
+        padded_filters[:self.length] = self.filters
+        self.block_filters = padded_filters.reshape(self.blocks, self.down, self.up)
+
+    def output_length(self, input_length: int) -> int:
+        return int(ceil(self.up * input_length / self.down))
+
+    def apply(self, padded: np.ndarray) -> Tuple[np.ndarray, int]:
+        """
+        Filter every complete window of already padded input.
+        Returns (outputs, input samples consumed).
+        """
+        n_frames = (len(padded) - self.length) // self.down + 1
+        if n_frames <= 0:
+            return np.zeros(0, dtype=np.float32), 0
+
+        if self.use_blocks:
+            rows = n_frames + self.blocks - 1
+            if len(padded) < rows * self.down:
+                padded = np.pad(padded, (0, rows * self.down - len(padded)))
+            x = padded[:rows * self.down].reshape(rows, self.down)
+            out = x[:n_frames] @ self.block_filters[0]
+            for block in range(1, self.blocks):
+                out += x[block:block + n_frames] @ self.block_filters[block]
+            return out.reshape(-1), n_frames * self.down
+
+        frames = np.lib.stride_tricks.as_strided(
+            padded, shape=(n_frames, self.length),
+            strides=(padded.strides[0] * self.down, padded.strides[0])
+        )
+        return (frames @ self.filters).reshape(-1), n_frames * self.down
+
+
+_kernels: Dict[Tuple[int, int], ResampleKernel] = {}
+_kernels_lock = threading.Lock()
+
+
+def get_kernel(source_rate: int, target_rate: int) -> ResampleKernel:
+    """Shared kernel for a rate pair, built on first use"""
+    key = (int(source_rate), int(target_rate))
+    kernel = _kernels.get(key)
+    if kernel is None:
+        kernel = ResampleKernel(*key)
+        with _kernels_lock:
+            if len(_kernels) >= MAX_CACHED_KERNELS:
+                _kernels.pop(next(iter(_kernels)))
+            kernel = _kernels.setdefault(key, kernel)
+    return kernel
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample a whole mono signal; returns float32"""
+    audio = np.asarray(audio, dtype=np.float32)
+    if int(source_rate) == int(target_rate):
+        return audio
+    kernel = get_kernel(source_rate, target_rate)
+    padded = np.pad(audio, (kernel.width, kernel.width + kernel.down))
+    out, _ = kernel.apply(padded)
+    return out[:kernel.output_length(len(audio))]
+
+
+class StreamingResampler:
+    """
+    Resamples a continuous mono stream block by block. Output lags the input
+    by width + down source samples (under a millisecond at 44.1/48 kHz);
+    flush() returns the remainder at the end of the stream.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.kernel = get_kernel(source_rate, target_rate)
+        self.samples_in = 0
+        self.samples_out = 0
+        self._history = np.zeros(self.kernel.width, dtype=np.float32)  # leading zero padding
+
+    def push(self, block: np.ndarray) -> np.ndarray:
+        """Add input samples; returns every output sample that is now complete"""
+        block = np.asarray(block, dtype=np.float32)
+        self.samples_in += len(block)
+        buffered = np.concatenate([self._history, block])
+        out, consumed = self.kernel.apply(buffered)
+        self._history = buffered[consumed:].copy()  # do not keep the whole block alive
+        self.samples_out += len(out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Output for the end of the stream; the resampler is reset afterwards"""
+        kernel = self.kernel
+        out, _ = kernel.apply(np.pad(self._history, (0, kernel.width + kernel.down)))
+        out = out[:max(kernel.output_length(self.samples_in) - self.samples_out, 0)]
+        self.reset()
+        return out
+
+    def reset(self) -> None:
+        self.samples_in = 0
+        self.samples_out = 0
+        self._history = np.zeros(self.kernel.width, dtype=np.float32)
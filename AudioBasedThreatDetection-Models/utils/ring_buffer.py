@@ -0,0 +1,54 @@
+"""
+Ring Buffer
+Fixed-capacity circular buffer along the last axis, for per-session context
+(e.g. the most recent STFT frame statistics) with bounded memory and no
+reallocation per push.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Holds the newest `capacity` columns of a (rows, n) stream, or the newest
+    `capacity` samples of a 1-D stream when rows is None.
+    """
+
+    def __init__(self, capacity: int, rows: Optional[int] = None, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.rows = rows
+        shape = (self.capacity,) if rows is None else (rows, self.capacity)
+        self._data = np.zeros(shape, dtype=dtype)
+        self.written = 0  # total columns ever appended
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def clear(self) -> None:
+        self.written = 0
+
+    def append(self, columns: np.ndarray) -> None:
+        """Append columns (last axis), overwriting the oldest when full"""
+        columns = np.asarray(columns, dtype=self._data.dtype)
+        n = columns.shape[-1]
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.written += n - self.capacity
+            columns = columns[..., -self.capacity:]
+            n = self.capacity
+
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[..., start:start + first] = columns[..., :first]
+        if first < n:
+            self._data[..., :n - first] = columns[..., first:]
+        self.written += n
+
+    def latest(self, n: int, offset: int = 0) -> np.ndarray:
+        """Copy of the n columns ending `offset` columns before the newest, oldest first"""
+        n = max(0, min(n, len(self) - offset))
+        stop = self.written - offset
+        indices = np.arange(stop - n, stop) % self.capacity
+        return np.take(self._data, indices, axis=-1)
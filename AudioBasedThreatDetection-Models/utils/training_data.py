@@ -0,0 +1,218 @@
+"""
+Streaming Training Data
+Datasets that produce one (time, features) window at a time for
+NonSpeechThreatModel.train_streaming, so the training set never has to be
+materialized as one array. Items are read and augmented inside DataLoader
+worker processes.
+
+    ShardDataset          windows of FeatureCache shards, read memory-mapped
+    AugmentedClipDataset  random crops of audio clips with time shift and noise
+                          mixing, featurized on the fly
+
+Augmentation is reproducible: item i of epoch e always draws from
+default_rng([seed, e, i]), whichever worker loads it, and shuffling uses a
+seeded generator.
+"""
+from typing import Dict, List, Sequence, Tuple
+import os
+import sys
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Subset
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import AudioConfig, FeatureCacheConfig, TrainingDataConfig
+from utils.feature_cache import FeatureCache
+
+
+class ShardDataset(Dataset):
+    """
+    Every window of every file's FeatureCache shard, labelled with its file's
+    class index. Missing shards are extracted (in parallel) when the dataset
+    is built; afterwards only one window is read from disk per item.
+    """
+
+    def __init__(self, paths: Sequence[str], labels: Sequence[int], cache: FeatureCache = None):
+        cache = cache or FeatureCache()
+        self.shard_files: List[str] = []
+        counts, file_labels = [], []
+        for label, shard_file in zip(labels, cache.shard_paths(paths)):
+            if shard_file is None:
+                continue
+            self.shard_files.append(shard_file)
+            counts.append(len(np.load(shard_file, mmap_mode='r')))
+            file_labels.append(int(label))
+
+        if not self.shard_files:
+            raise ValueError("No features could be extracted from the given files")
+
+        # Item i is window i - offsets[shard] of shard searchsorted(offsets, i, 'right') - 1
+        self.offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        self.labels = np.repeat(file_labels, counts).astype(np.int64)
+        self._shards: Dict[int, np.ndarray] = {}  # opened lazily in each worker
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, int]:
+        shard_index = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        shard = self._shards.get(shard_index)
+        if shard is None:
+            shard = self._shards[shard_index] = np.load(self.shard_files[shard_index], mmap_mode='r')
+        window = np.array(shard[index - self.offsets[shard_index]], dtype=np.float32)
+        return torch.from_numpy(window), int(self.labels[index])
+
+    def __getstate__(self):
+        # Workers reopen the shards rather than receiving pickled copies of them
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        return state
+
+
+class AugmentedClipDataset(Dataset):
+    """
+    windows_per_file crops of each audio clip per epoch. With augment, a crop
+    starts at a random position up to shift_seconds outside the clip (the rest
+    is silence) and, with noise_probability, has a random noise clip mixed in
+    at a random SNR. Without augment, crops are evenly spaced over the clip,
+    for validation. Every crop is then peak-normalized, as inference
+    normalizes each chunk, so input level is not augmented: it never reaches
+    the model.
+    """
+
+    def __init__(self, paths: Sequence[str], labels: Sequence[int],
+                 noise_paths: Sequence[str] = (), augment: bool = True, seed: int = None,
+                 windows_per_file: int = None, target_length: int = None):
+        self.paths = list(paths)
+        self.noise_paths = list(noise_paths)
+        self.augment = augment
+        self.seed = TrainingDataConfig.SEED if seed is None else seed
+        self.windows_per_file = windows_per_file or TrainingDataConfig.WINDOWS_PER_FILE
+        self.target_length = target_length or FeatureCacheConfig.TARGET_LENGTH
+        self.labels = np.repeat(np.asarray(labels, dtype=np.int64), self.windows_per_file)
+        self.epoch = 0
+
+        self.chunk_samples = int(AudioConfig.CHUNK_DURATION * AudioConfig.SAMPLE_RATE)
+        self.shift_samples = int(TrainingDataConfig.SHIFT_SECONDS * AudioConfig.SAMPLE_RATE)
+        self._tools = None
+        self._noise: Dict[int, np.ndarray] = {}
+
+    def set_epoch(self, epoch: int) -> None:
+        """Select the augmentation draws for an epoch (call before creating its iterator)"""
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _get_tools(self):
+        if self._tools is None:
+            from utils.audio_processor import AudioProcessor
+            from utils.feature_extractor import FeatureExtractor
+            self._tools = AudioProcessor(), FeatureExtractor()
+        return self._tools
+
+    def _crop(self, audio: np.ndarray, start: int) -> np.ndarray:
+        """chunk_samples of audio from start (which may be negative), zero-padded outside the clip"""
+        window = np.zeros(self.chunk_samples, dtype=np.float32)
+        src_start, src_end = max(start, 0), min(start + self.chunk_samples, len(audio))
+        if src_end > src_start:
+            window[src_start - start:src_end - start] = audio[src_start:src_end]
+        return window
+
+    def _noise_clip(self, index: int) -> np.ndarray:
+        noise = self._noise.get(index)
+        if noise is None:
+            processor, _ = self._get_tools()
+            noise, _ = processor.load_audio(self.noise_paths[index])
+            noise = self._noise[index] = processor.normalize_audio(noise).astype(np.float32)
+        return noise
+
+    def _mix_noise(self, window: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        noise = self._noise_clip(int(rng.integers(len(self.noise_paths))))
+        if len(noise) > self.chunk_samples:
+            start = int(rng.integers(len(noise) - self.chunk_samples + 1))
+            noise = noise[start:start + self.chunk_samples]
+        else:
+            noise = np.resize(noise, self.chunk_samples)  # loop short clips
+
+        signal_rms = float(np.sqrt(np.mean(window ** 2)))
+        noise_rms = float(np.sqrt(np.mean(noise ** 2)))
+        if signal_rms < 1e-6 or noise_rms < 1e-6:
+            return window
+        snr_db = rng.uniform(*TrainingDataConfig.NOISE_SNR_DB)
+        return window + noise * (signal_rms / noise_rms / (10 ** (snr_db / 20)))
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, int]:
+        processor, extractor = self._get_tools()
+        file_index, crop_index = divmod(index, self.windows_per_file)
+        audio, _ = processor.load_audio(self.paths[file_index])
+        audio = processor.preprocess_audio(audio)
+        last_start = max(len(audio) - self.chunk_samples, 0)
+
+        if self.augment:
+            rng = np.random.default_rng([self.seed, self.epoch, index])
+            start = int(rng.integers(-self.shift_samples, last_start + self.shift_samples + 1))
+            window = self._crop(audio, start)
+            if self.noise_paths and rng.random() < TrainingDataConfig.NOISE_PROBABILITY:
+                window = self._mix_noise(window, rng)
+        else:
+            start = last_start * (crop_index + 1) // (self.windows_per_file + 1)
+            window = self._crop(audio, start)
+
+        window = processor.normalize_audio(window)
+        features = extractor.extract_fixed_length_features(window, self.target_length).T
+        return torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32)), int(self.labels[index])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_tools'] = None
+        state['_noise'] = {}
+        return state
+
+
+def _init_worker(worker_id: int) -> None:
+    torch.set_num_threads(1)  # one loader process per core already
+
+
+def make_loader(dataset: Dataset, batch_size: int, shuffle: bool = False,
+                workers: int = None, seed: int = None, drop_last: bool = False) -> DataLoader:
+    """
+    DataLoader with worker processes and seeded shuffling. Workers are started
+    for each epoch (not persistent) so they see the dataset's current epoch.
+    """
+    workers = TrainingDataConfig.LOADER_WORKERS if workers is None else workers
+    generator = torch.Generator()
+    generator.manual_seed(TrainingDataConfig.SEED if seed is None else seed)
+
+    options = {}
+    if workers > 0:
+        options['worker_init_fn'] = _init_worker
+        options['prefetch_factor'] = 4
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=workers,
+                      drop_last=drop_last, generator=generator, pin_memory=torch.cuda.is_available(), **options)
+
+
+def feature_statistics(dataset: Dataset, max_items: int = None, workers: int = None,
+                       seed: int = None, batch_size: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-feature mean and std over the frames of up to max_items randomly chosen
+    windows, accumulated batch by batch (same result as
+    NonSpeechThreatModel.compute_normalization on those windows)
+    """
+    max_items = max_items or TrainingDataConfig.NORMALIZATION_ITEMS
+    seed = TrainingDataConfig.SEED if seed is None else seed
+    if len(dataset) > max_items:
+        indices = np.random.default_rng(seed).choice(len(dataset), max_items, replace=False)
+        dataset = Subset(dataset, np.sort(indices).tolist())
+
+    total, total_sq, frames = None, None, 0
+    for batch_x, _ in make_loader(dataset, batch_size, workers=workers, seed=seed):
+        batch = batch_x.double().reshape(-1, batch_x.shape[-1])
+        total = batch.sum(0) if total is None else total + batch.sum(0)
+        total_sq = (batch ** 2).sum(0) if total_sq is None else total_sq + (batch ** 2).sum(0)
+        frames += batch.shape[0]
+
+    mean = total / frames
+    std = torch.sqrt(torch.clamp(total_sq / frames - mean ** 2, min=0.0)) + 1e-8
+    return mean.numpy().astype(np.float32), std.numpy().astype(np.float32)